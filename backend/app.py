@@ -1,27 +1,146 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import itertools
+import heapq
 import json
 import os
+import math
+import multiprocessing
 import re
-from collections import Counter
-from datetime import datetime
-from io import BytesIO
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence
-
-import requests
-from docx import Document
-from flask import Flask, jsonify, request, send_from_directory
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from flask import Flask, Response, g, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
-from openai import OpenAI
-from pypdf import PdfReader
+from werkzeug.datastructures import FileStorage
+
+from caches import SQLiteCache, StaleWhileRevalidateCache
+from coalesce import FlightAbandoned, SQLiteLease, SingleFlight
+from decks import DECK_NAME_PATTERN, CompiledDeck, DeckFileCache, DeckStore, flashcard_id
+from dedup import NearDuplicateIndex
+from lazy import LAZY_MODULES, asyncio, docx, httpx, openai, pypdf, requests, upstream_errors
+from metrics import (
+    METRICS_CONTENT_TYPE,
+    http_request_seconds,
+    http_requests_total,
+    phase_seconds,
+    record_openai_usage,
+    render_metrics,
+    start_metrics_writer,
+    track_upstream,
+)
+from progress import (
+    PROGRESS_DEFAULT_DECK,
+    PROGRESS_DEFAULT_USER,
+    PROGRESS_RECENT_LIMIT,
+    SCHEDULE_DUE_LIMIT,
+    ProgressStore,
+    coerce_timestamp_ms,
+    decode_progress_cursor,
+    format_timestamp_ms,
+    parse_timestamp_ms,
+)
+from ratelimit import (
+    AdaptiveConcurrencyLimit,
+    MeteredStream,
+    OpenAIRateLimiter,
+    SharedRateBudget,
+    retry_delay,
+)
+from storage import close_sqlite_connections, get_sqlite_connection, utc_timestamp
 
 BASE_DIR = Path(__file__).resolve().parent
 FRONTEND_DIR = (BASE_DIR.parent / "live-examples").resolve()
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.getenv("MEMORYPRO_DATA_DIR", str(BASE_DIR / "data")))
 DEFAULT_DECK_FILE = DATA_DIR / "default_deck.json"
 PROGRESS_FILE = DATA_DIR / "progress.json"
+JOBS_DB_FILE = DATA_DIR / "jobs.sqlite3"
+DECKS_DB_FILE = DATA_DIR / "decks.sqlite3"
+UPLOADS_DIR = DATA_DIR / "uploads"
+GENERATION_CACHE_FILE = DATA_DIR / "generation_cache.sqlite3"
+BOOKS_CACHE_FILE = DATA_DIR / "books_cache.sqlite3"
+PROGRESS_DB_FILE = DATA_DIR / "progress.sqlite3"
+COALESCE_DB_FILE = DATA_DIR / "coalesce.sqlite3"
+RATE_LIMIT_DB_FILE = DATA_DIR / "rate_limits.sqlite3"
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 MAX_CHARS_PER_CHUNK = 5500
+MAX_TOKENS_PER_CHUNK = int(os.getenv("MAX_TOKENS_PER_CHUNK", "1400"))
+CHUNK_MIN_FILL_RATIO = 0.5
 MAX_FLASHCARDS_PER_CHUNK = 20
+CHUNK_COMPLETION_PARAMS = {"temperature": 0.3, "max_tokens": 1200}
+TOPIC_COMPLETION_PARAMS = {"temperature": 0.2, "max_tokens": 1800}
+OPENAI_MAX_CONCURRENCY = max(1, int(os.getenv("OPENAI_MAX_CONCURRENCY", "4")))
+OPENAI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("OPENAI_REQUEST_TIMEOUT_SECONDS", "90"))
+OPENAI_MAX_RETRIES = max(0, int(os.getenv("OPENAI_MAX_RETRIES", "4")))
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "0"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "0"))
+OPENAI_RATE_BURST_SECONDS = float(os.getenv("OPENAI_RATE_BURST_SECONDS", "1"))
+OPENAI_MAX_IN_FLIGHT = max(1, int(os.getenv("OPENAI_MAX_IN_FLIGHT", "256")))
+OPENAI_CONCURRENCY_DECREASE_INTERVAL_SECONDS = 1.0
+JOB_WORKER_COUNT = max(1, int(os.getenv("JOB_WORKERS", "2")))
+JOB_POLL_INTERVAL_SECONDS = 2.0
+JOB_STALE_AFTER_SECONDS = 180.0
+JOB_HEARTBEAT_INTERVAL_SECONDS = JOB_STALE_AFTER_SECONDS / 6
+GENERATION_CACHE_TTL_SECONDS = float(os.getenv("GENERATION_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "20000"))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MODES = {"use", "refresh", "bypass"}
+BOOKS_SEARCH_FRESH_SECONDS = float(os.getenv("BOOKS_SEARCH_FRESH_SECONDS", str(6 * 3600)))
+BOOKS_VOLUME_FRESH_SECONDS = float(os.getenv("BOOKS_VOLUME_FRESH_SECONDS", str(7 * 24 * 3600)))
+BOOKS_REVALIDATE_WINDOW_SECONDS = float(os.getenv("BOOKS_REVALIDATE_WINDOW_SECONDS", str(24 * 3600)))
+BOOKS_MAX_STALE_SECONDS = float(os.getenv("BOOKS_MAX_STALE_SECONDS", str(30 * 24 * 3600)))
+BOOKS_MEMORY_CACHE_ENTRIES = int(os.getenv("BOOKS_MEMORY_CACHE_ENTRIES", "1024"))
+BOOKS_DISK_CACHE_MAX_ENTRIES = int(os.getenv("BOOKS_DISK_CACHE_MAX_ENTRIES", "50000"))
+BOOKS_DISK_CACHE_MAX_BYTES = int(os.getenv("BOOKS_DISK_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+COALESCE_ACROSS_WORKERS = os.getenv("COALESCE_ACROSS_WORKERS", "").lower() in {"1", "true", "yes"}
+COALESCE_LEASE_SECONDS = float(os.getenv("COALESCE_LEASE_SECONDS", "120"))
+PROGRESS_RETENTION_DAYS = float(os.getenv("PROGRESS_RETENTION_DAYS", "0"))
+PROGRESS_COMPACTION_INTERVAL_SECONDS = float(os.getenv("PROGRESS_COMPACTION_INTERVAL_SECONDS", "60"))
+PROGRESS_MAX_PAGE_SIZE = 1000
+PROGRESS_PARTITION_PATTERN = re.compile(r"^[A-Za-z0-9_.:@-]{1,128}$")
+PROGRESS_BATCH_MAX_EVENTS = int(os.getenv("PROGRESS_BATCH_MAX_EVENTS", "50000"))
+PROGRESS_BATCH_MAX_BYTES = int(os.getenv("PROGRESS_BATCH_MAX_BYTES", str(32 * 1024 * 1024)))
+PROGRESS_BATCH_MAX_ERRORS = 20
+DECK_CACHE_MAX_BYTES = int(os.getenv("DECK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DECK_PAGE_SIZE = 100
+DECK_MAX_PAGE_SIZE = 1000
+KEYWORD_SCORING = os.getenv("KEYWORD_SCORING", "frequency")
+KEYWORD_CORPUS_MAX_DOCUMENTS = int(os.getenv("KEYWORD_CORPUS_MAX_DOCUMENTS", "5000"))
+KEYWORD_CORPUS_REFRESH_SECONDS = 600.0
+OUTLINE_DEFAULT_CHAPTERS = 7
+OUTLINE_MAX_CHAPTERS = int(os.getenv("OUTLINE_MAX_CHAPTERS", "500"))
+SCHEDULE_MAX_DUE_LIMIT = 500
+PDF_EXTRACT_WORKERS = max(1, int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))))
+PDF_PARALLEL_PAGE_THRESHOLD = max(1, int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "64")))
+PDF_MIN_PAGES_PER_TASK = 8
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 DEFAULT_TOPIC_DIFFICULTY = "beginner"
 TOPIC_DIFFICULTIES = {"beginner", "intermediate", "expert"}
 TOPIC_CARD_RANGES = {
@@ -30,9 +149,17 @@ TOPIC_CARD_RANGES = {
     "expert": (20, 35),
 }
 
-GOOGLE_BOOKS_SEARCH_URL = "https://www.googleapis.com/books/v1/volumes"
+GOOGLE_BOOKS_SEARCH_URL = os.getenv("GOOGLE_BOOKS_API_URL", "https://www.googleapis.com/books/v1/volumes")
 GOOGLE_BOOKS_DEFAULT_LIMIT = 5
 HTTP_TIMEOUT_SECONDS = 12
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "8"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+HTTP_MAX_RETRIES = 2
+OPENAI_POOL_MAX_CONNECTIONS = int(os.getenv("OPENAI_POOL_MAX_CONNECTIONS", "64"))
+OPENAI_POOL_MAX_KEEPALIVE = int(os.getenv("OPENAI_POOL_MAX_KEEPALIVE", "32"))
+ASYNC_POOL_MAX_CONNECTIONS = int(os.getenv("ASYNC_POOL_MAX_CONNECTIONS", "512"))
+ASYNC_POOL_SHARDS = max(1, int(os.getenv("ASYNC_POOL_SHARDS", "16")))
+WARM_UP_ON_START = os.getenv("WARM_UP_ON_START", "").lower() in {"1", "true", "yes"}
 KEYWORD_STOPWORDS = {
     "about",
     "after",
@@ -78,19 +205,126 @@ KEYWORD_STOPWORDS = {
 app = Flask(__name__, static_folder=str(FRONTEND_DIR), static_url_path="")
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Coroutine versions of the I/O-bound views, keyed by Flask endpoint. asgi.py awaits them on its
+# event loop; under a WSGI server the regular views handle every request.
+async_views: Dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def async_variant(endpoint: str) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    def register(view: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        async_views[endpoint] = view
+        return view
+
+    return register
+
+
+generation_cache = SQLiteCache(
+    GENERATION_CACHE_FILE,
+    ttl_seconds=GENERATION_CACHE_TTL_SECONDS,
+    max_entries=GENERATION_CACHE_MAX_ENTRIES,
+    max_bytes=GENERATION_CACHE_MAX_BYTES,
+)
+
+
+coalesce_lease = SQLiteLease(COALESCE_DB_FILE, COALESCE_LEASE_SECONDS) if COALESCE_ACROSS_WORKERS else None
+completion_flights = SingleFlight("completion", lease=coalesce_lease)
+
+
+books_disk_cache = SQLiteCache(
+    BOOKS_CACHE_FILE,
+    ttl_seconds=BOOKS_MAX_STALE_SECONDS,
+    max_entries=BOOKS_DISK_CACHE_MAX_ENTRIES,
+    max_bytes=BOOKS_DISK_CACHE_MAX_BYTES,
+)
+books_search_cache = StaleWhileRevalidateCache(
+    "search",
+    books_disk_cache,
+    fresh_seconds=BOOKS_SEARCH_FRESH_SECONDS,
+    revalidate_seconds=BOOKS_REVALIDATE_WINDOW_SECONDS,
+    memory_entries=BOOKS_MEMORY_CACHE_ENTRIES,
+    lease=coalesce_lease,
+)
+books_volume_cache = StaleWhileRevalidateCache(
+    "volume",
+    books_disk_cache,
+    fresh_seconds=BOOKS_VOLUME_FRESH_SECONDS,
+    revalidate_seconds=BOOKS_REVALIDATE_WINDOW_SECONDS,
+    memory_entries=BOOKS_MEMORY_CACHE_ENTRIES,
+    lease=coalesce_lease,
+)
+
+
+def generation_cache_key(prompt: str, **params: Any) -> str:
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    material = json.dumps({"prompt": prompt_hash, "model": DEFAULT_MODEL, **params}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def resolve_cache_mode() -> str:
+    """Read the per-request cache mode from ``?cache=`` or the Cache-Control header.
+
+    ``refresh`` (or ``no-cache``) skips the lookup but stores the new result; ``bypass``
+    (or ``no-store``) neither reads nor writes the cache.
+    """
+
+    mode = normalize_text(request.args.get("cache")).lower()
+    if mode in CACHE_MODES:
+        return mode
+
+    cache_control = request.headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return "bypass"
+    if "no-cache" in cache_control:
+        return "refresh"
+    return "use"
+
+
+def resolve_stream_format() -> Optional[str]:
+    """Return ``ndjson`` or ``sse`` when the client asked for a streamed response."""
+
+    requested = normalize_text(request.args.get("stream")).lower()
+    if requested in STREAM_FORMATS:
+        return requested
+
+    best = request.accept_mimetypes.best_match(["application/json", *STREAM_FORMATS.values()])
+    for stream_format, mimetype in STREAM_FORMATS.items():
+        if best == mimetype:
+            return stream_format
+    return None
+
+
+def format_stream_frame(stream_format: str, event: str, payload: Any) -> str:
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"type": event, event: payload}) + "\n"
+
+
+def stream_response(stream_format: str, frames: Iterator[Tuple[str, Any]]) -> Response:
+    """Send ``(event, payload)`` frames to the client as they are produced."""
+
+    def generate() -> Iterator[str]:
+        for event, payload in frames:
+            yield format_stream_frame(stream_format, event, payload)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=STREAM_FORMATS[stream_format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
-def load_json(path: Path, default: Any) -> Any:
-    if path.exists():
-        with path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
-    return default
+def stream_response_async(stream_format: str, frames: AsyncIterator[Tuple[str, Any]]) -> Response:
+    """Like :func:`stream_response`; the body is an async iterator that only the ASGI server (asgi.py) drains."""
 
+    async def generate() -> AsyncIterator[str]:
+        async for event, payload in frames:
+            yield format_stream_frame(stream_format, event, payload)
 
-def write_json(path: Path, payload: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2)
-        handle.write("\n")
+    return Response(
+        generate(),
+        mimetype=STREAM_FORMATS[stream_format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 def normalize_text(value: Optional[str]) -> str:
@@ -113,14 +347,151 @@ def split_text(text: str, max_chars: int = MAX_CHARS_PER_CHUNK) -> List[str]:
     return segments
 
 
+T = TypeVar("T")
+
+
+class CountingIterator(Generic[T]):
+    """Wrap an iterator and count the items that have been pulled from it."""
+
+    def __init__(self, items: Iterable[T]) -> None:
+        self._items = iter(items)
+        self.count = 0
+
+    def __iter__(self) -> "CountingIterator[T]":
+        return self
+
+    def __next__(self) -> T:
+        item = next(self._items)
+        self.count += 1
+        return item
+
+
+SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
 def sentence_split(text: str) -> List[str]:
     cleaned = normalize_text(text)
     if not cleaned:
         return []
-    sentences = re.split(r"(?<=[.!?])\s+", cleaned)
+    sentences = SENTENCE_BOUNDARY_PATTERN.split(cleaned)
     return [normalize_text(sentence) for sentence in sentences if sentence and any(ch.isalpha() for ch in sentence)]
 
 
+_token_encoding: Any = None
+_token_encoding_loaded = False
+
+
+def get_token_encoding() -> Any:
+    """Load the model's tiktoken encoding on first use; None when tiktoken is not installed."""
+
+    global _token_encoding, _token_encoding_loaded
+
+    if not _token_encoding_loaded:
+        _token_encoding_loaded = True
+        try:
+            import tiktoken
+        except ImportError:  # pragma: no cover - optional dependency
+            return None
+        try:
+            _token_encoding = tiktoken.encoding_for_model(DEFAULT_MODEL)
+        except Exception:  # pragma: no cover - unknown model or missing BPE files
+            try:
+                _token_encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _token_encoding = None
+    return _token_encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when it is installed, otherwise estimate ~4 characters per token."""
+
+    encoding = get_token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def _split_oversized(sentence: str, max_chars: int, max_tokens: int) -> Iterator[Tuple[str, int]]:
+    """Break a sentence that exceeds the chunk budget at word boundaries."""
+
+    part: List[str] = []
+    part_chars = 0
+    part_tokens = 0
+    for word in sentence.split(" "):
+        word = word[:max_chars]
+        word_tokens = count_tokens(f" {word}")
+        if part and (part_chars + 1 + len(word) > max_chars or part_tokens + word_tokens > max_tokens):
+            yield " ".join(part), part_tokens
+            part, part_chars, part_tokens = [], 0, 0
+        part_chars += len(word) + (1 if part else 0)
+        part_tokens += word_tokens
+        part.append(word)
+
+    if part:
+        yield " ".join(part), part_tokens
+
+
+def iter_semantic_chunks(
+    sections: Iterable[str],
+    max_chars: int = MAX_CHARS_PER_CHUNK,
+    max_tokens: int = MAX_TOKENS_PER_CHUNK,
+    pack_sections: bool = True,
+) -> Iterator[str]:
+    """Chunk a stream of sections (pages, paragraphs) on sentence and section boundaries.
+
+    Chunks stay within both ``max_chars`` and ``max_tokens``. With ``pack_sections``, small
+    sections are packed together; a section that would overflow a chunk that is already
+    reasonably full starts a new chunk instead of being split across two.
+    """
+
+    current: List[str] = []
+    current_chars = 0
+    current_tokens = 0
+
+    def flush() -> Iterator[str]:
+        nonlocal current, current_chars, current_tokens
+        if current:
+            yield "".join(current)
+        current, current_chars, current_tokens = [], 0, 0
+
+    for section in sections:
+        started = time.perf_counter()
+        section = normalize_text(section)
+        if not section:
+            continue
+
+        pieces: List[Tuple[str, int]] = []
+        for sentence in SENTENCE_BOUNDARY_PATTERN.split(section):
+            sentence_tokens = count_tokens(sentence)
+            if len(sentence) <= max_chars and sentence_tokens <= max_tokens:
+                pieces.append((sentence, sentence_tokens))
+            else:
+                pieces.extend(_split_oversized(sentence, max_chars, max_tokens))
+        phase_seconds.observe(time.perf_counter() - started, "chunk_section")
+
+        section_tokens = sum(tokens for _, tokens in pieces)
+        overflows = current_chars + len(section) + 1 > max_chars or current_tokens + section_tokens > max_tokens
+        well_filled = (
+            current_chars >= max_chars * CHUNK_MIN_FILL_RATIO or current_tokens >= max_tokens * CHUNK_MIN_FILL_RATIO
+        )
+        if current and (not pack_sections or (overflows and well_filled)):
+            yield from flush()
+
+        separator = "\n"
+        for piece, piece_tokens in pieces:
+            if current and (current_chars + len(piece) + 1 > max_chars or current_tokens + piece_tokens > max_tokens):
+                yield from flush()
+            if current:
+                current.append(separator)
+                current_chars += 1
+            current.append(piece)
+            current_chars += len(piece)
+            current_tokens += piece_tokens
+            separator = " "
+
+    yield from flush()
+
+
 def keyword_to_title(keyword: str) -> str:
     normalized = normalize_text(keyword.replace("-", " ").replace("_", " "))
     if not normalized:
@@ -128,32 +499,191 @@ def keyword_to_title(keyword: str) -> str:
     return normalized.title()
 
 
-def extract_keywords(text: str, limit: int = 6) -> List[str]:
-    cleaned = normalize_text(text)
-    if not cleaned:
+# Same words as ``[A-Za-z][A-Za-z'-]+`` filtered to more than four characters, matched in one pass.
+KEYWORD_TOKEN_PATTERN = re.compile(r"[A-Za-z][A-Za-z'\-]{4,}")
+KEYWORD_SUFFIXES = (
+    "ations",
+    "ation",
+    "ities",
+    "ments",
+    "ings",
+    "ions",
+    "ment",
+    "ness",
+    "ity",
+    "ing",
+    "ion",
+    "ers",
+    "ies",
+    "ied",
+    "er",
+    "es",
+    "ed",
+    "ly",
+    "s",
+)
+KEYWORD_MIN_STEM_LENGTH = 4
+
+
+def keyword_stem(token: str) -> str:
+    """Crude suffix-stripping stem, enough to treat ``dispute``/``disputes``/``disputed`` as one word."""
+
+    token = token.strip("'-")
+    if token.endswith("'s"):
+        token = token[:-2]
+    for suffix in KEYWORD_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= KEYWORD_MIN_STEM_LENGTH:
+            token = token[: -len(suffix)]
+            break
+    if token.endswith("e") and len(token) > KEYWORD_MIN_STEM_LENGTH:
+        token = token[:-1]
+    return token
+
+
+def _keyword_keys(token: str) -> List[str]:
+    """Stems a keyword claims in the dedup index: its own, plus each part of a hyphenated word."""
+
+    keys = [keyword_stem(token)]
+    if "-" in token:
+        keys.extend(keyword_stem(part) for part in token.split("-") if len(part) > 4)
+    return keys
+
+
+def keyword_candidates(text: str) -> "Counter[str]":
+    """Count the words of ``text`` that can become keywords, in first-seen order."""
+
+    counter = Counter(KEYWORD_TOKEN_PATTERN.findall(text.lower()))
+    for stopword in KEYWORD_STOPWORDS:
+        counter.pop(stopword, None)
+    return counter
+
+
+class KeywordCorpus:
+    """Document frequencies of keyword candidates, used to weight keywords by TF-IDF."""
+
+    def __init__(self) -> None:
+        self.document_count = 0
+        self.document_frequency: Counter = Counter()
+
+    def add_document(self, text: str) -> None:
+        self.document_count += 1
+        self.document_frequency.update(keyword_candidates(text).keys())
+
+    def idf(self, token: str) -> float:
+        return math.log((1 + self.document_count) / (1 + self.document_frequency[token])) + 1.0
+
+
+_keyword_corpus: Optional[KeywordCorpus] = None
+_keyword_corpus_built_at = 0.0
+_keyword_corpus_lock = threading.Lock()
+
+
+def get_keyword_corpus() -> Optional[KeywordCorpus]:
+    """Return the TF-IDF corpus when ``KEYWORD_SCORING=tfidf``, else None.
+
+    The corpus is built from the most recent document chunks stored by background jobs and
+    rebuilt every ``KEYWORD_CORPUS_REFRESH_SECONDS``.
+    """
+
+    global _keyword_corpus, _keyword_corpus_built_at
+
+    if KEYWORD_SCORING != "tfidf":
+        return None
+    with _keyword_corpus_lock:
+        if _keyword_corpus is None or time.time() - _keyword_corpus_built_at > KEYWORD_CORPUS_REFRESH_SECONDS:
+            corpus = KeywordCorpus()
+            rows = get_jobs_connection().execute(
+                "SELECT text FROM job_chunks ORDER BY rowid DESC LIMIT ?", (KEYWORD_CORPUS_MAX_DOCUMENTS,)
+            )
+            for row in rows:
+                corpus.add_document(row["text"])
+            _keyword_corpus, _keyword_corpus_built_at = corpus, time.time()
+        return _keyword_corpus
+
+
+def extract_keywords(text: str, limit: int = 6, corpus: Optional[KeywordCorpus] = None) -> List[str]:
+    """Return up to ``limit`` distinctive words of ``text``, most frequent first.
+
+    Words sharing a stem with an already chosen keyword are skipped. Candidates are pulled
+    lazily from a heap, so the cost is linear in the text plus ``O(log n)`` per candidate
+    examined. With a ``corpus``, counts are weighted by inverse document frequency.
+    """
+
+    if not text:
         return []
 
-    tokens = re.findall(r"[A-Za-z][A-Za-z'\-]+", cleaned.lower())
-    counter = Counter(
-        token for token in tokens if len(token) > 4 and token not in KEYWORD_STOPWORDS
-    )
+    counter = keyword_candidates(text)
+    if corpus is None:
+        heap = [(-count, order, token) for order, (token, count) in enumerate(counter.items())]
+    else:
+        heap = [(-count * corpus.idf(token), order, token) for order, (token, count) in enumerate(counter.items())]
+    heapq.heapify(heap)
 
     keywords: List[str] = []
-    for token, _ in counter.most_common():
-        if any(token in existing or existing in token for existing in keywords):
+    claimed: set = set()
+    while heap and len(keywords) < limit:
+        _, _, token = heapq.heappop(heap)
+        keys = _keyword_keys(token)
+        if claimed.intersection(keys):
             continue
+        claimed.update(keys)
         keywords.append(token)
-        if len(keywords) >= limit:
-            break
 
     return keywords
 
 
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide pooled session used for upstream HTTP calls.
+
+    Connections are kept alive between requests, and idempotent GETs are retried with backoff
+    on connection errors and 429/5xx responses.
+    """
+
+    global _http_session
+
+    with _http_session_lock:
+        if _http_session is None:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=HTTP_MAX_RETRIES,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
 def google_books_search(query: str, max_results: int = GOOGLE_BOOKS_DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+    key = f"{max_results}:{normalize_text(query).lower()}"
+    return books_search_cache.fetch(key, lambda: _search_google_books_upstream(query, max_results))
+
+
+def _search_google_books_upstream(query: str, max_results: int) -> List[Dict[str, Any]]:
     params = {"q": query, "maxResults": max_results}
-    response = requests.get(GOOGLE_BOOKS_SEARCH_URL, params=params, timeout=HTTP_TIMEOUT_SECONDS)
-    response.raise_for_status()
-    payload = response.json()
+    with track_upstream("google_books", "search"):
+        response = get_http_session().get(GOOGLE_BOOKS_SEARCH_URL, params=params, timeout=HTTP_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        payload = response.json()
+    return parse_google_books_results(payload)
+
+
+def parse_google_books_results(payload: Any) -> List[Dict[str, Any]]:
     items = payload.get("items", []) if isinstance(payload, dict) else []
 
     results: List[Dict[str, Any]] = []
@@ -192,62 +722,187 @@ def google_books_search(query: str, max_results: int = GOOGLE_BOOKS_DEFAULT_LIMI
 
 
 def fetch_volume_details(volume_id: str) -> Dict[str, Any]:
-    response = requests.get(
-        f"{GOOGLE_BOOKS_SEARCH_URL}/{volume_id}",
-        params={"projection": "full"},
-        timeout=HTTP_TIMEOUT_SECONDS,
-    )
-    response.raise_for_status()
-    data = response.json()
+    return books_volume_cache.fetch(volume_id, lambda: _fetch_volume_details_upstream(volume_id))
+
+
+def _fetch_volume_details_upstream(volume_id: str) -> Dict[str, Any]:
+    with track_upstream("google_books", "volume"):
+        response = get_http_session().get(
+            f"{GOOGLE_BOOKS_SEARCH_URL}/{volume_id}",
+            params={"projection": "full"},
+            timeout=HTTP_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+        data = response.json()
     if not isinstance(data, dict):
         return {}
     return data
 
 
-def build_chapter_outline(volume_info: Dict[str, Any], limit: int = 7) -> List[Dict[str, Any]]:
-    description = normalize_text(volume_info.get("description"))
-    book_title = normalize_text(volume_info.get("title")) or "the textbook"
+_async_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, List[Any], Iterator[int]]] = {}
 
-    if description:
-        sentences = sentence_split(description)
-        keywords = extract_keywords(description, limit=limit)
-        chapters: List[Dict[str, Any]] = []
-        used_sentences: set[str] = set()
-
-        for index, keyword in enumerate(keywords, start=1):
-            summary = next(
-                (
-                    sentence
-                    for sentence in sentences
-                    if keyword.lower() in sentence.lower() and sentence not in used_sentences
-                ),
-                None,
-            )
 
-            if summary is None and sentences:
-                summary = sentences[(index - 1) % len(sentences)]
+def _loop_client(name: str, factory: Callable[[], Any]) -> Any:
+    """Return one of the running event loop's ``name`` clients, creating them on first use.
 
-            if summary:
-                used_sentences.add(summary)
-            else:
-                summary = f"{keyword_to_title(keyword)} is introduced as part of {book_title}."
+    httpx async connections belong to the loop that opened them, so each loop gets its own
+    clients. Calls rotate over ``ASYNC_POOL_SHARDS`` of them because httpcore scans its whole
+    pool on every request and response; small pools keep that cheap with hundreds in flight.
+    """
 
-            chapters.append(
-                {
-                    "index": index,
-                    "title": keyword_to_title(keyword),
-                    "summary": summary,
-                }
-            )
+    loop = asyncio.get_running_loop()
+    cached = _async_clients.get(name)
+    if cached is None or cached[0] is not loop:
+        clients = [factory() for _ in range(ASYNC_POOL_SHARDS)]
+        cached = (loop, clients, itertools.cycle(range(len(clients))))
+        _async_clients[name] = cached
+    return cached[1][next(cached[2])]
 
-        if chapters:
-            return chapters[:limit]
 
-        if sentences:
-            return [
-                {"index": idx + 1, "title": f"Key Concept {idx + 1}", "summary": sentence}
-                for idx, sentence in enumerate(sentences[:limit])
-            ]
+def _async_pool_limits() -> httpx.Limits:
+    connections = max(1, ASYNC_POOL_MAX_CONNECTIONS // ASYNC_POOL_SHARDS)
+    return httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+
+async def close_async_clients() -> None:
+    """Close the clients opened on the running loop (ASGI lifespan shutdown)."""
+
+    loop = asyncio.get_running_loop()
+    for name, (owner, clients, _) in list(_async_clients.items()):
+        if owner is loop:
+            del _async_clients[name]
+            for client in clients:
+                await (client.close() if isinstance(client, openai.AsyncOpenAI) else client.aclose())
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    return _loop_client("books", lambda: httpx.AsyncClient(timeout=HTTP_TIMEOUT_SECONDS, limits=_async_pool_limits()))
+
+
+async def _books_get_async(url: str, params: Dict[str, Any]) -> Any:
+    """GET a Google Books URL with the same retry policy as the shared requests session."""
+
+    attempt = 0
+    while True:
+        try:
+            response = await get_async_http_client().get(url, params=params)
+            if response.status_code not in (429, 500, 502, 503, 504) or attempt >= HTTP_MAX_RETRIES:
+                response.raise_for_status()
+                return response.json()
+        except httpx.TransportError:
+            if attempt >= HTTP_MAX_RETRIES:
+                raise
+        await asyncio.sleep(0.3 * (2 ** attempt))
+        attempt += 1
+
+
+async def google_books_search_async(query: str, max_results: int = GOOGLE_BOOKS_DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+    async def load() -> List[Dict[str, Any]]:
+        with track_upstream("google_books", "search"):
+            payload = await _books_get_async(GOOGLE_BOOKS_SEARCH_URL, {"q": query, "maxResults": max_results})
+        return parse_google_books_results(payload)
+
+    key = f"{max_results}:{normalize_text(query).lower()}"
+    return await books_search_cache.fetch_async(key, load)
+
+
+async def fetch_volume_details_async(volume_id: str) -> Dict[str, Any]:
+    async def load() -> Dict[str, Any]:
+        with track_upstream("google_books", "volume"):
+            data = await _books_get_async(f"{GOOGLE_BOOKS_SEARCH_URL}/{volume_id}", {"projection": "full"})
+        return data if isinstance(data, dict) else {}
+
+    return await books_volume_cache.fetch_async(volume_id, load)
+
+
+class SentenceIndex:
+    """Inverted index from keywords to the sentences that mention them, in document order.
+
+    A sentence mentions a keyword when one of its words starts with it, so ``dispute`` also
+    finds ``disputes``. Each sentence is lowercased and tokenised once; words are matched to
+    keywords by range lookups in the sorted vocabulary rather than by comparing every pair.
+    """
+
+    def __init__(self, sentences: List[str], keywords: Iterable[str]) -> None:
+        self.sentences = sentences
+        token_lists = [KEYWORD_TOKEN_PATTERN.findall(sentence.lower()) for sentence in sentences]
+        vocabulary = sorted(set(itertools.chain.from_iterable(token_lists)))
+
+        owners: Dict[str, List[str]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        for keyword in keywords:
+            self._postings[keyword] = []
+            position = bisect.bisect_left(vocabulary, keyword)
+            while position < len(vocabulary) and vocabulary[position].startswith(keyword):
+                owners.setdefault(vocabulary[position], []).append(keyword)
+                position += 1
+
+        wanted = owners.keys()
+        for sentence_index, tokens in enumerate(token_lists):
+            for token in wanted & set(tokens):
+                for keyword in owners[token]:
+                    postings = self._postings[keyword]
+                    if not postings or postings[-1] != sentence_index:
+                        postings.append(sentence_index)
+
+    def first_unused(self, keyword: str, used: set) -> Optional[int]:
+        """Position of the earliest sentence mentioning ``keyword`` that is not in ``used``."""
+
+        for position in self._postings.get(keyword, ()):
+            if position not in used:
+                return position
+        return None
+
+
+def outline_text(text: str, limit: int = OUTLINE_DEFAULT_CHAPTERS) -> List[Dict[str, Any]]:
+    """Turn free text into up to ``limit`` keyword chapters, each summarised by a sentence that mentions it.
+
+    Sentences are lowercased and tokenised once into a :class:`SentenceIndex`, so each keyword is
+    a dictionary lookup rather than a scan of the whole text; this keeps whole uploaded documents
+    and outlines of hundreds of chapters cheap.
+    """
+
+    sentences = sentence_split(text)
+    if not sentences:
+        return []
+
+    keywords = extract_keywords(text, limit=limit, corpus=get_keyword_corpus())
+    index = SentenceIndex(sentences, keywords)
+    chapters: List[Dict[str, Any]] = []
+    used_sentences: set = set()
+
+    for chapter_index, keyword in enumerate(keywords, start=1):
+        position = index.first_unused(keyword, used_sentences)
+        if position is None:
+            position = (chapter_index - 1) % len(sentences)
+        used_sentences.add(position)
+        chapters.append(
+            {
+                "index": chapter_index,
+                "title": keyword_to_title(keyword),
+                "summary": sentences[position],
+            }
+        )
+
+    if chapters:
+        return chapters[:limit]
+
+    return [
+        {"index": idx + 1, "title": f"Key Concept {idx + 1}", "summary": sentence}
+        for idx, sentence in enumerate(sentences[:limit])
+    ]
+
+
+def build_chapter_outline(
+    volume_info: Dict[str, Any], limit: int = OUTLINE_DEFAULT_CHAPTERS
+) -> List[Dict[str, Any]]:
+    description = normalize_text(volume_info.get("description"))
+    book_title = normalize_text(volume_info.get("title")) or "the textbook"
+
+    if description:
+        chapters = outline_text(description, limit)
+        if chapters:
+            return chapters
 
     categories = [keyword_to_title(category.split("/")[-1]) for category in volume_info.get("categories", [])]
 
@@ -306,7 +961,7 @@ def generate_flashcards(
             }
         )
 
-    keywords = extract_keywords(chapter_summary or chapter_title, limit=3)
+    keywords = extract_keywords(chapter_summary or chapter_title, limit=3, corpus=get_keyword_corpus())
     if keywords:
         flashcards.append(
             {
@@ -353,28 +1008,143 @@ def generate_flashcards(
     return filtered_cards
 
 
-def extract_text_from_file(file: Any) -> str:
+def deck_file_path(deck_name: str) -> Optional[Path]:
+    if not DECK_NAME_PATTERN.match(deck_name or ""):
+        return None
+    return DATA_DIR / f"{deck_name}_deck.json"
+
+
+deck_cache = DeckFileCache(DECK_CACHE_MAX_BYTES, app.json.dumps)
+deck_store = DeckStore(DECKS_DB_FILE, DATA_DIR)
+
+
+def build_dedupe_index(deck_name: Optional[str] = None) -> NearDuplicateIndex:
+    """Return an index seeded with an existing deck's cards, if ``deck_name`` is given.
+
+    Raises ``LookupError`` when the named deck does not exist.
+    """
+
+    index = NearDuplicateIndex()
+    if deck_name:
+        path = deck_file_path(deck_name)
+        compiled = deck_cache.get(path) if path is not None else None
+        if compiled is None:
+            raise LookupError(deck_name)
+        index.add_cards(card for card in compiled.deck.get("flashcards", []) if isinstance(card, dict))
+    return index
+
+
+_pdf_extract_pool: Optional[ProcessPoolExecutor] = None
+_pdf_extract_pool_lock = threading.Lock()
+
+
+def get_pdf_extract_pool() -> ProcessPoolExecutor:
+    global _pdf_extract_pool
+
+    with _pdf_extract_pool_lock:
+        if _pdf_extract_pool is None:
+            # Spawned workers avoid forking a process that already runs request and job threads.
+            _pdf_extract_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_extract_pool
+
+
+def _reset_pdf_extract_pool() -> None:
+    global _pdf_extract_pool
+
+    with _pdf_extract_pool_lock:
+        if _pdf_extract_pool is not None:
+            _pdf_extract_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_extract_pool = None
+
+
+def extract_pdf_page_range(path: str, start: int, stop: int) -> List[Tuple[str, float]]:
+    """Return the normalized text of pages ``start``..``stop`` and the seconds each took (runs in a worker process)."""
+
+    reader = pypdf.PdfReader(path)
+    pages: List[Tuple[str, float]] = []
+    for index in range(start, stop):
+        started = time.perf_counter()
+        extracted = normalize_text(reader.pages[index].extract_text())
+        pages.append((extracted, time.perf_counter() - started))
+    return pages
+
+
+def iter_pdf_text_parallel(stream: Any, page_count: int) -> Iterator[str]:
+    """Extract PDF pages across the process pool, yielding page text in page order."""
+
+    source_path = getattr(stream, "name", None)
+    temp_path: Optional[str] = None
+    if not isinstance(source_path, str) or not os.path.isfile(source_path):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as handle:
+            stream.seek(0)
+            shutil.copyfileobj(stream, handle)
+            temp_path = source_path = handle.name
+
+    pages_per_task = max(PDF_MIN_PAGES_PER_TASK, math.ceil(page_count / (PDF_EXTRACT_WORKERS * 4)))
+    try:
+        pool = get_pdf_extract_pool()
+        futures = [
+            pool.submit(extract_pdf_page_range, source_path, start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, pages_per_task)
+        ]
+        try:
+            for future in futures:
+                for extracted, seconds in future.result():
+                    phase_seconds.observe(seconds, "extract_pdf_page")
+                    if extracted:
+                        yield extracted
+        except BrokenProcessPool:
+            _reset_pdf_extract_pool()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+
+def iter_text_from_file(file: Any) -> Iterator[str]:
+    """Yield normalized text page by page (PDF), paragraph by paragraph (DOCX) or line by line."""
+
     filename = normalize_text(getattr(file, "filename", "")) or "document"
     lower_name = filename.lower()
+    file.stream.seek(0)
 
     if lower_name.endswith(".pdf"):
-        file.stream.seek(0)
-        reader = PdfReader(file.stream)
-        text_parts: List[str] = []
+        reader = pypdf.PdfReader(file.stream)
+        page_count = len(reader.pages)
+        if PDF_EXTRACT_WORKERS > 1 and page_count >= PDF_PARALLEL_PAGE_THRESHOLD:
+            yield from iter_pdf_text_parallel(file.stream, page_count)
+            return
+
         for page in reader.pages:
-            extracted = page.extract_text() or ""
+            with phase_seconds.timer("extract_pdf_page"):
+                extracted = normalize_text(page.extract_text())
             if extracted:
-                text_parts.append(extracted)
-        return "\n".join(text_parts)
+                yield extracted
+        return
 
     if lower_name.endswith(".docx"):
-        file.stream.seek(0)
-        buffer = BytesIO(file.read())
-        document = Document(buffer)
-        return "\n".join(paragraph.text for paragraph in document.paragraphs)
+        with phase_seconds.timer("extract_docx"):
+            document = docx.Document(file.stream)
+        for paragraph in document.paragraphs:
+            extracted = normalize_text(paragraph.text)
+            if extracted:
+                yield extracted
+        return
 
-    file.stream.seek(0)
-    return file.read().decode("utf-8", errors="ignore")
+    for line in file.stream:
+        extracted = normalize_text(line.decode("utf-8", errors="ignore"))
+        if extracted:
+            yield extracted
+
+
+def extract_text_from_file(file: Any) -> str:
+    return "\n".join(iter_text_from_file(file))
 
 
 def build_flashcard_prompt(text: str, source: str) -> str:
@@ -450,24 +1220,13 @@ def build_topic_flashcard_prompt(topic: str, difficulty: str) -> str:
 
 
 def parse_flashcard_response(raw_response: str, source: str) -> List[Dict[str, Any]]:
-    cleaned = raw_response.strip()
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```[a-zA-Z]*", "", cleaned, count=1).strip()
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3].strip()
+    with phase_seconds.timer("parse_response"):
+        return _parse_flashcard_items(raw_response, source)
 
-    try:
-        data = json.loads(cleaned)
-    except json.JSONDecodeError:
-        return []
-
-    if not isinstance(data, list):
-        return []
 
+def _parse_flashcard_items(raw_response: str, source: str) -> List[Dict[str, Any]]:
     parsed: List[Dict[str, Any]] = []
-    for item in data:
-        if not isinstance(item, dict):
-            continue
+    for item in StreamingCardParser().feed(raw_response):
         question = normalize_text(item.get("question"))
         answer = normalize_text(item.get("answer"))
         tags = item.get("tags") or []
@@ -487,196 +1246,1172 @@ def parse_flashcard_response(raw_response: str, source: str) -> List[Dict[str, A
     return parsed
 
 
-def _extract_json_object(text: str) -> Optional[Any]:
-    """Return the first valid JSON object embedded in free-form text."""
-
-    start_idx: Optional[int] = None
-    depth = 0
-    in_string = False
-    escape_next = False
+def _outer_array_objects(value: Any, in_array: bool = False) -> Iterator[Dict[str, Any]]:
+    if isinstance(value, dict):
+        if in_array:
+            yield value
+            return
+        for item in value.values():
+            yield from _outer_array_objects(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _outer_array_objects(item, in_array=True)
+
+
+class StreamingCardParser:
+    """Return each card object from streamed model output as soon as it closes, surviving truncation."""
+
+    # A complete string literal, a bracket, or the opening quote of a string still streaming in.
+    _TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"')
+    _ROOT_START = re.compile(r"[{\[]")
+    _decoder = json.JSONDecoder()
+
+    def __init__(self) -> None:
+        self.root: Any = None
+        self.done = False
+        # Everything fed so far, joined only to decode the root; scanning works on ``_window``,
+        # the unconsumed tail starting at the open card (or scan position), so each feed costs
+        # time proportional to the fragment rather than to the whole output.
+        self._fragments: List[str] = []
+        self._window = ""
+        self._offset = 0
+        self._position = 0
+        self._stack: List[str] = []
+        self._root_start: Optional[int] = None
+        self._card_start: Optional[int] = None
+        self._card_depth = 0
+
+    @property
+    def truncated(self) -> bool:
+        return self._root_start is not None and not self.done
+
+    def _decode_root(self, end: Optional[int] = None) -> bool:
+        text = "".join(self._fragments)
+        try:
+            if end is None:
+                self.root, _ = self._decoder.raw_decode(text, self._root_start)
+            else:
+                self.root = json.loads(text[self._root_start : end])
+        except json.JSONDecodeError:
+            self.root = None
+            return False
+        return True
+
+    def feed(self, fragment: str) -> List[Dict[str, Any]]:
+        if self.done or not fragment:
+            return []
+        self._fragments.append(fragment)
+        window = self._window + fragment
+        position = self._position
+
+        if self._root_start is None:
+            match = self._ROOT_START.search(window, position)
+            if match is None:
+                self._offset += len(window)
+                self._window, self._position = "", 0
+                return []
+            position = match.start()
+            self._root_start = self._offset + position
+            if self._decode_root():
+                self.done = True
+                return list(_outer_array_objects(self.root))
+
+        stack = self._stack
+        cards: List[Dict[str, Any]] = []
+
+        for match in self._TOKEN.finditer(window, position):
+            token = match.group()
+            if token[0] == '"':
+                if len(token) == 1:
+                    # The string is still open; resume from its opening quote next time.
+                    position = match.start()
+                    break
+                position = match.end()
+                continue
 
-    for idx, char in enumerate(text):
-        if in_string:
-            if escape_next:
-                escape_next = False
+            position = match.end()
+            if token in "{[":
+                if stack and token == "{" and self._card_start is None and stack[-1] == "[":
+                    self._card_start, self._card_depth = match.start(), len(stack)
+                stack.append(token)
                 continue
-            if char == "\\":
-                escape_next = True
+            if not stack:
                 continue
-            if char == '"':
-                in_string = False
-            continue
-
-        if char == '"':
-            in_string = True
-            continue
 
-        if char == '{':
-            if depth == 0:
-                start_idx = idx
-            depth += 1
-            continue
-
-        if char == '}' and depth:
-            depth -= 1
-            if depth == 0 and start_idx is not None:
-                candidate = text[start_idx : idx + 1]
+            stack.pop()
+            if self._card_start is not None and len(stack) == self._card_depth:
                 try:
-                    return json.loads(candidate)
+                    card = json.loads(window[self._card_start : position])
                 except json.JSONDecodeError:
-                    start_idx = None
+                    card = None
+                if isinstance(card, dict):
+                    cards.append(card)
+                self._card_start = None
+            if not stack:
+                self._decode_root(self._offset + position)
+                self.done = True
+                break
+        else:
+            position = len(window)
 
-    return None
+        keep = self._card_start if self._card_start is not None else position
+        self._window = window[keep:]
+        self._offset += keep
+        self._position = position - keep
+        if self._card_start is not None:
+            self._card_start = 0
+        return cards
 
 
-def call_openai_flashcards(chunks: Sequence[str], source: str) -> List[Dict[str, Any]]:
+_openai_clients: Dict[str, openai.OpenAI] = {}
+_openai_clients_lock = threading.Lock()
+
+
+def get_openai_client() -> openai.OpenAI:
+    """Return a shared OpenAI client so requests reuse pooled keep-alive connections."""
+
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not configured.")
 
-    client = OpenAI(api_key=api_key)
-    flashcards: List[Dict[str, Any]] = []
+    with _openai_clients_lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            http_client = openai.DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_POOL_MAX_KEEPALIVE,
+                )
+            )
+            # Retries are handled by create_chat_completion so backoff stays consistent across callers.
+            client = openai.OpenAI(api_key=api_key, max_retries=0, http_client=http_client)
+            _openai_clients[api_key] = client
+        return client
 
-    for chunk in chunks:
-        prompt = build_flashcard_prompt(chunk, source)
-        response = client.chat.completions.create(
-            model=DEFAULT_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=1200,
-        )
 
-        content = response.choices[0].message.content if response.choices else ""
-        parsed_cards = parse_flashcard_response(content or "[]", source)
-        flashcards.extend(parsed_cards[:MAX_FLASHCARDS_PER_CHUNK])
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """Return the running event loop's OpenAI client, sized for many concurrent requests."""
 
-    return flashcards
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY is not configured.")
 
+    return _loop_client(
+        f"openai:{api_key}",
+        lambda: openai.AsyncOpenAI(
+            api_key=api_key,
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(limits=_async_pool_limits()),
+        ),
+    )
 
-def parse_topic_flashcard_response(raw_response: str, topic: str, difficulty: str) -> Dict[str, Any]:
-    cleaned = raw_response.strip()
-    if cleaned.startswith("```"):
-        cleaned = re.sub(r"^```[a-zA-Z]*", "", cleaned, count=1).strip()
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3].strip()
 
-    parsed_json: Optional[Any]
-    try:
-        parsed_json = json.loads(cleaned)
-    except json.JSONDecodeError:
-        parsed_json = _extract_json_object(cleaned)
+openai_rate_limiter = OpenAIRateLimiter(
+    SharedRateBudget(
+        RATE_LIMIT_DB_FILE, {"requests": OPENAI_RPM_LIMIT, "tokens": OPENAI_TPM_LIMIT}, OPENAI_RATE_BURST_SECONDS
+    )
+    if OPENAI_RPM_LIMIT > 0 or OPENAI_TPM_LIMIT > 0
+    else None,
+    AdaptiveConcurrencyLimit(OPENAI_MAX_IN_FLIGHT, decrease_interval=OPENAI_CONCURRENCY_DECREASE_INTERVAL_SECONDS),
+    count_tokens,
+)
+
+
+def chat_completion_options(
+    prompt: str, temperature: float, max_tokens: int, timeout: float, stream: bool
+) -> Dict[str, Any]:
+    """Keyword arguments for ``chat.completions.create``; streams also ask for a final usage chunk."""
+
+    options: Dict[str, Any] = {
+        "model": DEFAULT_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "timeout": timeout,
+    }
+    if stream:
+        options.update(stream=True, stream_options={"include_usage": True})
+    return options
 
-    if parsed_json is None:
-        return {"topic": topic, "difficulty": difficulty, "flashcards": []}
 
-    data = parsed_json
+def completion_retry_delay(exc: Exception, attempt: int) -> Optional[float]:
+    """Seconds to back off before retrying ``exc``, or None once ``OPENAI_MAX_RETRIES`` are used up."""
 
-    if not isinstance(data, dict):
-        if isinstance(data, list):
-            data = {"topic": topic, "difficulty": difficulty, "flashcards": data}
-        else:
-            return {"topic": topic, "difficulty": difficulty, "flashcards": []}
+    if attempt >= OPENAI_MAX_RETRIES:
+        return None
+    delay = retry_delay(attempt, exc)
+    app.logger.warning("OpenAI request failed (%s); retrying in %.1fs", type(exc).__name__, delay)
+    return delay
 
-    parsed_topic = normalize_text(data.get("topic")) or topic
-    parsed_difficulty = (normalize_text(data.get("difficulty")) or difficulty).lower()
-    flashcards = data.get("flashcards")
 
-    if not isinstance(flashcards, list):
-        flashcards = []
+def completion_text(response: Any) -> str:
+    return (response.choices[0].message.content if response.choices else "") or ""
 
-    normalized_cards: List[Dict[str, Any]] = []
-    seen_fronts: set[str] = set()
 
-    min_cards, max_cards = TOPIC_CARD_RANGES.get(
-        parsed_difficulty, TOPIC_CARD_RANGES[DEFAULT_TOPIC_DIFFICULTY]
-    )
+def create_chat_completion(
+    client: openai.OpenAI,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    timeout: float = OPENAI_REQUEST_TIMEOUT_SECONDS,
+    stream: bool = False,
+) -> Any:
+    """Call the chat completions API, retrying rate limits and timeouts with backoff.
 
-    for idx, card in enumerate(flashcards):
-        if not isinstance(card, dict):
-            continue
+    Every attempt waits its turn in ``openai_rate_limiter`` first. With ``stream=True`` only
+    opening the stream is retried, and the chunks come back as a :class:`MeteredStream` that
+    holds the slot until it is read to the end or closed.
+    """
 
-        front = normalize_text(card.get("front"))
-        back = normalize_text(card.get("back"))
+    options = chat_completion_options(prompt, temperature, max_tokens, timeout, stream)
+    reserved_tokens = openai_rate_limiter.estimate_tokens(prompt, max_tokens)
+    attempt = 0
+    while True:
+        try:
+            openai_rate_limiter.acquire(reserved_tokens)
+            try:
+                with track_upstream("openai", "chat_stream" if stream else "chat"):
+                    raw_response = client.chat.completions.with_raw_response.create(**options)
+                openai_rate_limiter.observe(raw_response.headers)
+                response = raw_response.parse()
+            except BaseException as exc:
+                openai_rate_limiter.release(exc)
+                raise
+            if stream:
+                return MeteredStream(response, openai_rate_limiter, reserved_tokens)
+            openai_rate_limiter.release()
+            record_openai_usage(response.usage)
+            openai_rate_limiter.settle(reserved_tokens, response.usage)
+            return response
+        except (openai.RateLimitError, openai.APITimeoutError) as exc:
+            delay = completion_retry_delay(exc, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+
+
+async def create_chat_completion_async(
+    client: openai.AsyncOpenAI,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    timeout: float = OPENAI_REQUEST_TIMEOUT_SECONDS,
+    stream: bool = False,
+) -> Any:
+    """Async :func:`create_chat_completion`: the same request and backoff, awaited on the event loop."""
+
+    options = chat_completion_options(prompt, temperature, max_tokens, timeout, stream)
+    reserved_tokens = openai_rate_limiter.estimate_tokens(prompt, max_tokens)
+    attempt = 0
+    while True:
+        try:
+            await openai_rate_limiter.acquire_async(reserved_tokens)
+            try:
+                with track_upstream("openai", "chat_stream" if stream else "chat"):
+                    raw_response = await client.chat.completions.with_raw_response.create(**options)
+                openai_rate_limiter.observe(raw_response.headers)
+                response = raw_response.parse()
+            except BaseException as exc:
+                await openai_rate_limiter.release_async(exc)
+                raise
+            if stream:
+                return MeteredStream(response, openai_rate_limiter, reserved_tokens)
+            await openai_rate_limiter.release_async()
+            record_openai_usage(response.usage)
+            await asyncio.to_thread(openai_rate_limiter.settle, reserved_tokens, response.usage)
+            return response
+        except (openai.RateLimitError, openai.APITimeoutError) as exc:
+            delay = completion_retry_delay(exc, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+class CompletionRequest:
+    """The generation-cache and ``completion_flights`` bookkeeping for one completion.
+
+    Shared by the completion helpers below, whose sync and async forms differ only in how they
+    call OpenAI and wait; the async ones run the cache reads and writes in a worker thread.
+    """
 
-        if not front or not back:
-            continue
+    def __init__(self, prompt: str, temperature: float, max_tokens: int, cache_mode: str) -> None:
+        self.prompt = prompt
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.cache_mode = cache_mode
+        self.key = generation_cache_key(prompt, temperature=temperature, max_tokens=max_tokens)
+        # Unless the cache is bypassed, concurrent requests for the same completion share one call.
+        self.coalesced = cache_mode != "bypass"
+        self.flight: Optional[Future] = None
+        self._fragments: List[str] = []
+
+    def cached(self) -> Optional[str]:
+        return generation_cache.get(self.key) if self.cache_mode == "use" else None
+
+    def recheck(self) -> Optional[str]:
+        return generation_cache.get(self.key)
+
+    def store(self, content: str) -> str:
+        if content.strip() and self.cache_mode != "bypass":
+            generation_cache.set(self.key, content)
+        return content
+
+    def join(self) -> Optional[Future]:
+        """The flight to wait for, or None when this caller leads it and must :meth:`publish` the result."""
+
+        flight, leading = completion_flights.begin(self.key)
+        if leading:
+            self.flight = flight
+            return None
+        return flight
+
+    def add(self, event: Any) -> Optional[str]:
+        """Record one streamed chunk and return its text."""
+
+        delta = event.choices[0].delta.content if event.choices else None
+        if delta:
+            self._fragments.append(delta)
+        return delta
+
+    def streamed(self) -> str:
+        return "".join(self._fragments)
+
+    def publish(self, content: Optional[str] = None, error: Optional[BaseException] = None) -> None:
+        if self.flight is not None:
+            completion_flights.finish(self.key, self.flight, content, error=error)
+
+
+def cached_completion_content(
+    client: openai.OpenAI,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    cache_mode: str = "use",
+) -> str:
+    """Return the completion text for ``prompt``, served from the generation cache when possible.
+
+    Unless ``cache_mode`` is ``bypass``, concurrent calls with the same prompt and parameters
+    share one request through ``completion_flights``.
+    """
 
-        normalized_front = front.lower()
-        if normalized_front in seen_fronts:
-            continue
-        seen_fronts.add(normalized_front)
+    request = CompletionRequest(prompt, temperature, max_tokens, cache_mode)
+    cached = request.cached()
+    if cached is not None:
+        return cached
+
+    def load() -> str:
+        response = create_chat_completion(client, prompt, temperature=temperature, max_tokens=max_tokens)
+        return request.store(completion_text(response))
+
+    if not request.coalesced:
+        return load()
+    return completion_flights.do(request.key, load, request.recheck)
+
+
+async def cached_completion_content_async(
+    client: openai.AsyncOpenAI,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    cache_mode: str = "use",
+) -> str:
+    request = CompletionRequest(prompt, temperature, max_tokens, cache_mode)
+    cached = await asyncio.to_thread(request.cached)
+    if cached is not None:
+        return cached
+
+    async def load() -> str:
+        response = await create_chat_completion_async(client, prompt, temperature=temperature, max_tokens=max_tokens)
+        return await asyncio.to_thread(request.store, completion_text(response))
+
+    if not request.coalesced:
+        return await load()
+    return await completion_flights.do_async(request.key, load, request.recheck)
+
+
+def iter_completion_content(
+    client: openai.OpenAI,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    cache_mode: str = "use",
+) -> Iterator[str]:
+    """Yield the completion text for ``prompt`` fragment by fragment as the model streams it.
+
+    A cached completion is yielded whole. A streamed one is stored in the generation cache
+    once it has been read to the end, exactly as :func:`cached_completion_content` would.
+    While the same completion is already being generated in this process, the result of
+    that request is waited for and yielded whole as well.
+    """
 
-        category = normalize_text(card.get("category")) or "concept"
-        example = normalize_text(card.get("example"))
-        card_id = normalize_text(card.get("id")) or f"auto-{idx + 1}"
+    request = CompletionRequest(prompt, temperature, max_tokens, cache_mode)
+    cached = request.cached()
+    if cached is not None:
+        yield cached
+        return
 
-        normalized_cards.append(
-            {
-                "id": card_id,
-                "front": front,
-                "back": back,
-                "example": example,
-                "category": category,
-            }
+    while request.coalesced:
+        flight = request.join()
+        if flight is None:
+            break
+        try:
+            content = flight.result()
+        except FlightAbandoned:
+            continue
+        yield content
+        return
+
+    try:
+        stream = create_chat_completion(client, prompt, temperature=temperature, max_tokens=max_tokens, stream=True)
+        try:
+            for event in stream:
+                delta = request.add(event)
+                if delta:
+                    yield delta
+        finally:
+            stream.close()
+        content = request.store(request.streamed())
+    except BaseException as exc:
+        request.publish(error=exc)
+        raise
+    request.publish(content)
+
+
+async def iter_completion_content_async(
+    client: openai.AsyncOpenAI,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    cache_mode: str = "use",
+) -> AsyncIterator[str]:
+    request = CompletionRequest(prompt, temperature, max_tokens, cache_mode)
+    cached = await asyncio.to_thread(request.cached)
+    if cached is not None:
+        yield cached
+        return
+
+    while request.coalesced:
+        flight = request.join()
+        if flight is None:
+            break
+        try:
+            content = await asyncio.wrap_future(flight)
+        except FlightAbandoned:
+            continue
+        yield content
+        return
+
+    try:
+        stream = await create_chat_completion_async(
+            client, prompt, temperature=temperature, max_tokens=max_tokens, stream=True
         )
+        try:
+            async for event in stream:
+                delta = request.add(event)
+                if delta:
+                    yield delta
+        finally:
+            await stream.aclose()
+        content = await asyncio.to_thread(request.store, request.streamed())
+    except BaseException as exc:
+        request.publish(error=exc)
+        raise
+    request.publish(content)
+
+
+def chunk_flashcards(content: str, source: str) -> List[Dict[str, Any]]:
+    return parse_flashcard_response(content or "[]", source)[:MAX_FLASHCARDS_PER_CHUNK]
+
+
+def generate_chunk_flashcards(
+    client: openai.OpenAI,
+    chunk: str,
+    source: str,
+    cache_mode: str = "use",
+) -> List[Dict[str, Any]]:
+    prompt = build_flashcard_prompt(chunk, source)
+    content = cached_completion_content(client, prompt, **CHUNK_COMPLETION_PARAMS, cache_mode=cache_mode)
+    return chunk_flashcards(content, source)
+
+
+async def generate_chunk_flashcards_async(
+    client: openai.AsyncOpenAI,
+    chunk: str,
+    source: str,
+    cache_mode: str = "use",
+) -> List[Dict[str, Any]]:
+    prompt = build_flashcard_prompt(chunk, source)
+    content = await cached_completion_content_async(client, prompt, **CHUNK_COMPLETION_PARAMS, cache_mode=cache_mode)
+    return await asyncio.to_thread(chunk_flashcards, content, source)
+
+
+def iter_openai_flashcards(
+    chunks: Iterable[str],
+    source: str,
+    concurrency: int = OPENAI_MAX_CONCURRENCY,
+    cache_mode: str = "use",
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the flashcards for each chunk in chunk order.
+
+    Up to ``concurrency`` chunks are in flight at once; ``chunks`` is consumed lazily so
+    callers can feed it from a generator.
+    """
+
+    client = get_openai_client()
+    window = max(1, concurrency)
+    pending: Deque[Future] = deque()
+
+    with ThreadPoolExecutor(max_workers=window, thread_name_prefix="flashcards") as executor:
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(generate_chunk_flashcards, client, chunk, source, cache_mode))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def iter_openai_flashcards_async(
+    chunks: Iterator[str],
+    source: str,
+    concurrency: int = OPENAI_MAX_CONCURRENCY,
+    cache_mode: str = "use",
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Async :func:`iter_openai_flashcards`: requests run as tasks on the event loop.
+
+    ``chunks`` is still a blocking generator (it parses the upload), so each chunk is pulled
+    in a worker thread to keep the loop free for other requests.
+    """
+
+    client = get_async_openai_client()
+    window = max(1, concurrency)
+    pending: Deque["asyncio.Task[List[Dict[str, Any]]]"] = deque()
+
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            pending.append(asyncio.ensure_future(generate_chunk_flashcards_async(client, chunk, source, cache_mode)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def call_openai_flashcards(
+    chunks: Iterable[str],
+    source: str,
+    concurrency: int = OPENAI_MAX_CONCURRENCY,
+    cache_mode: str = "use",
+    dedupe_index: Optional[NearDuplicateIndex] = None,
+) -> List[Dict[str, Any]]:
+    flashcards: List[Dict[str, Any]] = []
+    for chunk_cards in iter_openai_flashcards(chunks, source, concurrency=concurrency, cache_mode=cache_mode):
+        flashcards.extend(dedupe_index.filter_cards(chunk_cards) if dedupe_index is not None else chunk_cards)
+
+    return flashcards
+
+
+async def call_openai_flashcards_async(
+    chunks: Iterator[str],
+    source: str,
+    concurrency: int = OPENAI_MAX_CONCURRENCY,
+    cache_mode: str = "use",
+    dedupe_index: Optional[NearDuplicateIndex] = None,
+) -> List[Dict[str, Any]]:
+    flashcards: List[Dict[str, Any]] = []
+    chunk_results = iter_openai_flashcards_async(chunks, source, concurrency=concurrency, cache_mode=cache_mode)
+    async for chunk_cards in chunk_results:
+        flashcards.extend(dedupe_index.filter_cards(chunk_cards) if dedupe_index is not None else chunk_cards)
+
+    return flashcards
+
+
+def normalize_topic_card(card: Dict[str, Any], position: int) -> Optional[Dict[str, Any]]:
+    """Clean one model-written topic card, or return None if it lacks a front or back."""
+
+    front = normalize_text(card.get("front"))
+    back = normalize_text(card.get("back"))
+
+    if not front or not back:
+        return None
+
+    return {
+        "id": normalize_text(card.get("id")) or f"auto-{position + 1}",
+        "front": front,
+        "back": back,
+        "example": normalize_text(card.get("example")),
+        "category": normalize_text(card.get("category")) or "concept",
+    }
+
+
+def topic_placeholder_card(topic: str) -> Dict[str, Any]:
+    return {
+        "id": "auto-1",
+        "front": f"What is {topic}?",
+        "back": f"A concise overview of {topic}.",
+        "example": "",
+        "category": "definition",
+    }
+
+
+def topic_fill_cards(topic: str, difficulty: str, count: int) -> List[Dict[str, Any]]:
+    """Generic cards that top a set up to the difficulty's minimum when the model returned too few."""
+
+    min_cards, max_cards = TOPIC_CARD_RANGES.get(difficulty, TOPIC_CARD_RANGES[DEFAULT_TOPIC_DIFFICULTY])
+    missing = max(0, min(min_cards, max_cards) - count)
+    return [
+        {
+            "id": f"auto-fill-{index + 1}",
+            "front": f"Key idea {index + 1} about {topic}",
+            "back": f"A core concept for {topic} at the {difficulty} level.",
+            "example": "",
+            "category": "concept",
+        }
+        for index in range(missing)
+    ]
+
+
+def parse_topic_flashcard_response(raw_response: str, topic: str, difficulty: str) -> Dict[str, Any]:
+    parser = StreamingCardParser()
+    recovered = parser.feed(raw_response)
+    data = parser.root
+
+    if isinstance(data, list):
+        data = {"topic": topic, "difficulty": difficulty, "flashcards": data}
+    elif not isinstance(data, dict):
+        if not recovered:
+            return {"topic": topic, "difficulty": difficulty, "flashcards": []}
+        # Malformed or cut off: keep every card that completed before the damage.
+        data = {"topic": topic, "difficulty": difficulty, "flashcards": recovered}
+
+    parsed_topic = normalize_text(data.get("topic")) or topic
+    parsed_difficulty = (normalize_text(data.get("difficulty")) or difficulty).lower()
+    flashcards = data.get("flashcards")
+
+    if not isinstance(flashcards, list):
+        flashcards = []
+
+    normalized_cards: List[Dict[str, Any]] = []
+    seen_fronts: set[str] = set()
+
+    min_cards, max_cards = TOPIC_CARD_RANGES.get(
+        parsed_difficulty, TOPIC_CARD_RANGES[DEFAULT_TOPIC_DIFFICULTY]
+    )
+
+    for idx, card in enumerate(flashcards):
+        if not isinstance(card, dict):
+            continue
+
+        normalized = normalize_topic_card(card, idx)
+        if normalized is None:
+            continue
+
+        normalized_front = normalized["front"].lower()
+        if normalized_front in seen_fronts:
+            continue
+        seen_fronts.add(normalized_front)
+
+        normalized_cards.append(normalized)
 
         if len(normalized_cards) >= max_cards:
             break
 
     if not normalized_cards:
-        normalized_cards.append(
-            {
-                "id": "auto-1",
-                "front": f"What is {parsed_topic}?",
-                "back": f"A concise overview of {parsed_topic}.",
-                "example": "",
-                "category": "definition",
-            }
-        )
+        normalized_cards.append(topic_placeholder_card(parsed_topic))
 
     limited_cards = normalized_cards[:max_cards]
     return {"topic": parsed_topic, "difficulty": parsed_difficulty, "flashcards": limited_cards}
 
 
-def call_openai_topic_flashcards(topic: str, difficulty: str) -> Dict[str, Any]:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY is not configured.")
-
+def normalize_topic_difficulty(difficulty: Optional[str]) -> str:
     normalized_difficulty = (difficulty or DEFAULT_TOPIC_DIFFICULTY).lower()
     if normalized_difficulty not in TOPIC_DIFFICULTIES:
         normalized_difficulty = DEFAULT_TOPIC_DIFFICULTY
+    return normalized_difficulty
+
+
+def finish_topic_flashcards(content: str, topic: str, difficulty: str) -> Dict[str, Any]:
+    """Parse a complete topic response and top it up to the difficulty's minimum card count."""
+
+    parsed = parse_topic_flashcard_response(content or "{}", topic, difficulty)
 
+    fill = topic_fill_cards(parsed["topic"], difficulty, len(parsed.get("flashcards", [])))
+    if fill:
+        parsed["flashcards"].extend(fill)
+        parsed["flashcards"] = parsed["flashcards"][: TOPIC_CARD_RANGES[difficulty][1]]
+
+    return parsed
+
+
+def call_openai_topic_flashcards(topic: str, difficulty: str, cache_mode: str = "use") -> Dict[str, Any]:
+    normalized_difficulty = normalize_topic_difficulty(difficulty)
     prompt = build_topic_flashcard_prompt(topic, normalized_difficulty)
-    client = OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
-        max_tokens=1800,
+    content = cached_completion_content(
+        get_openai_client(), prompt, **TOPIC_COMPLETION_PARAMS, cache_mode=cache_mode
     )
+    return finish_topic_flashcards(content, topic, normalized_difficulty)
 
-    content = response.choices[0].message.content if response.choices else "{}"
-    parsed = parse_topic_flashcard_response(content or "{}", topic, normalized_difficulty)
 
-    min_cards, _ = TOPIC_CARD_RANGES.get(
-        normalized_difficulty, TOPIC_CARD_RANGES[DEFAULT_TOPIC_DIFFICULTY]
+async def call_openai_topic_flashcards_async(topic: str, difficulty: str, cache_mode: str = "use") -> Dict[str, Any]:
+    normalized_difficulty = normalize_topic_difficulty(difficulty)
+    prompt = build_topic_flashcard_prompt(topic, normalized_difficulty)
+    content = await cached_completion_content_async(
+        get_async_openai_client(), prompt, **TOPIC_COMPLETION_PARAMS, cache_mode=cache_mode
     )
-    if len(parsed.get("flashcards", [])) < min_cards:
-        missing = min_cards - len(parsed["flashcards"])
-        for index in range(missing):
-            parsed["flashcards"].append(
+    return await asyncio.to_thread(finish_topic_flashcards, content, topic, normalized_difficulty)
+
+
+class TopicCardStream:
+    """Turns streamed topic output into cleaned cards as each one completes.
+
+    :meth:`feed` returns the new cards in a fragment; :meth:`finish` returns the closing
+    placeholder/fill cards and metadata as frames. The rules match
+    :func:`call_openai_topic_flashcards`, except that the card limits come from the requested
+    difficulty because the model's own ``difficulty`` field is only known at the end.
+    """
+
+    def __init__(self, topic: str, difficulty: str) -> None:
+        self.topic = topic
+        self.difficulty = normalize_topic_difficulty(difficulty)
+        self.prompt = build_topic_flashcard_prompt(topic, self.difficulty)
+        self.max_cards = TOPIC_CARD_RANGES[self.difficulty][1]
+        self._parser = StreamingCardParser()
+        self._seen_fronts: set = set()
+        self._position = 0
+        self.emitted = 0
+
+    def feed(self, fragment: str) -> List[Dict[str, Any]]:
+        cards: List[Dict[str, Any]] = []
+        for card in self._parser.feed(fragment):
+            normalized = normalize_topic_card(card, self._position)
+            self._position += 1
+            if normalized is None or self.emitted >= self.max_cards:
+                continue
+            front = normalized["front"].lower()
+            if front in self._seen_fronts:
+                continue
+            self._seen_fronts.add(front)
+            self.emitted += 1
+            cards.append(normalized)
+        return cards
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        root = self._parser.root if isinstance(self._parser.root, dict) else {}
+        parsed_topic = normalize_text(root.get("topic")) or self.topic
+
+        extra: List[Dict[str, Any]] = [] if self.emitted else [topic_placeholder_card(parsed_topic)]
+        extra.extend(topic_fill_cards(parsed_topic, self.difficulty, self.emitted + len(extra)))
+        frames: List[Tuple[str, Any]] = []
+        for card in extra[: max(0, self.max_cards - self.emitted)]:
+            self.emitted += 1
+            frames.append(("flashcard", card))
+
+        frames.append(
+            (
+                "metadata",
                 {
-                    "id": f"auto-fill-{index + 1}",
-                    "front": f"Key idea {index + 1} about {parsed['topic']}",
-                    "back": f"A core concept for {parsed['topic']} at the {normalized_difficulty} level.",
-                    "example": "",
-                    "category": "concept",
-                }
+                    "topic": parsed_topic,
+                    "difficulty": self.difficulty,
+                    "flashcardCount": self.emitted,
+                    "truncated": self._parser.truncated,
+                },
             )
-        parsed["flashcards"] = parsed["flashcards"][: TOPIC_CARD_RANGES[normalized_difficulty][1]]
+        )
+        return frames
 
-    return parsed
+
+def iter_topic_flashcards(topic: str, difficulty: str, cache_mode: str = "use") -> Iterator[Tuple[str, Any]]:
+    """Stream topic cards as ``("flashcard", card)`` pairs while the model is still writing.
+
+    Each card is yielded as soon as its closing brace arrives, followed by any placeholder or
+    fill cards and finally ``("metadata", {...})``; see :class:`TopicCardStream`.
+    """
+
+    client = get_openai_client()
+    stream = TopicCardStream(topic, difficulty)
+    fragments = iter_completion_content(client, stream.prompt, **TOPIC_COMPLETION_PARAMS, cache_mode=cache_mode)
+    for fragment in fragments:
+        for card in stream.feed(fragment):
+            yield "flashcard", card
+    yield from stream.finish()
+
+
+async def iter_topic_flashcards_async(
+    topic: str, difficulty: str, cache_mode: str = "use"
+) -> AsyncIterator[Tuple[str, Any]]:
+    client = get_async_openai_client()
+    stream = TopicCardStream(topic, difficulty)
+    fragments = iter_completion_content_async(client, stream.prompt, **TOPIC_COMPLETION_PARAMS, cache_mode=cache_mode)
+    async for fragment in fragments:
+        for card in stream.feed(fragment):
+            yield "flashcard", card
+    for frame in stream.finish():
+        yield frame
+
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    upload_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    phase TEXT,
+    chunk_count INTEGER,
+    error TEXT,
+    claim TEXT,
+    heartbeat REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    flashcards TEXT,
+    PRIMARY KEY (job_id, chunk_index)
+);
+"""
+
+_job_workers: List[threading.Thread] = []
+_job_workers_lock = threading.Lock()
+_job_wakeup = threading.Event()
+
+
+def get_jobs_connection() -> sqlite3.Connection:
+    return get_sqlite_connection(JOBS_DB_FILE, JOB_SCHEMA)
+
+
+def submit_document_job(file: Any) -> str:
+    """Persist an upload and queue it for background flashcard generation."""
+
+    job_id = uuid.uuid4().hex
+    source = normalize_text(getattr(file, "filename", "")) or "document"
+    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    upload_path = UPLOADS_DIR / f"{job_id}{Path(source).suffix.lower()}"
+
+    file.stream.seek(0)
+    file.save(str(upload_path))
+
+    now = utc_timestamp()
+    connection = get_jobs_connection()
+    with connection:
+        connection.execute(
+            "INSERT INTO jobs (id, source, upload_path, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, source, str(upload_path), now, now),
+        )
+
+    start_job_workers()
+    _job_wakeup.set()
+    return job_id
+
+
+def _claim_next_job(connection: sqlite3.Connection) -> Optional[sqlite3.Row]:
+    """Atomically take the oldest queued job, or a running job whose worker stopped heartbeating."""
+
+    claim = uuid.uuid4().hex
+    now = time.time()
+    with connection:
+        connection.execute(
+            """
+            UPDATE jobs SET status = 'running', claim = ?, heartbeat = ?, updated_at = ?
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND heartbeat < ?)
+                ORDER BY created_at
+                LIMIT 1
+            )
+            """,
+            (claim, now, utc_timestamp(), now - JOB_STALE_AFTER_SECONDS),
+        )
+    return connection.execute("SELECT * FROM jobs WHERE claim = ?", (claim,)).fetchone()
+
+
+class JobClaimLost(Exception):
+    """Another worker reclaimed the job, so this one must stop working on it."""
+
+
+def _update_job(connection: sqlite3.Connection, job: sqlite3.Row, **fields: Any) -> None:
+    """Update ``job`` and its heartbeat if this worker still holds its claim; raise JobClaimLost otherwise."""
+
+    fields["heartbeat"] = time.time()
+    fields["updated_at"] = utc_timestamp()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    with connection:
+        updated = connection.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND claim = ?", (*fields.values(), job["id"], job["claim"])
+        ).rowcount
+    if not updated:
+        raise JobClaimLost(job["id"])
+
+
+@contextmanager
+def job_heartbeat(job: sqlite3.Row) -> Iterator[threading.Event]:
+    """Refresh ``job``'s heartbeat from a timer thread while the body runs, however long one chunk takes.
+
+    The yielded event is set once the claim has been lost to another worker.
+    """
+
+    stopped = threading.Event()
+    lost = threading.Event()
+
+    def beat() -> None:
+        connection = get_jobs_connection()
+        try:
+            while not stopped.wait(JOB_HEARTBEAT_INTERVAL_SECONDS):
+                _update_job(connection, job)
+        except JobClaimLost:
+            lost.set()
+        finally:
+            close_sqlite_connections()
+
+    thread = threading.Thread(target=beat, name=f"job-heartbeat-{job['id'][:8]}", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def _prepare_job_chunks(connection: sqlite3.Connection, job: sqlite3.Row) -> None:
+    _update_job(connection, job, phase="extracting")
+
+    with open(job["upload_path"], "rb") as handle:
+        upload = FileStorage(stream=handle, filename=job["source"])
+        chunks = CountingIterator(iter_semantic_chunks(iter_text_from_file(upload)))
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO job_chunks (job_id, chunk_index, text, status) VALUES (?, ?, ?, 'pending')",
+                ((job["id"], index, chunk) for index, chunk in enumerate(chunks)),
+            )
+
+    if not chunks.count:
+        raise ValueError("No readable text found in the file.")
+    _update_job(connection, job, chunk_count=chunks.count)
+
+
+def run_document_job(connection: sqlite3.Connection, job: sqlite3.Row) -> None:
+    """Extract, chunk and generate a job, skipping chunks a previous worker already finished.
+
+    The upload is deleted once the job completes or fails, unless another worker reclaimed the job.
+    """
+
+    job_id = job["id"]
+    reclaimed = False
+    try:
+        with job_heartbeat(job) as claim_lost:
+            if job["chunk_count"] is None:
+                _prepare_job_chunks(connection, job)
+
+            pending = connection.execute(
+                "SELECT chunk_index, text FROM job_chunks WHERE job_id = ? AND status != 'done' ORDER BY chunk_index",
+                (job_id,),
+            ).fetchall()
+            _update_job(connection, job, phase="generating")
+
+            results = iter_openai_flashcards((row["text"] for row in pending), job["source"])
+            try:
+                for row, chunk_cards in zip(pending, results):
+                    if claim_lost.is_set():
+                        raise JobClaimLost(job_id)
+                    _update_job(connection, job)
+                    with connection:
+                        connection.execute(
+                            "UPDATE job_chunks SET status = 'done', flashcards = ? "
+                            "WHERE job_id = ? AND chunk_index = ?",
+                            (json.dumps(chunk_cards), job_id, row["chunk_index"]),
+                        )
+            finally:
+                results.close()
+
+            _update_job(connection, job, status="completed", phase=None, claim=None)
+    except JobClaimLost:
+        # The worker that reclaimed the job may still need to extract the upload.
+        reclaimed = True
+        raise
+    finally:
+        if not reclaimed:
+            Path(job["upload_path"]).unlink(missing_ok=True)
+
+
+def _job_worker_loop() -> None:
+    connection = get_jobs_connection()
+    while True:
+        job = _claim_next_job(connection)
+        if job is None:
+            _job_wakeup.wait(JOB_POLL_INTERVAL_SECONDS)
+            _job_wakeup.clear()
+            continue
+
+        try:
+            run_document_job(connection, job)
+        except JobClaimLost:
+            app.logger.warning("Document job %s was reclaimed by another worker; stopping", job["id"])
+        except Exception as exc:  # pragma: no cover - depends on network/API
+            app.logger.exception("Document job %s failed", job["id"])
+            try:
+                _update_job(connection, job, status="failed", error=str(exc) or type(exc).__name__, claim=None)
+            except JobClaimLost:
+                pass
+
+
+def start_job_workers() -> None:
+    """Start the background job workers once per process; they resume interrupted jobs."""
+
+    with _job_workers_lock:
+        if _job_workers:
+            return
+        for index in range(JOB_WORKER_COUNT):
+            worker = threading.Thread(target=_job_worker_loop, name=f"document-job-{index}", daemon=True)
+            worker.start()
+            _job_workers.append(worker)
+
+
+def get_document_job(job_id: str) -> Optional[Dict[str, Any]]:
+    connection = get_jobs_connection()
+    job = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None:
+        return None
+
+    chunks = connection.execute(
+        "SELECT chunk_index, status, flashcards FROM job_chunks WHERE job_id = ? ORDER BY chunk_index",
+        (job_id,),
+    ).fetchall()
+
+    dedupe_index = NearDuplicateIndex()
+    flashcards: List[Dict[str, Any]] = []
+    for chunk in chunks:
+        if chunk["flashcards"]:
+            flashcards.extend(dedupe_index.filter_cards(json.loads(chunk["flashcards"])))
+
+    completed = sum(1 for chunk in chunks if chunk["status"] == "done")
+    return {
+        "jobId": job["id"],
+        "status": job["status"],
+        "phase": job["phase"],
+        "source": job["source"],
+        "error": job["error"],
+        "createdAt": job["created_at"],
+        "updatedAt": job["updated_at"],
+        "progress": {
+            "chunkCount": job["chunk_count"],
+            "completedChunks": completed,
+            "chunks": [{"index": chunk["chunk_index"], "status": chunk["status"]} for chunk in chunks],
+        },
+        "flashcards": flashcards,
+        "duplicatesDropped": dedupe_index.duplicates,
+    }
+
+
+progress_store = ProgressStore(PROGRESS_DB_FILE, PROGRESS_FILE)
+_progress_compactor: Optional[threading.Thread] = None
+_progress_compactor_lock = threading.Lock()
+
+
+def _progress_compactor_loop() -> None:
+    while True:
+        time.sleep(PROGRESS_COMPACTION_INTERVAL_SECONDS)
+        try:
+            progress_store.compact(PROGRESS_RETENTION_DAYS)
+        except sqlite3.Error:  # pragma: no cover - depends on concurrent writers
+            app.logger.warning("Progress compaction failed", exc_info=True)
+
+
+def start_progress_compactor() -> None:
+    global _progress_compactor
+
+    if _progress_compactor is not None:
+        return
+    with _progress_compactor_lock:
+        if _progress_compactor is None:
+            _progress_compactor = threading.Thread(
+                target=_progress_compactor_loop, name="progress-compactor", daemon=True
+            )
+            _progress_compactor.start()
+
+
+def validate_progress_batch(events: Any) -> Tuple[List[Tuple[Any, ...]], List[Dict[str, Any]]]:
+    """Check a batch of client events in one pass.
+
+    Returns the progress-log rows and the validation errors (index and message, capped at
+    ``PROGRESS_BATCH_MAX_ERRORS``). Events carrying ``cardId`` and a boolean ``correct`` are reviews
+    and also drive the schedule; the row tuple keeps those two fields at its end. Each row's
+    de-duplication key is the client's ``eventId`` or, without one, its timestamp, name and card.
+    """
+
+    if not isinstance(events, list):
+        return [], [{"index": None, "message": "Expected a JSON array of events."}]
+    if len(events) > PROGRESS_BATCH_MAX_EVENTS:
+        return [], [{"index": None, "message": f"At most {PROGRESS_BATCH_MAX_EVENTS} events per batch."}]
+
+    rows: List[Tuple[Any, ...]] = []
+    errors: List[Dict[str, Any]] = []
+    for index, event in enumerate(events):
+        if len(errors) >= PROGRESS_BATCH_MAX_ERRORS:
+            break
+        if not isinstance(event, dict):
+            errors.append({"index": index, "message": "Event must be an object."})
+            continue
+
+        user_id = _progress_partition(event.get("userId"), PROGRESS_DEFAULT_USER)
+        deck_id = _progress_partition(event.get("deckId"), PROGRESS_DEFAULT_DECK)
+        if user_id is None or deck_id is None:
+            errors.append({"index": index, "message": "userId and deckId must be short identifiers."})
+            continue
+
+        try:
+            ts_ms = coerce_timestamp_ms(event.get("timestamp"))
+        except ValueError as exc:
+            errors.append({"index": index, "message": f"timestamp: {exc}"})
+            continue
+
+        card_id = event.get("cardId")
+        correct = event.get("correct")
+        if card_id is not None and (not isinstance(card_id, str) or not card_id or not isinstance(correct, bool)):
+            errors.append({"index": index, "message": "Reviews need a string cardId and a boolean correct."})
+            continue
+
+        name = event.get("event") or ("review" if card_id else "unknown")
+        event_id = event.get("eventId")
+        if not isinstance(name, str):
+            errors.append({"index": index, "message": "event must be a string."})
+            continue
+        if event_id is not None and (not isinstance(event_id, str) or not 0 < len(event_id) <= 128):
+            errors.append({"index": index, "message": "eventId must be a string of at most 128 characters."})
+            continue
+
+        totals = event.get("totals", {})
+        snapshot = event.get("bucketSnapshot", {})
+        rows.append(
+            (
+                format_timestamp_ms(ts_ms),
+                ts_ms,
+                user_id,
+                deck_id,
+                name,
+                json.dumps(totals) if totals else "{}",
+                json.dumps(snapshot) if snapshot else "{}",
+                f"id:{event_id}" if event_id is not None else f"{ts_ms}:{name}:{card_id or ''}",
+                card_id,
+                correct,
+            )
+        )
+    return rows, errors
 
 
 @app.route("/")
@@ -684,10 +2419,81 @@ def serve_index() -> Any:
     return send_from_directory(app.static_folder, "index.html")
 
 
+def deck_response(compiled: CompiledDeck) -> Response:
+    """Serve a compiled deck, gzip-encoded when the client accepts it, honouring conditional GETs."""
+
+    use_gzip = compiled.gzip_body is not None and "gzip" in request.accept_encodings
+    response = Response(compiled.gzip_body if use_gzip else compiled.body, mimetype="application/json")
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.set_etag(f"{compiled.etag}-gzip" if use_gzip else compiled.etag)
+    response.last_modified = compiled.last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response.make_conditional(request)
+
+
+@app.route("/api/decks", methods=["GET"])
+def list_decks() -> Any:
+    return jsonify({"decks": deck_store.list_metadata(tag=request.args.get("tag") or None)})
+
+
+@app.route("/api/decks/<deck_name>/cards", methods=["GET"])
+def get_deck_cards(deck_name: str) -> Any:
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = max(1, min(int(request.args.get("limit", DECK_PAGE_SIZE)), DECK_MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "InvalidQuery", "message": "offset and limit must be integers."}), 400
+
+    page = deck_store.cards(deck_name, offset, limit)
+    if page is None:
+        return jsonify({"error": "UnknownDeck", "message": f"No deck named '{deck_name}'."}), 404
+
+    metadata, cards = page
+    offset = min(offset, metadata["cardCount"])
+    next_offset = offset + len(cards)
+    return jsonify(
+        {
+            "deck": metadata,
+            "offset": offset,
+            "limit": limit,
+            "cards": cards,
+            "nextOffset": next_offset if next_offset < metadata["cardCount"] else None,
+        }
+    )
+
+
 @app.route("/api/decks/default", methods=["GET"])
 def get_default_deck() -> Any:
-    deck = load_json(DEFAULT_DECK_FILE, default={"name": "default", "flashcards": []})
-    return jsonify(deck)
+    compiled = deck_cache.get(DEFAULT_DECK_FILE)
+    if compiled is None:
+        return jsonify({"name": "default", "flashcards": []})
+    return deck_response(compiled)
+
+
+@app.route("/api/decks/<deck_name>", methods=["GET"])
+def get_deck(deck_name: str) -> Any:
+    path = deck_file_path(deck_name)
+    compiled = deck_cache.get(path) if path is not None else None
+    if compiled is None:
+        return jsonify({"error": "UnknownDeck", "message": f"No deck named '{deck_name}'."}), 404
+    return deck_response(compiled)
+
+
+def missing_search_query() -> Tuple[Response, int]:
+    return (
+        jsonify({"error": "MissingQuery", "message": "Provide a textbook title or topic to search."}),
+        400,
+    )
+
+
+def search_failed(exc: Exception) -> Tuple[Response, int]:  # pragma: no cover - network failure handling
+    app.logger.warning("Google Books search failed", exc_info=exc)
+    return (
+        jsonify({"error": "SearchFailed", "message": "Unable to reach the Google Books service."}),
+        502,
+    )
 
 
 @app.route("/api/textbooks/search", methods=["GET"])
@@ -695,53 +2501,64 @@ def search_textbooks() -> Any:
     query = normalize_text(request.args.get("q") or request.args.get("query"))
 
     if not query:
-        return (
-            jsonify({"error": "MissingQuery", "message": "Provide a textbook title or topic to search."}),
-            400,
-        )
+        return missing_search_query()
 
     try:
         results = google_books_search(query)
-    except requests.RequestException as exc:  # pragma: no cover - network failure handling
-        app.logger.warning("Google Books search failed", exc_info=exc)
-        return (
-            jsonify({"error": "SearchFailed", "message": "Unable to reach the Google Books service."}),
-            502,
-        )
+    except upstream_errors() as exc:
+        return search_failed(exc)
 
     return jsonify({"results": results})
 
 
-@app.route("/api/textbooks/<volume_id>/chapters", methods=["GET"])
-def get_textbook_chapters(volume_id: str) -> Any:
-    resolved_id = normalize_text(volume_id)
-    if not resolved_id:
-        return (
-            jsonify({"error": "InvalidVolume", "message": "A valid volume identifier is required."}),
-            400,
-        )
+@async_variant("search_textbooks")
+async def search_textbooks_async() -> Any:
+    query = normalize_text(request.args.get("q") or request.args.get("query"))
+
+    if not query:
+        return missing_search_query()
 
     try:
-        volume_payload = fetch_volume_details(resolved_id)
-    except requests.HTTPError as exc:  # pragma: no cover - dependent on external API
-        status_code = exc.response.status_code if exc.response is not None else 502
-        app.logger.warning("Google Books volume lookup failed", exc_info=exc)
-        return (
-            jsonify({"error": "VolumeLookupFailed", "message": "Unable to retrieve textbook details."}),
-            status_code if 400 <= status_code < 600 else 502,
-        )
-    except requests.RequestException as exc:  # pragma: no cover - dependent on external API
-        app.logger.warning("Google Books volume lookup failed", exc_info=exc)
-        return (
-            jsonify({"error": "VolumeLookupFailed", "message": "Unable to retrieve textbook details."}),
-            502,
-        )
+        results = await google_books_search_async(query)
+    except upstream_errors() as exc:
+        return search_failed(exc)
 
+    return jsonify({"results": results})
+
+
+def resolve_outline_limit() -> int:
+    """Chapter count from ``?limit=``, clamped to ``OUTLINE_MAX_CHAPTERS``."""
+
+    try:
+        limit = int(request.values.get("limit", OUTLINE_DEFAULT_CHAPTERS))
+    except ValueError:
+        limit = OUTLINE_DEFAULT_CHAPTERS
+    return max(1, min(limit, OUTLINE_MAX_CHAPTERS))
+
+
+def invalid_volume() -> Tuple[Response, int]:
+    return (
+        jsonify({"error": "InvalidVolume", "message": "A valid volume identifier is required."}),
+        400,
+    )
+
+
+def volume_lookup_failed(exc: Exception) -> Tuple[Response, int]:  # pragma: no cover - dependent on external API
+    app.logger.warning("Google Books volume lookup failed", exc_info=exc)
+    response = getattr(exc, "response", None)
+    status_code = response.status_code if response is not None else 502
+    return (
+        jsonify({"error": "VolumeLookupFailed", "message": "Unable to retrieve textbook details."}),
+        status_code if 400 <= status_code < 600 else 502,
+    )
+
+
+def chapters_response(resolved_id: str, volume_payload: Dict[str, Any]) -> Response:
     volume_info = volume_payload.get("volumeInfo") if isinstance(volume_payload, dict) else {}
     if not isinstance(volume_info, dict):
         volume_info = {}
 
-    chapters = build_chapter_outline(volume_info)
+    chapters = build_chapter_outline(volume_info, limit=resolve_outline_limit())
 
     book_info = {
         "id": volume_payload.get("id") if isinstance(volume_payload, dict) else resolved_id,
@@ -760,6 +2577,35 @@ def get_textbook_chapters(volume_id: str) -> Any:
     return jsonify({"book": book_info, "chapters": chapters})
 
 
+@app.route("/api/textbooks/<volume_id>/chapters", methods=["GET"])
+def get_textbook_chapters(volume_id: str) -> Any:
+    resolved_id = normalize_text(volume_id)
+    if not resolved_id:
+        return invalid_volume()
+
+    try:
+        volume_payload = fetch_volume_details(resolved_id)
+    except upstream_errors() as exc:
+        return volume_lookup_failed(exc)
+
+    return chapters_response(resolved_id, volume_payload)
+
+
+@async_variant("get_textbook_chapters")
+async def get_textbook_chapters_async(volume_id: str) -> Any:
+    resolved_id = normalize_text(volume_id)
+    if not resolved_id:
+        return invalid_volume()
+
+    try:
+        volume_payload = await fetch_volume_details_async(resolved_id)
+    except upstream_errors() as exc:
+        return volume_lookup_failed(exc)
+
+    # Outlining may build the TF-IDF keyword corpus from SQLite.
+    return await asyncio.to_thread(chapters_response, resolved_id, volume_payload)
+
+
 @app.route("/api/textbooks/flashcards", methods=["POST"])
 def create_textbook_flashcards() -> Any:
     payload = request.get_json(force=True, silent=True) or {}
@@ -803,8 +2649,38 @@ def create_textbook_flashcards() -> Any:
     )
 
 
-@app.route("/api/topics/flashcards", methods=["POST"])
-def create_topic_flashcards() -> Any:
+def generation_failed() -> Tuple[Response, int]:
+    return (
+        jsonify({"error": "GenerationFailed", "message": "Flashcard generation is unavailable right now."}),
+        502,
+    )
+
+
+def generation_error_frame(kind: str) -> Tuple[str, Any]:
+    """Log the exception being handled and return the ``error`` frame that ends a stream."""
+
+    app.logger.exception("%s generation failed", kind)
+    return "error", {"error": "GenerationFailed", "message": "Flashcard generation is unavailable right now."}
+
+
+def _topic_flashcard_frames(topic: str, difficulty: str, cache_mode: str) -> Iterator[Tuple[str, Any]]:
+    try:
+        yield from iter_topic_flashcards(topic, difficulty, cache_mode=cache_mode)
+    except Exception:  # pragma: no cover - depends on network/API
+        yield generation_error_frame("Topic flashcard")
+
+
+async def _topic_flashcard_frames_async(topic: str, difficulty: str, cache_mode: str) -> AsyncIterator[Tuple[str, Any]]:
+    try:
+        async for frame in iter_topic_flashcards_async(topic, difficulty, cache_mode=cache_mode):
+            yield frame
+    except Exception:  # pragma: no cover - depends on network/API
+        yield generation_error_frame("Topic flashcard")
+
+
+def parse_topic_request() -> Tuple[Optional[Tuple[Response, int]], str, str]:
+    """Validate a topic flashcard request; return an error response, or None with the topic and difficulty."""
+
     payload = request.get_json(force=True, silent=True) or {}
 
     topic = normalize_text(payload.get("topic"))
@@ -813,34 +2689,66 @@ def create_topic_flashcards() -> Any:
 
     if not topic:
         return (
-            jsonify({"error": "MissingTopic", "message": "Provide a topic to generate flashcards."}),
-            400,
+            (jsonify({"error": "MissingTopic", "message": "Provide a topic to generate flashcards."}), 400),
+            topic,
+            difficulty,
         )
 
     if difficulty not in TOPIC_DIFFICULTIES:
         return (
-            jsonify(
-                {
-                    "error": "InvalidDifficulty",
-                    "message": f"Difficulty must be one of {sorted(TOPIC_DIFFICULTIES)}.",
-                }
+            (
+                jsonify(
+                    {
+                        "error": "InvalidDifficulty",
+                        "message": f"Difficulty must be one of {sorted(TOPIC_DIFFICULTIES)}.",
+                    }
+                ),
+                400,
             ),
-            400,
+            topic,
+            difficulty,
         )
 
+    return None, topic, difficulty
+
+
+@app.route("/api/topics/flashcards", methods=["POST"])
+def create_topic_flashcards() -> Any:
+    error, topic, difficulty = parse_topic_request()
+    if error is not None:
+        return error
+
+    cache_mode = resolve_cache_mode()
+    stream_format = resolve_stream_format()
+    if stream_format:
+        return stream_response(stream_format, _topic_flashcard_frames(topic, difficulty, cache_mode))
+
     try:
-        generated = call_openai_topic_flashcards(topic, difficulty)
+        generated = call_openai_topic_flashcards(topic, difficulty, cache_mode=cache_mode)
     except Exception as exc:  # pragma: no cover - depends on network/API
         app.logger.exception("Topic flashcard generation failed")
-        return (
-            jsonify(
-                {
-                    "error": "GenerationFailed",
-                    "message": "Flashcard generation is unavailable right now.",
-                }
-            ),
-            502,
-        )
+        return generation_failed()
+
+    return jsonify(generated)
+
+
+@async_variant("generate_flashcards_alias")
+@async_variant("create_topic_flashcards")
+async def create_topic_flashcards_async() -> Any:
+    error, topic, difficulty = parse_topic_request()
+    if error is not None:
+        return error
+
+    cache_mode = resolve_cache_mode()
+    stream_format = resolve_stream_format()
+    if stream_format:
+        return stream_response_async(stream_format, _topic_flashcard_frames_async(topic, difficulty, cache_mode))
+
+    try:
+        generated = await call_openai_topic_flashcards_async(topic, difficulty, cache_mode=cache_mode)
+    except Exception:  # pragma: no cover - depends on network/API
+        app.logger.exception("Topic flashcard generation failed")
+        return generation_failed()
 
     return jsonify(generated)
 
@@ -855,74 +2763,494 @@ def generate_flashcards_alias() -> Any:
     return create_topic_flashcards()
 
 
+def _progress_partition(value: Any, default: str) -> Optional[str]:
+    if value is None or value == "":
+        return default
+    value = str(value)
+    return value if PROGRESS_PARTITION_PATTERN.match(value) else None
+
+
 @app.route("/api/progress", methods=["GET"])
 def get_progress() -> Any:
-    progress_entries: List[Dict[str, Any]] = load_json(PROGRESS_FILE, default=[])
-    return jsonify({"entries": progress_entries[-100:]})
+    if "userId" not in request.args:
+        return jsonify({"entries": progress_store.recent()})
+
+    user_id = _progress_partition(request.args.get("userId"), PROGRESS_DEFAULT_USER)
+    deck_arg = request.args.get("deckId")
+    deck_id = _progress_partition(deck_arg, PROGRESS_DEFAULT_DECK) if deck_arg is not None else None
+    if user_id is None or (deck_arg is not None and deck_id is None):
+        return jsonify({"error": "InvalidPartition", "message": "userId and deckId must be short identifiers."}), 400
+
+    cursor = request.args.get("cursor") or None
+    if cursor is not None:
+        try:
+            decode_progress_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "InvalidCursor", "message": "cursor was not issued by this endpoint."}), 400
+
+    try:
+        since_ms = parse_timestamp_ms(request.args["since"]) if request.args.get("since") else None
+        until_ms = parse_timestamp_ms(request.args["until"]) if request.args.get("until") else None
+        limit = int(request.args.get("limit", PROGRESS_RECENT_LIMIT))
+        entries, next_cursor = progress_store.query(
+            user_id,
+            deck_id,
+            since_ms=since_ms,
+            until_ms=until_ms,
+            limit=max(1, min(limit, PROGRESS_MAX_PAGE_SIZE)),
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        return jsonify({"error": "InvalidQuery", "message": str(exc)}), 400
+
+    return jsonify({"entries": entries, "nextCursor": next_cursor})
 
 
 @app.route("/api/progress", methods=["POST"])
 def record_progress() -> Any:
     payload = request.get_json(force=True, silent=True) or {}
-    progress_entries: List[Dict[str, Any]] = load_json(PROGRESS_FILE, default=[])
+    if not isinstance(payload, dict):
+        return jsonify({"error": "InvalidPayload", "message": "Expected a JSON object."}), 400
+
+    user_id = _progress_partition(payload.get("userId"), PROGRESS_DEFAULT_USER)
+    deck_id = _progress_partition(payload.get("deckId"), PROGRESS_DEFAULT_DECK)
+    if user_id is None or deck_id is None:
+        return jsonify({"error": "InvalidPartition", "message": "userId and deckId must be short identifiers."}), 400
+
+    event = payload.get("event")
+    if event is None:
+        event = "unknown"
+    elif not isinstance(event, str):
+        return jsonify({"error": "InvalidEvent", "message": "event must be a string."}), 400
 
     entry = {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "event": payload.get("event", "unknown"),
+        "timestamp": utc_timestamp(),
+        "userId": user_id,
+        "deckId": deck_id,
+        "event": event,
         "totals": payload.get("totals", {}),
         "bucketSnapshot": payload.get("bucketSnapshot", {}),
     }
-    progress_entries.append(entry)
-    write_json(PROGRESS_FILE, progress_entries[-500:])
+    progress_store.append(entry)
+    start_progress_compactor()
 
     return jsonify({"status": "ok"})
 
 
+def read_request_body(max_bytes: int) -> bytes:
+    """Return the request body, inflating ``Content-Encoding: gzip``/``deflate`` up to ``max_bytes``.
+
+    Neither the body on the wire nor its inflated form may exceed ``max_bytes``. Raises ``ValueError``
+    for unsupported encodings, corrupt data or bodies over the limit.
+    """
+
+    encoding = (request.headers.get("Content-Encoding") or "identity").lower()
+    if (request.content_length or 0) > max_bytes:
+        raise ValueError("Request body is too large.")
+    body = request.stream.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        raise ValueError("Request body is too large.")
+    if encoding == "identity":
+        return body
+    if encoding not in ("gzip", "deflate"):
+        raise ValueError(f"Unsupported Content-Encoding '{encoding}'.")
+
+    inflater = zlib.decompressobj(zlib.MAX_WBITS | 16 if encoding == "gzip" else zlib.MAX_WBITS)
+    try:
+        data = inflater.decompress(body, max_bytes + 1)
+    except zlib.error as exc:
+        raise ValueError("Request body could not be decompressed.") from exc
+    if len(data) > max_bytes or inflater.unconsumed_tail:
+        raise ValueError("Request body is too large.")
+    return data
+
+
+@app.route("/api/progress/batch", methods=["POST"])
+def record_progress_batch() -> Any:
+    try:
+        payload = json.loads(read_request_body(PROGRESS_BATCH_MAX_BYTES) or b"null")
+    except ValueError as exc:
+        return jsonify({"error": "InvalidBatch", "message": str(exc)}), 400
+
+    events = payload.get("events") if isinstance(payload, dict) else payload
+    rows, errors = validate_progress_batch(events)
+    if errors:
+        return jsonify({"error": "InvalidBatch", "message": "No events were stored.", "errors": errors}), 400
+
+    result = progress_store.ingest(rows)
+    start_progress_compactor()
+    return jsonify({"status": "ok", **result})
+
+
+@app.route("/api/schedule/enroll", methods=["POST"])
+def enroll_schedule() -> Any:
+    payload = request.get_json(force=True, silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "InvalidPayload", "message": "Expected a JSON object."}), 400
+
+    user_id = _progress_partition(payload.get("userId"), PROGRESS_DEFAULT_USER)
+    deck_id = _progress_partition(payload.get("deckId"), PROGRESS_DEFAULT_DECK)
+    if user_id is None or deck_id is None:
+        return jsonify({"error": "InvalidPartition", "message": "userId and deckId must be short identifiers."}), 400
+
+    card_ids = payload.get("cardIds")
+    if card_ids is None:
+        path = deck_file_path(deck_id)
+        compiled = deck_cache.get(path) if path is not None else None
+        if compiled is None:
+            return jsonify({"error": "UnknownDeck", "message": f"No deck named '{deck_id}'."}), 404
+        card_ids = [flashcard_id(card) for card in compiled.deck.get("flashcards", []) if isinstance(card, dict)]
+    elif not isinstance(card_ids, list) or not all(isinstance(card_id, str) and card_id for card_id in card_ids):
+        return jsonify({"error": "InvalidCards", "message": "cardIds must be a list of non-empty strings."}), 400
+
+    enrolled = progress_store.enroll(user_id, deck_id, card_ids)
+    return jsonify({"enrolled": enrolled, "tracked": len(card_ids)})
+
+
+@app.route("/api/schedule/review", methods=["POST"])
+def review_card() -> Any:
+    payload = request.get_json(force=True, silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "InvalidPayload", "message": "Expected a JSON object."}), 400
+
+    user_id = _progress_partition(payload.get("userId"), PROGRESS_DEFAULT_USER)
+    deck_id = _progress_partition(payload.get("deckId"), PROGRESS_DEFAULT_DECK)
+    if user_id is None or deck_id is None:
+        return jsonify({"error": "InvalidPartition", "message": "userId and deckId must be short identifiers."}), 400
+
+    card_id = payload.get("cardId")
+    if not isinstance(card_id, str) or not card_id or not isinstance(payload.get("correct"), bool):
+        return jsonify({"error": "InvalidReview", "message": "cardId and a boolean correct are required."}), 400
+
+    try:
+        reviewed_ms = coerce_timestamp_ms(payload["reviewedAt"]) if payload.get("reviewedAt") is not None else None
+    except ValueError as exc:
+        return jsonify({"error": "InvalidReview", "message": str(exc)}), 400
+
+    card = progress_store.record_review(user_id, deck_id, card_id, payload["correct"], reviewed_ms)
+    start_progress_compactor()
+    if card is None:
+        return jsonify({"status": "stale"}), 409
+    return jsonify({"status": "ok", "card": card})
+
+
+@app.route("/api/schedule/due", methods=["GET"])
+def get_due_cards() -> Any:
+    user_id = _progress_partition(request.args.get("userId"), PROGRESS_DEFAULT_USER)
+    deck_arg = request.args.get("deckId")
+    deck_id = _progress_partition(deck_arg, PROGRESS_DEFAULT_DECK) if deck_arg is not None else None
+    if user_id is None or (deck_arg is not None and deck_id is None):
+        return jsonify({"error": "InvalidPartition", "message": "userId and deckId must be short identifiers."}), 400
+
+    try:
+        now_ms = parse_timestamp_ms(request.args["now"]) if request.args.get("now") else None
+        limit = int(request.args.get("limit", SCHEDULE_DUE_LIMIT))
+    except ValueError as exc:
+        return jsonify({"error": "InvalidQuery", "message": str(exc)}), 400
+
+    cards = progress_store.due(user_id, deck_id, limit=max(1, min(limit, SCHEDULE_MAX_DUE_LIMIT)), now_ms=now_ms)
+    return jsonify({"cards": cards})
+
+
+def document_metadata_frame(
+    chunks: CountingIterator[str], source: str, flashcard_count: int, dedupe_index: NearDuplicateIndex
+) -> Tuple[str, Any]:
+    return "metadata", {
+        "source": source,
+        "chunkCount": chunks.count,
+        "flashcardCount": flashcard_count,
+        "duplicatesDropped": dedupe_index.duplicates,
+    }
+
+
+def _document_flashcard_frames(
+    chunks: CountingIterator[str], source: str, cache_mode: str, dedupe_index: NearDuplicateIndex
+) -> Iterator[Tuple[str, Any]]:
+    flashcard_count = 0
+    try:
+        for chunk_cards in iter_openai_flashcards(chunks, source, cache_mode=cache_mode):
+            for card in dedupe_index.filter_cards(chunk_cards):
+                flashcard_count += 1
+                yield "flashcard", card
+    except Exception:  # pragma: no cover - depends on network/API
+        yield generation_error_frame("Flashcard")
+        return
+    yield document_metadata_frame(chunks, source, flashcard_count, dedupe_index)
+
+
+async def _document_flashcard_frames_async(
+    chunks: CountingIterator[str], source: str, cache_mode: str, dedupe_index: NearDuplicateIndex
+) -> AsyncIterator[Tuple[str, Any]]:
+    flashcard_count = 0
+    try:
+        async for chunk_cards in iter_openai_flashcards_async(chunks, source, cache_mode=cache_mode):
+            for card in dedupe_index.filter_cards(chunk_cards):
+                flashcard_count += 1
+                yield "flashcard", card
+    except Exception:  # pragma: no cover - depends on network/API
+        yield generation_error_frame("Flashcard")
+        return
+    yield document_metadata_frame(chunks, source, flashcard_count, dedupe_index)
+
+
+def prepare_document_upload() -> Tuple[
+    Optional[Tuple[Response, int]], Optional[FileStorage], Optional[NearDuplicateIndex]
+]:
+    """Validate a flashcard upload; return an error response, or None with the file and its dedupe index."""
+
+    file = request.files.get("file")
+    if not file:
+        return (jsonify({"error": "MissingFile", "message": "No file provided."}), 400), None, None
+
+    dedupe_deck = normalize_text(request.form.get("dedupeAgainst"))
+    try:
+        dedupe_index = build_dedupe_index(dedupe_deck or None)
+    except LookupError:
+        return (
+            (jsonify({"error": "UnknownDeck", "message": f"No deck named '{dedupe_deck}' exists."}), 400),
+            None,
+            None,
+        )
+
+    return None, file, dedupe_index
+
+
+def open_document_chunks(file: FileStorage) -> Tuple[Optional[Tuple[Response, int]], Optional[CountingIterator[str]]]:
+    """Start chunking ``file``; return an error response if it is unreadable or empty, else the chunks."""
+
+    # Chunks are produced lazily so generation starts while later pages are still being parsed.
+    chunk_stream = iter_semantic_chunks(iter_text_from_file(file))
+    try:
+        first_chunk = next(chunk_stream, None)
+    except Exception:
+        app.logger.exception("Failed to extract text from upload")
+        return (jsonify({"error": "ExtractionFailed", "message": "Unable to read the uploaded file."}), 400), None
+
+    if first_chunk is None:
+        return (jsonify({"error": "EmptyDocument", "message": "No readable text found in the file."}), 400), None
+
+    return None, CountingIterator(itertools.chain([first_chunk], chunk_stream))
+
+
+def document_flashcards_response(
+    file: FileStorage, flashcards: List[Dict[str, Any]], chunks: CountingIterator[str], dedupe_index: NearDuplicateIndex
+) -> Response:
+    return jsonify(
+        {
+            "flashcards": flashcards,
+            "metadata": {
+                "source": file.filename,
+                "chunkCount": chunks.count,
+                "duplicatesDropped": dedupe_index.duplicates,
+            },
+        }
+    )
+
+
 @app.route("/api/documents/flashcards", methods=["POST"])
 def upload_document() -> Any:
+    error, file, dedupe_index = prepare_document_upload()
+    if error is not None:
+        return error
+
+    error, chunks = open_document_chunks(file)
+    if error is not None:
+        return error
+
+    source = file.filename or "document"
+    cache_mode = resolve_cache_mode()
+    stream_format = resolve_stream_format()
+    if stream_format:
+        return stream_response(stream_format, _document_flashcard_frames(chunks, source, cache_mode, dedupe_index))
+
+    try:
+        flashcards = call_openai_flashcards(chunks, source, cache_mode=cache_mode, dedupe_index=dedupe_index)
+    except Exception as exc:  # pragma: no cover - depends on network/API
+        app.logger.exception("Flashcard generation failed")
+        return generation_failed()
+
+    return document_flashcards_response(file, flashcards, chunks, dedupe_index)
+
+
+@async_variant("upload_document")
+async def upload_document_async() -> Any:
+    # Parsing the multipart body, loading the dedupe deck and reading the upload all block, so they
+    # run off the event loop; to_thread carries the request context along.
+    error, file, dedupe_index = await asyncio.to_thread(prepare_document_upload)
+    if error is not None:
+        return error
+
+    error, chunks = await asyncio.to_thread(open_document_chunks, file)
+    if error is not None:
+        return error
+
+    source = file.filename or "document"
+    cache_mode = resolve_cache_mode()
+    stream_format = resolve_stream_format()
+    if stream_format:
+        return stream_response_async(
+            stream_format, _document_flashcard_frames_async(chunks, source, cache_mode, dedupe_index)
+        )
+
+    try:
+        flashcards = await call_openai_flashcards_async(
+            chunks, source, cache_mode=cache_mode, dedupe_index=dedupe_index
+        )
+    except Exception:  # pragma: no cover - depends on network/API
+        app.logger.exception("Flashcard generation failed")
+        return generation_failed()
+
+    return document_flashcards_response(file, flashcards, chunks, dedupe_index)
+
+
+@app.route("/api/documents/outline", methods=["POST"])
+def outline_document() -> Any:
     file = request.files.get("file")
     if not file:
         return jsonify({"error": "MissingFile", "message": "No file provided."}), 400
 
     try:
-        raw_text = normalize_text(extract_text_from_file(file))
-    except Exception as exc:
+        text = extract_text_from_file(file)
+    except Exception:
         app.logger.exception("Failed to extract text from upload")
         return jsonify({"error": "ExtractionFailed", "message": "Unable to read the uploaded file."}), 400
 
-    if not raw_text:
+    chapters = outline_text(text, limit=resolve_outline_limit())
+    if not chapters:
         return jsonify({"error": "EmptyDocument", "message": "No readable text found in the file."}), 400
 
-    chunks = split_text(raw_text)
-    try:
-        flashcards = call_openai_flashcards(chunks, file.filename or "document")
-    except Exception as exc:  # pragma: no cover - depends on network/API
-        app.logger.exception("Flashcard generation failed")
-        return (
-            jsonify({"error": "GenerationFailed", "message": "Flashcard generation is unavailable right now."}),
-            502,
-        )
+    return jsonify({"chapters": chapters, "metadata": {"source": file.filename, "chapterCount": len(chapters)}})
+
+
+@app.route("/api/documents/jobs", methods=["POST"])
+def create_document_job() -> Any:
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "MissingFile", "message": "No file provided."}), 400
 
+    job_id = submit_document_job(file)
+    return (
+        jsonify({"jobId": job_id, "status": "queued", "statusUrl": f"/api/documents/jobs/{job_id}"}),
+        202,
+    )
+
+
+@app.route("/api/documents/jobs/<job_id>", methods=["GET"])
+def get_document_job_status(job_id: str) -> Any:
+    job = get_document_job(normalize_text(job_id))
+    if job is None:
+        return jsonify({"error": "JobNotFound", "message": "No document job exists with that id."}), 404
+
+    return jsonify(job)
+
+
+@app.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats() -> Any:
     return jsonify(
         {
-            "flashcards": flashcards,
-            "metadata": {"source": file.filename, "chunkCount": len(chunks)},
+            "generation": {**generation_cache.stats(), "coalescing": completion_flights.stats()},
+            "books": {
+                "search": books_search_cache.stats(),
+                "volume": books_volume_cache.stats(),
+                "disk": books_disk_cache.stats(),
+            },
+            "decks": deck_cache.stats(),
         }
     )
 
 
+@app.route("/api/cache", methods=["DELETE"])
+def clear_cache() -> Any:
+    books_search_cache.clear()
+    books_volume_cache.clear()
+    removed = {"generation": generation_cache.clear(), "books": books_disk_cache.clear()}
+    return jsonify({"status": "ok", "removed": removed})
+
+
+@app.before_request
+def start_request_timer() -> None:
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    started = g.pop("request_started", None)
+    # Label by endpoint rather than path so per-id URLs share one series.
+    endpoint = request.endpoint or "unmatched"
+    http_requests_total.inc(request.method, endpoint, str(response.status_code))
+    if started is not None:
+        http_request_seconds.observe(time.perf_counter() - started, request.method, endpoint)
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics() -> Any:
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route("/<path:path>")
 def serve_static(path: str) -> Any:
     return send_from_directory(app.static_folder, path)
 
 
-if __name__ == "__main__":
+def create_app() -> Flask:
+    """Check the data directory and open the progress store, then return the Flask app.
+
+    This is the WSGI factory for ``gunicorn "app:create_app()"`` and is also used by asgi.py.
+    Background threads are left to :func:`start_background_services` so a preloading server
+    can call this once in its master process and fork workers from it.
+    """
+
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     if not DEFAULT_DECK_FILE.exists():
         raise FileNotFoundError(
             "Default deck is missing. Populate backend/data/default_deck.json before starting the server."
         )
-    if not PROGRESS_FILE.exists():
-        write_json(PROGRESS_FILE, [])
+    progress_store.connection()
+    # SQLite handles must not cross a fork; workers open their own on first use.
+    close_sqlite_connections()
+    if WARM_UP_ON_START:
+        warm_up()
+    return app
+
+
+def warm_up() -> None:
+    """Import the lazily loaded clients and parsers and the tokenizer now rather than on first use.
+
+    Worth it where startup cost is paid once, such as a preloading server's master process.
+    """
+
+    for module in LAZY_MODULES:
+        module.load()
+    get_token_encoding()
+
+
+def start_background_services() -> None:
+    """Start the progress compactor, document job workers and metrics writer for this process."""
+
+    start_progress_compactor()
+    start_job_workers()
+    start_metrics_writer()
+
+
+def _reset_after_fork() -> None:
+    """Forget connections, clients and threads inherited from a parent that preloaded the app."""
+
+    global _http_session, _pdf_extract_pool, _progress_compactor
+
+    _http_session = None
+    _pdf_extract_pool = None
+    _progress_compactor = None
+    _openai_clients.clear()
+    _async_clients.clear()
+    _job_workers.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+if __name__ == "__main__":
+    create_app()
+    start_background_services()
 
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,224 @@
+"""ASGI entry point that serves the I/O-bound routes from an event loop.
+
+Usage::
+
+    uvicorn asgi:create_asgi_app --factory --host 0.0.0.0 --port 5000
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py "asgi:create_asgi_app()"
+
+Endpoints with an entry in ``app.async_views`` (textbook search and chapters, topic flashcards and
+document uploads) are awaited on the loop, so one worker can keep hundreds of Google Books and
+OpenAI calls in flight. Every other route runs the regular Flask app in a thread pool.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+
+from app import async_views, close_async_clients, create_app, start_background_services
+
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+BODY_SPOOL_BYTES = 1024 * 1024
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def build_environ(scope: Scope, body: Any) -> Dict[str, Any]:
+    """Translate an ASGI HTTP scope and its buffered body into a WSGI environ."""
+
+    script_name = scope.get("root_path", "").encode("utf-8").decode("latin-1")
+    path_info = scope["path"].encode("utf-8").decode("latin-1")
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+
+    server = scope.get("server") or ("localhost", 80)
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        value = raw_value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def encode_headers(headers: Any) -> List[Tuple[bytes, bytes]]:
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+async def read_body(receive: Receive) -> Optional[SpooledTemporaryFile]:
+    """Buffer the request body, spilling large uploads to disk; None if the client went away."""
+
+    body = SpooledTemporaryFile(max_size=BODY_SPOOL_BYTES)
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None
+        body.write(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    body.seek(0)
+    return body
+
+
+class AsyncFlaskApp:
+    """ASGI application that awaits ``async_views`` and hands everything else to Flask's WSGI app."""
+
+    def __init__(self, flask_app: Flask, wsgi_threads: int = WSGI_THREADS) -> None:
+        self.flask_app = flask_app
+        self.adapter = flask_app.url_map.bind("localhost")
+        self.executor = ThreadPoolExecutor(max_workers=wsgi_threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await read_body(receive)
+        if body is None:
+            return
+        try:
+            environ = build_environ(scope, body)
+            view = async_views.get(self.endpoint(scope))
+            if view is None:
+                await self.call_wsgi(environ, send)
+            else:
+                await self.call_async(view, environ, send)
+        finally:
+            body.close()
+
+    def endpoint(self, scope: Scope) -> Optional[str]:
+        try:
+            endpoint, _ = self.adapter.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            return None
+        return endpoint
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                start_background_services()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await close_async_clients()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def call_async(self, view: Callable[..., Awaitable[Any]], environ: Dict[str, Any], send: Send) -> None:
+        """Run ``view`` through Flask's request pipeline (before/after hooks, error handlers)."""
+
+        flask_app = self.flask_app
+        context = flask_app.request_context(environ)
+        context.push()
+        try:
+            try:
+                try:
+                    rv = flask_app.preprocess_request()
+                    if rv is None:
+                        request = context.request
+                        if request.routing_exception is not None:
+                            raise request.routing_exception
+                        rule = request.url_rule
+                        if getattr(rule, "provide_automatic_options", False) and request.method == "OPTIONS":
+                            rv = flask_app.make_default_options_response()
+                        else:
+                            rv = await view(**request.view_args)
+                except Exception as exc:
+                    rv = flask_app.handle_user_exception(exc)
+                response = flask_app.finalize_request(rv)
+            except Exception as exc:
+                response = flask_app.handle_exception(exc)
+
+            await self.send_response(response, send)
+        finally:
+            context.pop()
+
+    async def send_response(self, response: Any, send: Send) -> None:
+        body = response.response
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": encode_headers(response.headers.items()),
+                }
+            )
+            if hasattr(body, "__aiter__"):
+                async for chunk in body:
+                    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    await send({"type": "http.response.body", "body": data, "more_body": True})
+            else:
+                for data in response.iter_encoded():
+                    await send({"type": "http.response.body", "body": data, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(body, "aclose"):
+                await body.aclose()
+            response.close()
+
+    async def call_wsgi(self, environ: Dict[str, Any], send: Send) -> None:
+        """Run the Flask WSGI app in the thread pool, relaying its response to the client."""
+
+        loop = asyncio.get_running_loop()
+        started: List[Tuple[int, List[Tuple[bytes, bytes]]]] = []
+
+        def relay(message: Dict[str, Any]) -> None:
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> None:
+            started[:] = [(int(status.split(" ", 1)[0]), encode_headers(headers))]
+
+        def run() -> None:
+            result = self.flask_app(environ, start_response)
+            sent_start = False
+            try:
+                for data in result:
+                    if not sent_start:
+                        relay({"type": "http.response.start", "status": started[0][0], "headers": started[0][1]})
+                        sent_start = True
+                    if data:
+                        relay({"type": "http.response.body", "body": data, "more_body": True})
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            if not sent_start:
+                relay({"type": "http.response.start", "status": started[0][0], "headers": started[0][1]})
+            relay({"type": "http.response.body", "body": b"", "more_body": False})
+
+        await loop.run_in_executor(self.executor, run)
+
+
+def create_asgi_app() -> AsyncFlaskApp:
+    """ASGI factory; like :func:`app.create_app`, it defers background threads to lifespan startup."""
+
+    return AsyncFlaskApp(create_app())
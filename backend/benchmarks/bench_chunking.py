@@ -0,0 +1,97 @@
+"""Compare fixed-width ``split_text`` with ``iter_semantic_chunks`` on a synthetic corpus.
+
+Usage::
+
+    python backend/benchmarks/bench_chunking.py [--pages 300] [--seed 7] [--json]
+
+Reports chunk count, token utilization (average tokens per chunk against
+``MAX_TOKENS_PER_CHUNK``), how many chunks end on a sentence boundary, and throughput.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app  # noqa: E402
+
+VOCABULARY = (
+    "credit report dispute bureau furnisher account balance payment history inquiry statute "
+    "consumer agency validation notice collection response accuracy investigation record "
+    "letter deadline evidence regulation compliance identity theft score utilization"
+).split()
+
+
+def build_corpus(pages: int, seed: int) -> List[str]:
+    """Return page-like sections made of paragraphs of varied sentence length."""
+
+    rng = random.Random(seed)
+    sections: List[str] = []
+    for _ in range(pages):
+        for _ in range(rng.randint(2, 6)):
+            sentences = []
+            for _ in range(rng.randint(2, 9)):
+                words = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 32))]
+                sentences.append(" ".join(words).capitalize() + rng.choice(".?!"))
+            sections.append(" ".join(sentences))
+    return sections
+
+
+def summarize(name: str, chunks: List[str], elapsed: float, total_chars: int) -> Dict[str, Any]:
+    tokens = [app.count_tokens(chunk) for chunk in chunks]
+    return {
+        "chunker": name,
+        "chunks": len(chunks),
+        "avgTokens": round(sum(tokens) / len(chunks), 1) if chunks else 0,
+        "tokenUtilization": round(sum(tokens) / (len(chunks) * app.MAX_TOKENS_PER_CHUNK), 3) if chunks else 0,
+        "overBudget": sum(1 for count in tokens if count > app.MAX_TOKENS_PER_CHUNK),
+        "sentenceAligned": round(sum(1 for chunk in chunks if chunk.rstrip()[-1:] in ".!?") / len(chunks), 3)
+        if chunks
+        else 0,
+        "seconds": round(elapsed, 4),
+        "mbPerSecond": round(total_chars / 1e6 / elapsed, 2) if elapsed else None,
+    }
+
+
+def run(pages: int, seed: int) -> List[Dict[str, Any]]:
+    sections = build_corpus(pages, seed)
+    total_chars = sum(len(section) for section in sections)
+
+    started = time.perf_counter()
+    fixed = app.split_text(app.normalize_text("\n".join(sections)))
+    fixed_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    semantic = list(app.iter_semantic_chunks(sections))
+    semantic_elapsed = time.perf_counter() - started
+
+    return [
+        summarize("split_text", fixed, fixed_elapsed, total_chars),
+        summarize("iter_semantic_chunks", semantic, semantic_elapsed, total_chars),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.pages, args.seed)
+    if args.json:
+        tokenizer = "tiktoken" if app.get_token_encoding() is not None else "estimate"
+        print(json.dumps({"benchmark": "chunking", "tokenizer": tokenizer, "results": results}))
+        return
+
+    for result in results:
+        print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
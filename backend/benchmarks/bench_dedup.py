@@ -0,0 +1,77 @@
+"""Time ``NearDuplicateIndex`` on a synthetic card set with paraphrased copies.
+
+Usage::
+
+    python backend/benchmarks/bench_dedup.py [--cards 30000] [--duplicate-rate 0.3] [--json]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app  # noqa: E402
+
+FILLERS = ["briefly", "exactly", "in practice", "typically", "overall"]
+
+
+def build_cards(count: int, duplicate_rate: float, seed: int) -> List[Dict[str, str]]:
+    """Return ``count`` cards where roughly ``duplicate_rate`` are light paraphrases of earlier ones."""
+
+    rng = random.Random(seed)
+    vocabulary = [f"term{index}" for index in range(5000)]
+    cards: List[Dict[str, str]] = []
+    for _ in range(count):
+        if cards and rng.random() < duplicate_rate:
+            original = rng.choice(cards)
+            words = original["answer"].split()
+            words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+            cards.append({"question": original["question"].rstrip("?") + " exactly?", "answer": " ".join(words)})
+            continue
+
+        topic = " ".join(rng.sample(vocabulary, 3))
+        answer = " ".join(rng.sample(vocabulary, rng.randint(8, 18)))
+        cards.append({"question": f"What does {topic} describe?", "answer": answer})
+    return cards
+
+
+def run(count: int, duplicate_rate: float, seed: int) -> Dict[str, Any]:
+    cards = build_cards(count, duplicate_rate, seed)
+
+    started = time.perf_counter()
+    index = app.NearDuplicateIndex()
+    kept = index.filter_cards(cards)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "benchmark": "near_duplicates",
+        "cards": count,
+        "kept": len(kept),
+        "duplicatesDropped": index.duplicates,
+        "seconds": round(elapsed, 4),
+        "cardsPerSecond": round(count / elapsed) if elapsed else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=30000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args.cards, args.duplicate_rate, args.seed)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Measure per-call latency saved by the pooled HTTP session and shared OpenAI client.
+
+Usage::
+
+    python backend/benchmarks/bench_http_pool.py [--calls 200] [--json]
+
+Runs against the local stub server, so the numbers cover TCP setup and client construction
+only; real upstreams add a TLS handshake to every unpooled call as well. Google Books calls go
+straight to the upstream fetch, past the lookup cache, and the app writes into a temporary data
+directory.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+DATA_DIR = tempfile.mkdtemp(prefix="memorypro-http-pool-")
+os.environ["MEMORYPRO_DATA_DIR"] = DATA_DIR
+
+import requests  # noqa: E402
+from openai import DefaultHttpxClient, OpenAI  # noqa: E402
+
+import app  # noqa: E402
+from stubs import start_stub_server  # noqa: E402
+
+
+def time_calls(name: str, calls: int, func: Callable[[], Any]) -> Dict[str, Any]:
+    func()  # warm up imports and the first connection
+    samples: List[float] = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "case": name,
+        "calls": calls,
+        "meanMs": round(statistics.fmean(samples), 3),
+        "p50Ms": round(samples[len(samples) // 2], 3),
+        "p95Ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def run(calls: int) -> List[Dict[str, Any]]:
+    server, base_url = start_stub_server()
+    search_url = f"{base_url}/books/v1/volumes"
+    openai_url = f"{base_url}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    app.GOOGLE_BOOKS_SEARCH_URL = search_url
+
+    def bare_requests() -> None:
+        requests.get(search_url, params={"q": "credit", "maxResults": 5}, timeout=5).json()
+
+    def pooled_search() -> None:
+        app._search_google_books_upstream("credit", 5)
+
+    def client_per_call() -> None:
+        client = OpenAI(api_key="benchmark", base_url=openai_url, max_retries=0, http_client=DefaultHttpxClient())
+        try:
+            app.create_chat_completion(client, "Here’s the text: stub", temperature=0.3, max_tokens=100)
+        finally:
+            client.close()
+
+    def shared_client() -> None:
+        app.create_chat_completion(app.get_openai_client(), "Here’s the text: stub", temperature=0.3, max_tokens=100)
+
+    try:
+        return [
+            time_calls("google_books: requests.get", calls, bare_requests),
+            time_calls("google_books: pooled session", calls, pooled_search),
+            time_calls("openai: client per call", calls, client_per_call),
+            time_calls("openai: shared client", calls, shared_client),
+        ]
+    finally:
+        server.shutdown()
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.calls)
+    if args.json:
+        print(json.dumps({"benchmark": "http_pool", "results": results}))
+        return
+    for result in results:
+        print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare ``extract_keywords`` with the original pairwise-substring implementation on large texts.
+
+Usage::
+
+    python backend/benchmarks/bench_keywords.py [--words 200000] [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app  # noqa: E402
+
+SUFFIXES = ["", "", "", "s", "ed", "ing", "ation", "er"]
+
+
+def legacy_extract_keywords(text: str, limit: int = 6) -> List[str]:
+    """``extract_keywords`` as it was before the stem index and heap, kept for comparison."""
+
+    cleaned = app.normalize_text(text)
+    if not cleaned:
+        return []
+
+    tokens = re.findall(r"[A-Za-z][A-Za-z'\-]+", cleaned.lower())
+    counter = Counter(token for token in tokens if len(token) > 4 and token not in app.KEYWORD_STOPWORDS)
+
+    keywords: List[str] = []
+    for token, _ in counter.most_common():
+        if any(token in existing or existing in token for existing in keywords):
+            continue
+        keywords.append(token)
+        if len(keywords) >= limit:
+            break
+
+    return keywords
+
+
+def build_text(words: int, vocabulary_size: int, seed: int) -> str:
+    """Zipf-distributed prose over ``vocabulary_size`` stems with common English suffixes."""
+
+    rng = random.Random(seed)
+    stems = ["".join(rng.choice("bcdfghklmnprstvw") + rng.choice("aeiou") for _ in range(3)) for _ in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+    chosen = rng.choices(stems, weights=weights, k=words)
+    sentences = []
+    for start in range(0, words, 12):
+        sentence = " ".join(stem + rng.choice(SUFFIXES) for stem in chosen[start : start + 12])
+        sentences.append(sentence.capitalize() + ".")
+    return " ".join(sentences)
+
+
+def time_call(function: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(words: int, vocabulary_size: int, limit: int, repeat: int, seed: int) -> Dict[str, Any]:
+    text = build_text(words, vocabulary_size, seed)
+    corpus = app.KeywordCorpus()
+    for offset in range(0, len(text), 4000):
+        corpus.add_document(text[offset : offset + 4000])
+
+    legacy = time_call(lambda: legacy_extract_keywords(text, limit), repeat)
+    current = time_call(lambda: app.extract_keywords(text, limit), repeat)
+    tfidf = time_call(lambda: app.extract_keywords(text, limit, corpus=corpus), repeat)
+    # Outlines ask for many keywords; this is where the pairwise scan grows quadratically.
+    legacy_wide = time_call(lambda: legacy_extract_keywords(text, limit * 50), repeat)
+    current_wide = time_call(lambda: app.extract_keywords(text, limit * 50), repeat)
+
+    return {
+        "benchmark": "extract_keywords",
+        "words": words,
+        "vocabulary": vocabulary_size,
+        "limit": limit,
+        "legacySeconds": round(legacy, 5),
+        "seconds": round(current, 5),
+        "tfidfSeconds": round(tfidf, 5),
+        "wideLimit": limit * 50,
+        "legacyWideSeconds": round(legacy_wide, 5),
+        "wideSeconds": round(current_wide, 5),
+        "speedupWide": round(legacy_wide / current_wide, 2) if current_wide else None,
+        "legacyKeywords": legacy_extract_keywords(text, limit),
+        "keywords": app.extract_keywords(text, limit),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=200_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args.words, args.vocabulary, args.limit, args.repeat, args.seed)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
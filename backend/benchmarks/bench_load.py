@@ -0,0 +1,233 @@
+"""Load-test every API route end to end against the local Google Books and OpenAI stubs.
+
+One gunicorn server (``--mode sync`` or ``async``, as in bench_serving.py) runs with a fresh data
+directory. Each scenario sends ``--requests`` requests at ``--concurrency`` and reports throughput,
+latency percentiles and the status codes it got back. The stubs answer after ``--latency`` seconds
+and fail ``--error-rate`` of the calls with 429/503, so the retry and stale-cache paths are
+exercised too. ``--stub-rpm`` makes the OpenAI stub enforce a requests-per-minute limit, and
+``--rpm-limit``/``--tpm-limit`` set the server's own shared budgets (``OPENAI_RPM_LIMIT`` and
+``OPENAI_TPM_LIMIT``), to see how well the server stays under a real account's limits. Uploads
+come from the synthetic corpus in corpus.py.
+
+Usage::
+
+    python backend/benchmarks/bench_load.py [--scenarios deck topics] [--requests 200] [--concurrency 20]
+        [--latency 0.05] [--error-rate 0.0] [--stub-rpm 0] [--rpm-limit 0] [--mode sync] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from bench_serving import BACKEND_DIR, MODES, Request, drive, free_port, start_server, wait_until_ready
+from corpus import write_corpus
+from stubs import start_stub_server
+
+USERS = 100
+BATCH_EVENTS = 50
+
+
+def deck_card_ids(base_url: str) -> List[str]:
+    page = httpx.get(f"{base_url}/api/decks/default/cards", params={"limit": 1000}, timeout=30).json()
+    return [card["cardId"] for card in page["cards"]]
+
+
+def enroll_users(base_url: str) -> None:
+    for user in range(USERS):
+        response = httpx.post(f"{base_url}/api/schedule/enroll", json={"userId": f"user{user}"}, timeout=30)
+        response.raise_for_status()
+
+
+def build_scenarios(
+    card_ids: List[str], documents: Dict[str, bytes]
+) -> Dict[str, Tuple[Callable[[int], Request], Tuple[int, ...]]]:
+    """Map each scenario name to its request factory and the statuses that count as success."""
+
+    def user(index: int) -> str:
+        return f"user{index % USERS}"
+
+    def upload(path: str, extension: str) -> Callable[[int], Request]:
+        return lambda index: ("POST", path, {"files": {"file": (f"corpus-{index}.{extension}", documents[extension])}})
+
+    def batch(index: int) -> Request:
+        now_ms = int(time.time() * 1000)
+        events = [
+            {
+                "timestamp": now_ms + offset,
+                "userId": user(index),
+                "cardId": card_ids[(index + offset) % len(card_ids)],
+                "correct": offset % 3 != 0,
+            }
+            for offset in range(BATCH_EVENTS)
+        ]
+        return "POST", "/api/progress/batch", {"json": events}
+
+    ok = (200,)
+    return {
+        "deck": (lambda index: ("GET", "/api/decks/default", {}), ok),
+        "deck_list": (lambda index: ("GET", "/api/decks", {}), ok),
+        "deck_cards": (
+            lambda index: ("GET", "/api/decks/default/cards", {"params": {"offset": index % 20, "limit": 50}}),
+            ok,
+        ),
+        "progress_post": (
+            lambda index: ("POST", "/api/progress", {"json": {"userId": user(index), "event": "correct"}}),
+            ok,
+        ),
+        "progress_get": (lambda index: ("GET", "/api/progress", {"params": {"userId": user(index), "limit": 50}}), ok),
+        "progress_batch": (batch, ok),
+        "schedule_review": (
+            lambda index: (
+                "POST",
+                "/api/schedule/review",
+                {"json": {"userId": user(index), "cardId": card_ids[index % len(card_ids)], "correct": index % 3 != 0}},
+            ),
+            (200, 409),
+        ),
+        "schedule_due": (lambda index: ("GET", "/api/schedule/due", {"params": {"userId": user(index)}}), ok),
+        "textbook_search": (
+            lambda index: ("GET", "/api/textbooks/search", {"params": {"q": f"credit reports {index}"}}),
+            ok,
+        ),
+        "textbook_chapters": (lambda index: ("GET", f"/api/textbooks/vol{index}/chapters", {}), ok),
+        "textbook_flashcards": (
+            lambda index: (
+                "POST",
+                "/api/textbooks/flashcards",
+                {"json": {"bookTitle": "Credit Handbook", "chapterTitle": f"Chapter {index}",
+                          "chapterSummary": "Disputes force an investigation of inaccurate entries."}},
+            ),
+            ok,
+        ),
+        "topics": (
+            lambda index: ("POST", "/api/topics/flashcards?cache=bypass", {"json": {"topic": f"Topic {index}"}}),
+            ok,
+        ),
+        "topics_shared": (
+            lambda index: ("POST", "/api/topics/flashcards?cache=refresh", {"json": {"topic": "Shared topic"}}),
+            ok,
+        ),
+        "topics_stream": (
+            lambda index: (
+                "POST",
+                "/api/topics/flashcards?cache=bypass&stream=ndjson",
+                {"json": {"topic": f"Topic {index}"}},
+            ),
+            ok,
+        ),
+        "document_txt": (upload("/api/documents/flashcards?cache=bypass", "txt"), ok),
+        "document_pdf": (upload("/api/documents/flashcards?cache=bypass", "pdf"), ok),
+        "document_docx": (upload("/api/documents/flashcards?cache=bypass", "docx"), ok),
+        "document_outline": (upload("/api/documents/outline", "pdf"), ok),
+        "document_job": (upload("/api/documents/jobs", "txt"), (202,)),
+        "cache_stats": (lambda index: ("GET", "/api/cache/stats", {}), ok),
+        "metrics": (lambda index: ("GET", "/metrics", {}), ok),
+    }
+
+
+SCENARIO_NAMES = tuple(build_scenarios(["card"], {}))
+
+
+def offset_requests(make_request: Callable[[int], Request], start: int) -> Callable[[int], Request]:
+    """Number requests from ``start``, so warm-up traffic never primes the caches of the measured run."""
+
+    return lambda index: make_request(start + index)
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub, stub_url = start_stub_server(latency=args.latency, error_rate=args.error_rate, rpm_limit=args.stub_rpm)
+    data_dir = Path(tempfile.mkdtemp(prefix="memorypro-load-"))
+    shutil.copy(BACKEND_DIR / "data" / "default_deck.json", data_dir / "default_deck.json")
+    documents = {
+        extension: path.read_bytes()
+        for extension, path in write_corpus(data_dir / "corpus", args.document_pages, args.seed).items()
+    }
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    extra_env = {
+        "OPENAI_MAX_RETRIES": str(args.openai_retries),
+        "OPENAI_RPM_LIMIT": str(args.rpm_limit),
+        "OPENAI_TPM_LIMIT": str(args.tpm_limit),
+    }
+    # Upstream failures log a traceback each; keep them out of the report unless asked for.
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    server = start_server(args.mode, port, stub_url, data_dir, args.workers, args.threads, extra_env, log)
+
+    results: List[Dict[str, Any]] = []
+    try:
+        wait_until_ready(base_url)
+        enroll_users(base_url)
+        scenarios = build_scenarios(deck_card_ids(base_url), documents)
+        for name in args.scenarios:
+            make_request, ok_statuses = scenarios[name]
+            warm_up = offset_requests(make_request, args.requests)
+            asyncio.run(drive(base_url, warm_up, min(args.requests, 20), args.concurrency, ok_statuses))
+            measured = asyncio.run(drive(base_url, make_request, args.requests, args.concurrency, ok_statuses))
+            results.append({"scenario": name, **measured})
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        stub.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+        if args.server_log:
+            log.close()
+
+    return {
+        "benchmark": "load",
+        "mode": args.mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "upstreamLatencySeconds": args.latency,
+        "upstreamErrorRate": args.error_rate,
+        "upstreamRpmLimit": args.stub_rpm,
+        "rpmLimit": args.rpm_limit,
+        "tpmLimit": args.tpm_limit,
+        "workers": args.workers,
+        "documentPages": args.document_pages,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIO_NAMES, default=list(SCENARIO_NAMES))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds each stubbed upstream call takes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--openai-retries", type=int, default=0, help="OPENAI_MAX_RETRIES for the server")
+    parser.add_argument("--stub-rpm", type=float, default=0.0, help="requests per minute the OpenAI stub allows")
+    parser.add_argument("--rpm-limit", type=float, default=0.0, help="OPENAI_RPM_LIMIT for the server")
+    parser.add_argument("--tpm-limit", type=float, default=0.0, help="OPENAI_TPM_LIMIT for the server")
+    parser.add_argument("--document-pages", type=int, default=20, help="pages per uploaded corpus document")
+    parser.add_argument("--mode", choices=tuple(MODES), default="sync")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16, help="threads per sync worker")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--server-log", type=Path, default=None, help="append the server's output to this file")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"mode={args.mode} requests={args.requests} concurrency={args.concurrency} latency={args.latency}s "
+          f"errorRate={args.error_rate}")
+    for entry in result["results"]:
+        print(
+            f"{entry['scenario']:<20} {entry['requestsPerSecond']:>8.1f} req/s  p50 {entry['p50Ms']:>8.1f} ms  "
+            f"p99 {entry['p99Ms']:>8.1f} ms  errors {entry['errors']:>4}  {entry['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Time the text, outline and parsing helpers on fixed synthetic inputs.
+
+Each case runs a single call on a seeded input, repeated with ``timeit``'s auto-ranging, and
+reports the median and fastest time per call. Inputs depend only on ``--seed`` and ``--scale``,
+so results from two commits can be compared directly (see ``run_suite.py --compare``).
+
+Usage::
+
+    python backend/benchmarks/bench_micro.py [--scale 1.0] [--repeat 5] [--only parse] [--json]
+"""
+
+import argparse
+import io
+import json
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app  # noqa: E402
+from corpus import build_pages, write_corpus  # noqa: E402
+from stubs import volume_payload  # noqa: E402
+from werkzeug.datastructures import FileStorage  # noqa: E402
+
+Case = Tuple[str, Callable[[], Any], Dict[str, Any]]
+
+
+def flashcard_payload(cards: int) -> str:
+    return json.dumps(
+        [
+            {"question": f"What does clause {index} require?", "answer": f"Notice within {index} days.", "tags": ["law"]}
+            for index in range(cards)
+        ]
+    )
+
+
+def topic_payload(cards: int) -> str:
+    return json.dumps(
+        {
+            "topic": "Credit",
+            "difficulty": "expert",
+            "flashcards": [
+                {"id": "auto", "front": f"Term {index}?", "back": "Definition.", "example": "", "category": "concept"}
+                for index in range(cards)
+            ],
+        }
+    )
+
+
+def streamed(parser_input: str, fragment_chars: int = 64) -> int:
+    parser = app.StreamingCardParser()
+    found = 0
+    for start in range(0, len(parser_input), fragment_chars):
+        found += len(parser.feed(parser_input[start:start + fragment_chars]))
+    return found
+
+
+def upload(data: bytes, filename: str) -> Callable[[], str]:
+    return lambda: app.extract_text_from_file(FileStorage(stream=io.BytesIO(data), filename=filename))
+
+
+def build_cases(scale: float, seed: int, corpus_dir: Path) -> List[Case]:
+    pages = build_pages(max(1, int(300 * scale)), seed)
+    sections = [paragraph for page in pages for paragraph in page]
+    text = "\n".join(sections)
+    summary = " ".join(sections[:3])
+    volume_info = volume_payload("vol1")["volumeInfo"]
+    cards = max(1, int(200 * scale))
+    books_payload = {"items": [volume_payload(f"vol{index}") for index in range(40)]}
+    documents = write_corpus(corpus_dir, max(1, int(50 * scale)), seed)
+    files = {extension: path.read_bytes() for extension, path in documents.items()}
+
+    rng = random.Random(seed)
+    keyword_text = " ".join(rng.choice(text.split()) + rng.choice(("", "s", "ing")) for _ in range(len(text) // 8))
+
+    return [
+        ("split_text", lambda: app.split_text(text), {"inputChars": len(text)}),
+        ("iter_semantic_chunks", lambda: list(app.iter_semantic_chunks(sections)), {"sections": len(sections)}),
+        ("extract_keywords", lambda: app.extract_keywords(keyword_text), {"inputChars": len(keyword_text)}),
+        ("outline_text", lambda: app.outline_text(text, limit=50), {"inputChars": len(text), "chapters": 50}),
+        ("build_chapter_outline", lambda: app.build_chapter_outline(volume_info), {}),
+        ("generate_flashcards", lambda: app.generate_flashcards("Credit Handbook", "Disputes", summary), {}),
+        ("parse_flashcard_response", lambda: app.parse_flashcard_response(flashcard_payload(cards), "doc"),
+         {"cards": cards}),
+        ("parse_topic_flashcard_response",
+         lambda: app.parse_topic_flashcard_response(topic_payload(cards), "Credit", "expert"), {"cards": cards}),
+        ("streaming_card_parser", lambda: streamed(flashcard_payload(cards)), {"cards": cards, "fragmentChars": 64}),
+        ("parse_google_books_results", lambda: app.parse_google_books_results(books_payload), {"items": 40}),
+        *(
+            (f"extract_text_{extension}", upload(data, f"corpus.{extension}"), {"bytes": len(data)})
+            for extension, data in files.items()
+        ),
+    ]
+
+
+def time_case(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    per_call = [total / number for total in timer.repeat(repeat, number)]
+    return {
+        "calls": number * repeat,
+        "medianMs": round(statistics.median(per_call) * 1000, 4),
+        "minMs": round(min(per_call) * 1000, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every input size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--only", nargs="+", default=None, help="run cases whose name contains any of these")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="memorypro-micro-") as corpus_dir:
+        cases = build_cases(args.scale, args.seed, Path(corpus_dir))
+        if args.only:
+            cases = [case for case in cases if any(term in case[0] for term in args.only)]
+        results = [{"case": name, **details, **time_case(func, args.repeat)} for name, func, details in cases]
+
+    # PDF pages are extracted in a process pool above PDF_PARALLEL_PAGE_THRESHOLD pages.
+    app._reset_pdf_extract_pool()
+
+    if args.json:
+        print(json.dumps({"benchmark": "micro", "scale": args.scale, "seed": args.seed, "results": results}))
+        return
+    for result in results:
+        print(f"{result['case']:<32} {result['medianMs']:>10.3f} ms  (min {result['minMs']:.3f} ms)")
+
+
+if __name__ == "__main__":
+    main()
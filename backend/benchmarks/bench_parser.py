@@ -0,0 +1,151 @@
+"""Compare the streaming card parser with the original topic-response parser on large outputs.
+
+Usage::
+
+    python backend/benchmarks/bench_parser.py [--cards 2000] [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import app  # noqa: E402
+
+
+def legacy_extract_json_object(text: str) -> Optional[Any]:
+    """The original character-by-character scan for the first decodable ``{...}``."""
+
+    start_idx: Optional[int] = None
+    depth = 0
+    in_string = False
+    escape_next = False
+
+    for idx, char in enumerate(text):
+        if in_string:
+            if escape_next:
+                escape_next = False
+                continue
+            if char == "\\":
+                escape_next = True
+                continue
+            if char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+            continue
+
+        if char == "{":
+            if depth == 0:
+                start_idx = idx
+            depth += 1
+            continue
+
+        if char == "}" and depth:
+            depth -= 1
+            if depth == 0 and start_idx is not None:
+                candidate = text[start_idx : idx + 1]
+                try:
+                    return json.loads(candidate)
+                except json.JSONDecodeError:
+                    start_idx = None
+
+    return None
+
+
+def legacy_parse(raw_response: str) -> Any:
+    """Decoding half of the original ``parse_topic_flashcard_response``."""
+
+    cleaned = raw_response.strip()
+    if cleaned.startswith("```"):
+        cleaned = re.sub(r"^```[a-zA-Z]*", "", cleaned, count=1).strip()
+        if cleaned.endswith("```"):
+            cleaned = cleaned[:-3].strip()
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        return legacy_extract_json_object(cleaned)
+
+
+def streaming_parse(raw_response: str, fragment_size: int = 0) -> Any:
+    parser = app.StreamingCardParser()
+    if not fragment_size:
+        return parser.feed(raw_response)
+    cards = []
+    for offset in range(0, len(raw_response), fragment_size):
+        cards.extend(parser.feed(raw_response[offset : offset + fragment_size]))
+    return cards
+
+
+def build_payload(cards: int) -> str:
+    return json.dumps(
+        {
+            "topic": "Credit reporting",
+            "difficulty": "expert",
+            "flashcards": [
+                {
+                    "id": f"card-{index}",
+                    "front": f"What does rule {index} of the \"Metro-2\" format {{require}}?",
+                    "back": "Furnishers must report [status codes] accurately; see section " + str(index) * 8,
+                    "example": "A 30-day late payment reported as current.\\nDispute it.",
+                    "category": "application",
+                }
+                for index in range(cards)
+            ],
+        },
+        indent=2,
+    )
+
+
+def time_call(function: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(cards: int, repeat: int) -> Dict[str, Any]:
+    payload = "```json\n" + build_payload(cards) + "\n```"
+    truncated = payload[: int(len(payload) * 0.9)]
+
+    legacy_truncated = legacy_parse(truncated)
+    results: Dict[str, Any] = {
+        "benchmark": "card_parser",
+        "cards": cards,
+        "payloadBytes": len(payload),
+        "legacyCompleteSeconds": round(time_call(lambda: legacy_parse(payload), repeat), 5),
+        "completeSeconds": round(time_call(lambda: streaming_parse(payload), repeat), 5),
+        "streamedCompleteSeconds": round(time_call(lambda: streaming_parse(payload, 16), repeat), 5),
+        "legacyTruncatedSeconds": round(time_call(lambda: legacy_parse(truncated), repeat), 5),
+        "truncatedSeconds": round(time_call(lambda: streaming_parse(truncated), repeat), 5),
+        "legacyTruncatedCards": len(legacy_truncated.get("flashcards", [])) if isinstance(legacy_truncated, dict) else 0,
+        "truncatedCards": len(streaming_parse(truncated)),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args.cards, args.repeat)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
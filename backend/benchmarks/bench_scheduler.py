@@ -0,0 +1,128 @@
+"""Time due-card lookups and reviews against a large Leitner schedule.
+
+Usage::
+
+    python backend/benchmarks/bench_scheduler.py [--cards 1000000] [--users 10000] [--queries 2000] [--json]
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from progress import LEITNER_INTERVALS_SECONDS, SCHEDULE_DUE_LIMIT, ProgressStore  # noqa: E402
+
+DECKS_PER_USER = 4
+DAY_MS = 86400 * 1000
+
+
+def schedule_rows(cards: int, users: int, now_ms: int, seed: int) -> Iterator[Tuple[Any, ...]]:
+    """Yield ``cards`` schedule rows spread evenly over ``users``, with due times from a week ago to a week ahead."""
+
+    rng = random.Random(seed)
+    buckets = len(LEITNER_INTERVALS_SECONDS)
+    for index in range(cards):
+        user = index % users
+        yield (
+            f"user{user}",
+            f"deck{(index // users) % DECKS_PER_USER}",
+            f"card{index}",
+            rng.randrange(buckets),
+            now_ms + rng.randint(-7 * DAY_MS, 7 * DAY_MS),
+        )
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50Ms": round(statistics.median(samples) * 1000, 4),
+        "p99Ms": round(percentile(samples, 0.99) * 1000, 4),
+        "maxMs": round(max(samples) * 1000, 4),
+    }
+
+
+def run(cards: int, users: int, queries: int, limit: int, seed: int) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="memorypro-schedule-"))
+    store = ProgressStore(workdir / "progress.sqlite3", workdir / "progress.json")
+    connection = store.connection()
+    now_ms = int(time.time() * 1000)
+
+    started = time.perf_counter()
+    with connection:
+        connection.executemany(
+            "INSERT INTO card_schedule (user_id, deck_id, card_id, bucket, due_ms) VALUES (?, ?, ?, ?, ?)",
+            schedule_rows(cards, users, now_ms, seed),
+        )
+    load_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed + 1)
+    deck_samples: List[float] = []
+    user_samples: List[float] = []
+    review_samples: List[float] = []
+    returned = 0
+    for _ in range(queries):
+        user = f"user{rng.randrange(users)}"
+        deck = f"deck{rng.randrange(DECKS_PER_USER)}"
+
+        started = time.perf_counter()
+        due = store.due(user, deck, limit=limit, now_ms=now_ms)
+        deck_samples.append(time.perf_counter() - started)
+        returned += len(due)
+
+        started = time.perf_counter()
+        store.due(user, limit=limit, now_ms=now_ms)
+        user_samples.append(time.perf_counter() - started)
+
+        if due:
+            started = time.perf_counter()
+            store.record_review(user, deck, due[0]["cardId"], rng.random() < 0.7, now_ms)
+            review_samples.append(time.perf_counter() - started)
+
+    database_bytes = store.path.stat().st_size
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "benchmark": "leitner_scheduler",
+        "cards": cards,
+        "users": users,
+        "queries": queries,
+        "limit": limit,
+        "loadSeconds": round(load_seconds, 3),
+        "avgCardsReturned": round(returned / queries, 2) if queries else 0,
+        "dueByDeck": summarize(deck_samples),
+        "dueByUser": summarize(user_samples),
+        "review": summarize(review_samples) if review_samples else None,
+        "databaseBytes": database_bytes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=SCHEDULE_DUE_LIMIT)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args.cards, args.users, args.queries, args.limit, args.seed)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
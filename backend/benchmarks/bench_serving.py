@@ -0,0 +1,210 @@
+"""Load-test the production server with sync (gthread) and async (uvicorn) workers.
+
+Each mode runs gunicorn with gunicorn.conf.py against the local stubs, which wait ``--latency``
+seconds per call like the real Google Books and OpenAI APIs would. A thread-per-request worker
+is capped at ``--threads`` in-flight upstream calls; an async worker is capped by its connection pool.
+
+Usage::
+
+    python backend/benchmarks/bench_serving.py [--route topics] [--requests 2000] [--concurrency 200] [--json]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from stubs import start_stub_server
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+MODES = {
+    "sync": ["--worker-class", "gthread", "app:create_app()"],
+    "async": ["--worker-class", "uvicorn.workers.UvicornWorker", "asgi:create_asgi_app()"],
+}
+ROUTES = ("topics", "search", "chapters")
+CLIENT_POOL_SIZE = 25
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def request_for(route: str, index: int) -> Request:
+    """Every request uses a distinct key so caches never answer for the upstream."""
+
+    if route == "mixed":
+        route = ROUTES[index % len(ROUTES)]
+    if route == "topics":
+        return "POST", "/api/topics/flashcards?cache=bypass", {"json": {"topic": f"Topic {index}"}}
+    if route == "search":
+        return "GET", "/api/textbooks/search", {"params": {"q": f"credit reports {index}"}}
+    return "GET", f"/api/textbooks/vol{index}/chapters", {}
+
+
+def start_server(
+    mode: str,
+    port: int,
+    stub_url: str,
+    data_dir: Path,
+    workers: int,
+    threads: int,
+    extra_env: Optional[Dict[str, str]] = None,
+    log: Any = None,
+) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "MEMORYPRO_DATA_DIR": str(data_dir),
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_MAX_RETRIES": "0",
+        "GOOGLE_BOOKS_API_URL": f"{stub_url}/books/v1/volumes",
+        "JOB_WORKERS": "1",
+        **(extra_env or {}),
+    }
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "-c", "gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--log-level", "warning",
+        *MODES[mode],
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=log)
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/decks/default", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+async def drive(
+    base_url: str,
+    make_request: Callable[[int], Request],
+    requests: int,
+    concurrency: int,
+    ok_statuses: Tuple[int, ...] = (200,),
+) -> Dict[str, Any]:
+    """Send ``requests`` requests built by ``make_request(index)``, at most ``concurrency`` at a time."""
+
+    # Several small client pools: httpcore scans the whole pool per request, which would make a
+    # single 200-connection client the bottleneck. Idle connections expire before the server's
+    # keep-alive timeout so a request never lands on a socket the server is closing.
+    shards = max(1, concurrency // CLIENT_POOL_SIZE)
+    limits = httpx.Limits(max_connections=CLIENT_POOL_SIZE, keepalive_expiry=2)
+    clients = [httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) for _ in range(shards)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one(index: int) -> None:
+        method, path, options = make_request(index)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await clients[index % shards].request(method, path, **options)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as exc:
+                statuses[type(exc).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(index) for index in range(requests)))
+    finally:
+        for client in clients:
+            await client.aclose()
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "seconds": round(elapsed, 3),
+        "requestsPerSecond": round(requests / elapsed, 1),
+        "p50Ms": round(statistics.median(ordered) * 1000, 1),
+        "p99Ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 1),
+        "errors": sum(count for status, count in statuses.items() if status not in {str(ok) for ok in ok_statuses}),
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def run_mode(mode: str, args: argparse.Namespace, stub_url: str) -> Dict[str, Any]:
+    data_dir = Path(tempfile.mkdtemp(prefix=f"memorypro-serving-{mode}-"))
+    shutil.copy(BACKEND_DIR / "data" / "default_deck.json", data_dir / "default_deck.json")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(mode, port, stub_url, data_dir, args.workers, args.threads)
+    try:
+        wait_until_ready(base_url)
+        make_request = functools.partial(request_for, args.route)
+        asyncio.run(drive(base_url, make_request, min(args.requests, 50), args.concurrency))  # warm up
+        return asyncio.run(drive(base_url, make_request, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--route", choices=(*ROUTES, "mixed"), default="topics")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds each stubbed upstream call takes")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16, help="threads per sync worker")
+    parser.add_argument("--mode", choices=(*MODES, "both"), default="both")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub_server(latency=args.latency)
+    modes = list(MODES) if args.mode == "both" else [args.mode]
+    result: Dict[str, Any] = {
+        "benchmark": "serving",
+        "route": args.route,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "upstreamLatencySeconds": args.latency,
+        "workers": args.workers,
+    }
+    try:
+        for mode in modes:
+            result[mode] = run_mode(mode, args, stub_url)
+    finally:
+        stub.shutdown()
+
+    if "sync" in result and "async" in result:
+        result["speedup"] = round(result["async"]["requestsPerSecond"] / result["sync"]["requestsPerSecond"], 2)
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Measure how long ``import app`` takes in a fresh interpreter, the cold start of every worker.
+
+Each run starts ``python -X importtime`` in a new process and parses its report, so the numbers
+include every transitive import but not interpreter startup itself. Also reports which lazily
+loaded modules (``app.LAZY_MODULES``) were imported anyway, and the time ``app.warm_up()`` adds.
+
+Usage::
+
+    python backend/benchmarks/bench_startup.py [--runs 7] [--top 10] [--max-ms 400] [--json]
+
+With ``--max-ms`` the script exits non-zero when the median import time exceeds the budget,
+so it can guard against a heavy import creeping back into module scope.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+LAZY_MODULE_NAMES = ("asyncio", "docx", "httpx", "openai", "pypdf", "requests")
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded = [name for name in {names!r} if name in sys.modules]
+if {warm_up!r}:
+    app.warm_up()
+print(json.dumps([imported - started, time.perf_counter() - imported, loaded]))
+"""
+
+
+def app_imports(stderr: str) -> List[Tuple[str, int]]:
+    """Return ``(module, cumulative_us)`` for ``app`` and each module it imports directly."""
+
+    children: List[Tuple[str, int]] = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        depth = len(match.group(3)) // 2
+        if depth == 0:
+            # -X importtime prints each module after everything it imported.
+            if match.group(4) == "app":
+                return [("app", int(match.group(2))), *children]
+            children = []
+        elif depth == 1:
+            children.append((match.group(4), int(match.group(2))))
+    return []
+
+
+def run_once(warm_up: bool) -> Dict[str, Any]:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.pop("WARM_UP_ON_START", None)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(names=LAZY_MODULE_NAMES, warm_up=warm_up)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_seconds, warm_up_seconds, loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        "importSeconds": import_seconds,
+        "warmUpSeconds": warm_up_seconds,
+        "loadedLazyModules": loaded,
+        "modules": app_imports(completed.stderr),
+    }
+
+
+def heaviest_modules(runs: List[Dict[str, Any]], top: int) -> List[Dict[str, Any]]:
+    """Median cumulative time of ``app``'s direct imports, heaviest first."""
+
+    samples: Dict[str, List[int]] = {}
+    for run in runs:
+        for name, cumulative_us in run["modules"][1:]:
+            samples.setdefault(name, []).append(cumulative_us)
+    ranked = sorted(((statistics.median(values), name) for name, values in samples.items()), reverse=True)
+    return [{"module": name, "ms": round(us / 1000, 1)} for us, name in ranked[:top]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=10, help="how many of the heaviest imports to list")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail when the median import exceeds this")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    runs = [run_once(warm_up=False) for _ in range(args.runs)]
+    warm_runs = [run_once(warm_up=True) for _ in range(max(1, args.runs // 2))]
+
+    import_ms = statistics.median(run["importSeconds"] for run in runs) * 1000
+    result: Dict[str, Any] = {
+        "benchmark": "startup",
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "importMs": round(import_ms, 1),
+        "importMinMs": round(min(run["importSeconds"] for run in runs) * 1000, 1),
+        "warmUpMs": round(statistics.median(run["warmUpSeconds"] for run in warm_runs) * 1000, 1),
+        "loadedLazyModules": sorted({name for run in runs for name in run["loadedLazyModules"]}),
+        "heaviestImports": heaviest_modules(runs, args.top),
+    }
+    if args.max_ms is not None:
+        result["maxMs"] = args.max_ms
+        result["withinBudget"] = import_ms <= args.max_ms
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key in ("runs", "python", "importMs", "importMinMs", "warmUpMs", "loadedLazyModules"):
+            print(f"{key}={result[key]}")
+        print("heaviest imports:")
+        for entry in result["heaviestImports"]:
+            print(f"  {entry['ms']:>8.1f} ms  {entry['module']}")
+        if "withinBudget" in result:
+            print(f"withinBudget={result['withinBudget']} (max {args.max_ms} ms)")
+
+    if result.get("withinBudget") is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
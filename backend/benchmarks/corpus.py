@@ -0,0 +1,134 @@
+"""Generate a reproducible corpus of synthetic PDF, DOCX and text documents for the upload benchmarks.
+
+Every document is built from the same seeded sentence generator, so a given ``--seed`` and size
+always produces the same text and timings can be compared across commits.
+
+Usage::
+
+    python backend/benchmarks/corpus.py OUTPUT_DIR [--pages 10 100 500] [--seed 7]
+
+writes ``pages-<n>.pdf``, ``pages-<n>.docx`` and ``pages-<n>.txt`` for each size.
+"""
+
+import argparse
+import random
+import textwrap
+from pathlib import Path
+from typing import Dict, List
+
+VOCABULARY = (
+    "credit report dispute bureau furnisher account balance payment history inquiry statute "
+    "consumer agency validation notice collection response accuracy investigation record "
+    "letter deadline evidence regulation compliance identity theft score utilization"
+).split()
+PARAGRAPHS_PER_PAGE = (3, 6)
+PDF_LINE_CHARS = 95
+
+
+def build_pages(pages: int, seed: int) -> List[List[str]]:
+    """Return ``pages`` pages, each a list of paragraphs of varied sentence length."""
+
+    rng = random.Random(seed)
+    document: List[List[str]] = []
+    for _ in range(pages):
+        paragraphs = []
+        for _ in range(rng.randint(*PARAGRAPHS_PER_PAGE)):
+            sentences = []
+            for _ in range(rng.randint(2, 6)):
+                words = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 20))]
+                sentences.append(" ".join(words).capitalize() + rng.choice(".?!"))
+            paragraphs.append(" ".join(sentences))
+        document.append(paragraphs)
+    return document
+
+
+def _pdf_literal(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, document: List[List[str]]) -> None:
+    """Write one letter-sized page of Helvetica text per page of ``document``."""
+
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for paragraphs in document:
+        lines: List[str] = []
+        for paragraph in paragraphs:
+            lines.extend(textwrap.wrap(paragraph, PDF_LINE_CHARS))
+            lines.append("")
+        operations = ["BT", "/F1 9 Tf", "11 TL", "40 760 Td"]
+        operations.extend(f"({_pdf_literal(line)}) Tj T*" for line in lines)
+        operations.append("ET")
+
+        content = DecodedStreamObject()
+        content.set_data("\n".join(operations).encode("latin-1"))
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        page[NameObject("/Contents")] = writer._add_object(content)
+
+    with open(path, "wb") as handle:
+        writer.write(handle)
+
+
+def write_docx(path: Path, document: List[List[str]]) -> None:
+    """Write every paragraph of ``document``, with a page break between pages."""
+
+    import docx
+
+    output = docx.Document()
+    for index, paragraphs in enumerate(document):
+        if index:
+            output.add_page_break()
+        for paragraph in paragraphs:
+            output.add_paragraph(paragraph)
+    output.save(str(path))
+
+
+def write_text(path: Path, document: List[List[str]]) -> None:
+    path.write_text("\n\n".join("\n".join(paragraphs) for paragraphs in document) + "\n", encoding="utf-8")
+
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx, "txt": write_text}
+
+
+def write_corpus(directory: Path, pages: int, seed: int = 7, formats: tuple = tuple(WRITERS)) -> Dict[str, Path]:
+    """Write ``pages-<pages>.<format>`` for each format into ``directory`` and return the paths by format."""
+
+    directory.mkdir(parents=True, exist_ok=True)
+    document = build_pages(pages, seed)
+    paths: Dict[str, Path] = {}
+    for extension in formats:
+        path = directory / f"pages-{pages}.{extension}"
+        WRITERS[extension](path, document)
+        paths[extension] = path
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--formats", nargs="+", choices=tuple(WRITERS), default=list(WRITERS))
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        for path in write_corpus(args.output, pages, args.seed, tuple(args.formats)).values():
+            print(f"{path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Run the benchmark suite and save one JSON document per commit, or compare two of them.
+
+Every benchmark runs in its own process with ``--json``; the results are stored together with the
+commit, interpreter and machine they came from. ``--quick`` shrinks every workload so the whole
+suite finishes in a few minutes.
+
+Usage::
+
+    python backend/benchmarks/run_suite.py [--quick] [--only micro load] --output before.json
+    python backend/benchmarks/run_suite.py [--quick] --output after.json
+    python backend/benchmarks/run_suite.py --compare before.json after.json [--threshold 0.1]
+
+Comparisons only mean something between runs on the same machine with the same options.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+
+# name -> (script, full-size arguments, --quick arguments)
+SUITE: Dict[str, Tuple[str, List[str], List[str]]] = {
+    "micro": ("bench_micro.py", [], ["--scale", "0.25", "--repeat", "3"]),
+    "chunking": ("bench_chunking.py", [], ["--pages", "60"]),
+    "keywords": ("bench_keywords.py", [], ["--words", "50000", "--repeat", "3"]),
+    "parser": ("bench_parser.py", [], ["--cards", "500", "--repeat", "3"]),
+    "dedup": ("bench_dedup.py", [], ["--cards", "5000"]),
+    "scheduler": ("bench_scheduler.py", [], ["--cards", "100000", "--users", "1000", "--queries", "500"]),
+    "http_pool": ("bench_http_pool.py", [], ["--calls", "50"]),
+    "startup": ("bench_startup.py", [], ["--runs", "3"]),
+    "load": ("bench_load.py", [], ["--requests", "60", "--concurrency", "10", "--document-pages", "5"]),
+    "serving": ("bench_serving.py", [], ["--requests", "300", "--concurrency", "50"]),
+}
+ENTRY_KEYS = ("case", "scenario", "chunker", "module")
+LOWER_IS_BETTER = ("seconds", "ms")
+HIGHER_IS_BETTER = ("persecond", "speedup")
+
+
+def git(*args: str) -> str:
+    try:
+        completed = subprocess.run(["git", *args], cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return completed.stdout.strip()
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--", str(BENCHMARKS_DIR.parent))),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "startedAt": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def run_benchmark(name: str, quick: bool) -> Dict[str, Any]:
+    script, full_args, quick_args = SUITE[name]
+    command = [sys.executable, str(BENCHMARKS_DIR / script), *(quick_args if quick else full_args), "--json"]
+    print(f"running {name}: {' '.join(command[1:])}", file=sys.stderr)
+    # A fixed hash seed keeps set iteration order, and so any order-dependent output, identical between runs.
+    env = {**os.environ, "PYTHONHASHSEED": "0"}
+    completed = subprocess.run(command, cwd=BENCHMARKS_DIR, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-20:], "returncode": completed.returncode}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def flatten(value: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield ``(path, number)`` for every numeric leaf; list entries are keyed by their case name."""
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = next((str(item[key]) for key in ENTRY_KEYS if isinstance(item, dict) and key in item), str(index))
+            yield from flatten(item, f"{prefix}[{label}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def direction(path: str) -> Optional[int]:
+    """+1 if a larger value is better, -1 if smaller is better, None for counts and settings."""
+
+    leaf = path.rsplit(".", 1)[-1].lower()
+    if any(marker in leaf for marker in HIGHER_IS_BETTER):
+        return 1
+    if any(leaf.endswith(marker) or leaf.startswith(marker) for marker in LOWER_IS_BETTER):
+        return -1
+    return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> int:
+    """Print every timing that moved by more than ``threshold``; return the number of regressions."""
+
+    print(f"baseline {baseline['environment']['commit'][:12]}  current {current['environment']['commit'][:12]}")
+    for name in sorted(baseline["results"].keys() ^ current["results"].keys()):
+        print(f"  only in {'baseline' if name in baseline['results'] else 'current'}: {name}")
+    shared = baseline["results"].keys() & current["results"].keys()
+    before = dict(flatten({name: baseline["results"][name] for name in shared}))
+    after = dict(flatten({name: current["results"][name] for name in shared}))
+
+    regressions = 0
+    for path in sorted(before.keys() & after.keys()):
+        old, new = before[path], after[path]
+        better = direction(path)
+        if better is None:
+            if old != new:
+                print(f"  changed     {path}: {old:g} -> {new:g}")
+            continue
+        if not old:
+            continue
+        change = (new - old) / old
+        if abs(change) < threshold:
+            continue
+        verdict = "improved" if change * better > 0 else "regressed"
+        regressions += verdict == "regressed"
+        print(f"  {verdict:<11} {path}: {old:g} -> {new:g} ({change:+.1%})")
+
+    for path in sorted(before.keys() - after.keys()):
+        print(f"  missing     {path}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=tuple(SUITE), default=None)
+    parser.add_argument("--skip", nargs="+", choices=tuple(SUITE), default=[])
+    parser.add_argument("--quick", action="store_true", help="run every benchmark on a small workload")
+    parser.add_argument("--output", type=Path, default=None, help="write the results here instead of stdout")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASELINE", "CURRENT"))
+    parser.add_argument("--threshold", type=float, default=0.1, help="smallest relative change to report")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        if baseline.get("quick") != current.get("quick"):
+            print("warning: comparing a --quick run with a full-size run", file=sys.stderr)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    names = [name for name in (args.only or SUITE) if name not in args.skip]
+    document = {
+        "suite": "memorypro-benchmarks",
+        "quick": args.quick,
+        "environment": environment(),
+        "results": {name: run_benchmark(name, args.quick) for name in names},
+    }
+    output = json.dumps(document, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+        print(f"wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
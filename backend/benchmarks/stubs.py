@@ -0,0 +1,248 @@
+"""Local stand-ins for the Google Books and OpenAI chat-completions APIs.
+
+The stub speaks HTTP/1.1 with keep-alive so connection reuse can be measured, and serves:
+
+* ``GET /books/v1/volumes`` and ``GET /books/v1/volumes/<id>`` with Google Books-shaped JSON
+* ``POST /v1/chat/completions`` with an OpenAI-shaped completion containing flashcard JSON, or
+  the same content as server-sent chunks when the request sets ``"stream": true``
+
+Pass ``latency`` to delay every response, standing in for the real services' round trip, and
+``error_rate`` to fail that fraction of calls the way the services do under load: OpenAI with a
+``429`` rate-limit error, Google Books with a ``503``. ``rpm_limit`` enforces a requests-per-minute
+limit on chat completions, answering with ``x-ratelimit-*`` headers and a ``429`` with
+``Retry-After`` once it is exceeded.
+
+Run it on its own to point a development server at it::
+
+    python backend/benchmarks/stubs.py [--port 8900] [--latency 0.2] [--error-rate 0.05] [--rpm-limit 600]
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 GOOGLE_BOOKS_API_URL=http://127.0.0.1:8900/books/v1/volumes \\
+        OPENAI_API_KEY=stub python backend/app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+def volume_payload(volume_id: str) -> Dict[str, Any]:
+    return {
+        "id": volume_id,
+        "volumeInfo": {
+            "title": f"Consumer Credit Handbook {volume_id}",
+            "authors": ["Avery Stone"],
+            "publishedDate": "2021",
+            "description": (
+                "Credit reports summarize account history. Furnishers report balances and payments "
+                "to bureaus. Disputes force an investigation of inaccurate entries. Validation letters "
+                "ask collectors to prove a debt. Statutes set deadlines for every response."
+            ),
+            "pageCount": 320,
+            "categories": ["Business & Economics / Personal Finance"],
+            "infoLink": f"https://books.example/{volume_id}",
+        },
+    }
+
+
+def completion_payload(prompt: str) -> Dict[str, Any]:
+    if '"flashcards"' in prompt:
+        content = json.dumps(
+            {
+                "topic": "stub",
+                "difficulty": "beginner",
+                "flashcards": [
+                    {"id": f"auto-{index}", "front": f"Stub question {index}?", "back": "Stub answer.", "category": "concept"}
+                    for index in range(1, 13)
+                ],
+            }
+        )
+    else:
+        content = json.dumps(
+            [{"question": f"Stub question {index}?", "answer": "Stub answer.", "tags": ["stub"]} for index in range(1, 6)]
+        )
+
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": len(prompt) // 4 + len(content) // 4,
+        },
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.0
+    error_rate = 0.0
+    rpm_limit = 0.0
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - signature from BaseHTTPRequestHandler
+        return
+
+    def _send_json(self, payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(
+        self,
+        content: str,
+        usage: Optional[Dict[str, int]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        piece_chars: int = 16,
+    ) -> None:
+        """Send ``content`` as server-sent chat.completion.chunk events, like ``stream=True``.
+
+        With ``usage``, a final chunk without choices carries it, as ``stream_options.include_usage`` asks.
+        """
+
+        if self.latency:
+            time.sleep(self.latency)
+        events = [
+            {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+             "choices": [{"index": 0, "delta": {"content": content[start:start + piece_chars]}, "finish_reason": None}]}
+            for start in range(0, len(content), piece_chars)
+        ]
+        if usage is not None:
+            events.append(
+                {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": "stub", "choices": [],
+                 "usage": usage}
+            )
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        encoded = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+    def _rate_limit(self) -> Tuple[bool, Dict[str, str]]:
+        """Charge one request against ``rpm_limit``; return whether it is allowed and the rate-limit headers.
+
+        Like OpenAI, the per-minute limit is enforced per second: the bucket holds one second of requests.
+        """
+
+        if not self.rpm_limit:
+            return True, {}
+        server = self.server
+        rate = self.rpm_limit / 60
+        with server.rate_lock:
+            now = time.monotonic()
+            server.rate_level = min(rate, server.rate_level + (now - server.rate_updated) * rate)
+            server.rate_updated = now
+            allowed = server.rate_level >= 1
+            if allowed:
+                server.rate_level -= 1
+            level = server.rate_level
+        headers = {
+            "x-ratelimit-limit-requests": str(int(self.rpm_limit)),
+            "x-ratelimit-remaining-requests": str(int(self.rpm_limit * max(0.0, level) / rate)),
+        }
+        if not allowed:
+            headers["retry-after"] = f"{(1 - level) / rate:.3f}"
+        return allowed, headers
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.startswith("/books/v1/volumes") and self._should_fail():
+            self._send_json({"error": {"code": 503, "message": "Backend Error", "status": "UNAVAILABLE"}}, status=503)
+        elif path == "/books/v1/volumes":
+            self._send_json({"items": [volume_payload(f"vol{index}") for index in range(5)]})
+        elif path.startswith("/books/v1/volumes/"):
+            self._send_json(volume_payload(path.rsplit("/", 1)[-1]))
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        allowed, headers = self._rate_limit()
+        if not allowed or self._should_fail():
+            error = {"message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"}
+            self._send_json({"error": error}, status=429, headers=headers)
+        else:
+            messages = payload.get("messages") or [{}]
+            completion = completion_payload(messages[-1].get("content", ""))
+            if payload.get("stream"):
+                include_usage = (payload.get("stream_options") or {}).get("include_usage")
+                self._send_stream(
+                    completion["choices"][0]["message"]["content"],
+                    completion["usage"] if include_usage else None,
+                    headers,
+                )
+            else:
+                self._send_json(completion, headers=headers)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], handler: type) -> None:
+        super().__init__(address, handler)
+        self.rate_lock = threading.Lock()
+        self.rate_level = handler.rpm_limit / 60
+        self.rate_updated = time.monotonic()
+
+
+def start_stub_server(
+    host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, error_rate: float = 0.0, rpm_limit: float = 0.0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread and return the server and its base URL."""
+
+    handler = StubHandler
+    if latency or error_rate or rpm_limit:
+        settings = {"latency": latency, "error_rate": error_rate, "rpm_limit": rpm_limit}
+        handler = type("ConfiguredStubHandler", (StubHandler,), settings)
+    server = StubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="benchmark-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the Google Books and OpenAI stand-ins until interrupted.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429/503")
+    parser.add_argument("--rpm-limit", type=float, default=0.0, help="answer chat completions over this rate with 429")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, args.latency, args.error_rate, args.rpm_limit)
+    print(
+        f"Stub APIs listening on {url} (latency={args.latency}s, error rate={args.error_rate}, "
+        f"rpm limit={args.rpm_limit or 'none'})"
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
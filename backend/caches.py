@@ -0,0 +1,377 @@
+"""Persistent and in-process caches for generated flashcards and Google Books lookups."""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from coalesce import SQLiteLease, SingleFlight
+from lazy import asyncio, upstream_errors
+from storage import get_sqlite_connection
+
+logger = logging.getLogger("app")
+
+
+class SQLiteCache:
+    """Persistent key/value cache with TTL expiry and LRU eviction by entry count and size.
+
+    Hits record their access time in memory and write them in batches; the size limits are checked
+    against running totals, with a full scan only when they are crossed or every ``EVICT_CHECK_SETS`` writes.
+    """
+
+    ACCESS_FLUSH_ENTRIES = 256
+    ACCESS_FLUSH_SECONDS = 30.0
+    EVICT_CHECK_SETS = 500
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS cache_entries_accessed_idx ON cache_entries (accessed_at);
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int, max_bytes: int) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+        # Entry count and bytes as of the last scan plus this process's writes since; None until scanned.
+        self._totals: Optional[Tuple[int, int]] = None
+        self._sets_since_check = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        return get_sqlite_connection(self.path, self.SCHEMA)
+
+    def _touch(self, key: str, now: float) -> None:
+        with self._counter_lock:
+            self._pending_access[key] = now
+            if (
+                len(self._pending_access) < self.ACCESS_FLUSH_ENTRIES
+                and time.monotonic() - self._last_access_flush < self.ACCESS_FLUSH_SECONDS
+            ):
+                return
+        self.flush_access_times()
+
+    def flush_access_times(self) -> None:
+        """Write the access times of recent hits, which LRU eviction orders by."""
+
+        with self._counter_lock:
+            pending, self._pending_access = self._pending_access, {}
+            self._last_access_flush = time.monotonic()
+        if not pending:
+            return
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in pending.items()],
+            )
+
+    def _record(self, hit: bool) -> None:
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return ``(value, stored_at)`` for a live entry, or None."""
+
+        connection = self._connection()
+        row = connection.execute("SELECT value, created_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+
+        if row is None or now - row["created_at"] > self.ttl_seconds:
+            if row is not None:
+                self.delete(key)
+            self._record(hit=False)
+            return None
+
+        self._touch(key, now)
+        self._record(hit=True)
+        return row["value"], row["created_at"]
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        now = time.time()
+        stored_at = now if stored_at is None else stored_at
+        size = len(value.encode("utf-8"))
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, stored_at, now),
+            )
+
+        with self._counter_lock:
+            self._sets_since_check += 1
+            if self._totals is not None:
+                self._totals = (self._totals[0] + 1, self._totals[1] + size)
+            due = (
+                self._totals is None
+                or self._totals[0] > self.max_entries
+                or self._totals[1] > self.max_bytes
+                # Other processes write to the same file; rescan now and then to see their entries too.
+                or self._sets_since_check >= self.EVICT_CHECK_SETS
+            )
+        if due:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self) -> int:
+        with self._counter_lock:
+            self._pending_access.clear()
+            self._totals = (0, 0)
+        connection = self._connection()
+        with connection:
+            return connection.execute("DELETE FROM cache_entries").rowcount
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until the size limits hold."""
+
+        self.flush_access_times()
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM cache_entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            count, total = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                rows = connection.execute("SELECT key, size FROM cache_entries ORDER BY accessed_at").fetchall()
+                stale_keys: List[str] = []
+                for row in rows:
+                    if count <= self.max_entries and total <= self.max_bytes:
+                        break
+                    stale_keys.append(row["key"])
+                    count -= 1
+                    total -= row["size"]
+                connection.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in stale_keys])
+
+        with self._counter_lock:
+            self._totals = (count, total)
+            self._sets_since_check = 0
+
+    def stats(self) -> Dict[str, Any]:
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+        ).fetchone()
+        with self._counter_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "ttlSeconds": self.ttl_seconds,
+        }
+
+
+class StaleWhileRevalidateCache:
+    """In-process LRU in front of a ``SQLiteCache`` that serves stale entries while refreshing them.
+
+    Expired entries are reloaded through one shared call, falling back to the stale value if upstream fails.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        disk: SQLiteCache,
+        fresh_seconds: float,
+        revalidate_seconds: float,
+        memory_entries: int,
+        lease: Optional[SQLiteLease] = None,
+    ) -> None:
+        self.name = name
+        self.disk = disk
+        self.fresh_seconds = fresh_seconds
+        self.revalidate_seconds = revalidate_seconds
+        self.memory_entries = memory_entries
+        self.counters = {"memoryHits": 0, "diskHits": 0, "staleServed": 0, "misses": 0, "fallbacks": 0}
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._lock = threading.Lock()
+        self.flights = SingleFlight(name, lease=lease)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _disk_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        return self._lookup_memory(key) or self._lookup_disk(key)
+
+    def _lookup_memory(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.counters["memoryHits"] += 1
+            return entry
+
+    def _lookup_disk(self, key: str) -> Optional[Tuple[Any, float]]:
+        disk_entry = self.disk.get_entry(self._disk_key(key))
+        if disk_entry is None:
+            return None
+
+        entry = (json.loads(disk_entry[0]), disk_entry[1])
+        self._remember(key, entry)
+        self._count("diskHits")
+        return entry
+
+    def _remember(self, key: str, entry: Tuple[Any, float]) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: str, value: Any) -> None:
+        stored_at = time.time()
+        self.disk.set(self._disk_key(key), json.dumps(value), stored_at=stored_at)
+        self._remember(key, (value, stored_at))
+
+    def _revalidate(self, key: str, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> None:
+            try:
+                self._store(key, loader())
+            except Exception:  # pragma: no cover - depends on network/API
+                logger.warning("Background refresh of %s cache entry failed", self.name, exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"{self.name}-revalidate", daemon=True).start()
+
+    def _revalidate_async(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def refresh() -> None:
+            try:
+                await asyncio.to_thread(self._store, key, await loader())
+            except Exception:  # pragma: no cover - depends on network/API
+                logger.warning("Background refresh of %s cache entry failed", self.name, exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _age(self, entry: Tuple[Any, float]) -> str:
+        age = time.time() - entry[1]
+        if age <= self.fresh_seconds:
+            return "fresh"
+        if age <= self.fresh_seconds + self.revalidate_seconds:
+            self._count("staleServed")
+            return "stale"
+        return "expired"
+
+    def _fallback(self, entry: Optional[Tuple[Any, float]]) -> Any:
+        """Called from an ``except`` block: re-raises unless there is a stale entry to serve."""
+
+        if entry is None:
+            raise
+        logger.warning("Upstream failed; serving stale %s cache entry", self.name, exc_info=True)
+        self._count("fallbacks")
+        return entry[0]
+
+    def fetch(self, key: str, loader: Callable[[], Any]) -> Any:
+        entry = self._lookup(key)
+        if entry is not None:
+            age = self._age(entry)
+            if age == "stale":
+                self._revalidate(key, loader)
+            if age != "expired":
+                return entry[0]
+
+        self._count("misses")
+        return self.flights.do(key, lambda: self._load(key, loader, entry), lambda: self._reload_fresh(key))
+
+    def _load(self, key: str, loader: Callable[[], Any], entry: Optional[Tuple[Any, float]]) -> Any:
+        try:
+            value = loader()
+        except upstream_errors():
+            return self._fallback(entry)
+
+        self._store(key, value)
+        return value
+
+    def _reload_fresh(self, key: str) -> Any:
+        """The value another worker just stored for ``key``, or None if the disk has nothing fresh."""
+
+        disk_entry = self.disk.get_entry(self._disk_key(key))
+        if disk_entry is None or time.time() - disk_entry[1] > self.fresh_seconds:
+            return None
+        entry = (json.loads(disk_entry[0]), disk_entry[1])
+        self._remember(key, entry)
+        return entry[0]
+
+    async def fetch_async(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Like :meth:`fetch`, for loaders that are coroutines; revalidation runs as a task on the loop."""
+
+        entry = self._lookup_memory(key) or await asyncio.to_thread(self._lookup_disk, key)
+        if entry is not None:
+            age = self._age(entry)
+            if age == "stale":
+                self._revalidate_async(key, loader)
+            if age != "expired":
+                return entry[0]
+
+        self._count("misses")
+
+        async def load() -> Any:
+            try:
+                value = await loader()
+            except upstream_errors():
+                return self._fallback(entry)
+
+            await asyncio.to_thread(self._store, key, value)
+            return value
+
+        return await self.flights.do_async(key, load, lambda: self._reload_fresh(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {**self.counters, "memoryEntries": len(self._memory), "freshSeconds": self.fresh_seconds}
+        return {**stats, "coalescing": self.flights.stats()}
@@ -0,0 +1,198 @@
+"""Coalescing of identical in-flight calls, within a process and across workers."""
+
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from lazy import asyncio
+from metrics import coalesced_requests_total
+from storage import get_sqlite_connection
+
+
+class SQLiteLease:
+    """Named leases in a SQLite file, so one worker process at a time runs the call for a key.
+
+    A lease expires after ``ttl_seconds`` even if its holder never releases it (a killed worker),
+    after which the next process to ask takes it over.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS leases (
+        key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+    def _connection(self) -> sqlite3.Connection:
+        return get_sqlite_connection(self.path, self.SCHEMA)
+
+    def acquire(self, key: str) -> Optional[str]:
+        """Take the lease on ``key`` and return its owner token, or None while another holder has it."""
+
+        owner = uuid.uuid4().hex
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            inserted = connection.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + self.ttl_seconds),
+            ).rowcount
+        return owner if inserted else None
+
+    def release(self, key: str, owner: str) -> None:
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def held(self, key: str) -> bool:
+        row = self._connection().execute("SELECT expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+        return row is not None and row["expires_at"] >= time.time()
+
+
+T = TypeVar("T")
+
+
+class FlightAbandoned(Exception):
+    """The leading caller went away (client disconnect, cancelled task) before it had a result."""
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one, sharing its result or exception.
+
+    With a ``lease``, a leader that finds the key leased by another worker waits, then tries ``recheck`` first.
+    """
+
+    POLL_INTERVAL_SECONDS = 0.05
+
+    def __init__(self, name: str, lease: Optional[SQLiteLease] = None) -> None:
+        self.name = name
+        self.lease = lease
+        self.counters = {"leaders": 0, "followers": 0, "leaseWaits": 0}
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def begin(self, key: str) -> Tuple[Future, bool]:
+        """Return the future for ``key`` and whether the caller leads it and must :meth:`finish` it."""
+
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.counters["followers"] += 1
+                coalesced_requests_total.inc(self.name, "process")
+                return future, False
+            future = Future()
+            # A running future cannot be cancelled, so a follower's cancelled task leaves it intact.
+            future.set_running_or_notify_cancel()
+            self._flights[key] = future
+            self.counters["leaders"] += 1
+            return future, True
+
+    def finish(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publish the leader's result, or its error, to every follower of ``key``."""
+
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.set_exception(FlightAbandoned(f"{self.name} call for {key!r} was abandoned"))
+
+    def do(self, key: str, loader: Callable[[], T], recheck: Optional[Callable[[], Optional[T]]] = None) -> T:
+        while True:
+            future, leader = self.begin(key)
+            if not leader:
+                try:
+                    return future.result()
+                except FlightAbandoned:
+                    continue
+            try:
+                result = self._lead(key, loader, recheck)
+            except BaseException as exc:
+                self.finish(key, future, error=exc)
+                raise
+            self.finish(key, future, result)
+            return result
+
+    def _lead(self, key: str, loader: Callable[[], T], recheck: Optional[Callable[[], Optional[T]]]) -> T:
+        if self.lease is None or recheck is None:
+            return loader()
+        lease_key = f"{self.name}:{key}"
+        while True:
+            owner = self.lease.acquire(lease_key)
+            if owner is not None:
+                try:
+                    return loader()
+                finally:
+                    self.lease.release(lease_key, owner)
+            self._count("leaseWaits")
+            while self.lease.held(lease_key):
+                time.sleep(self.POLL_INTERVAL_SECONDS)
+            result = recheck()
+            if result is not None:
+                coalesced_requests_total.inc(self.name, "lease")
+                return result
+
+    async def do_async(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[T]],
+        recheck: Optional[Callable[[], Optional[T]]] = None,
+    ) -> T:
+        """Like :meth:`do`, for coroutine loaders; followers, lease calls and ``recheck`` never block the loop."""
+
+        while True:
+            future, leader = self.begin(key)
+            if not leader:
+                try:
+                    return await asyncio.wrap_future(future)
+                except FlightAbandoned:
+                    continue
+            try:
+                result = await self._lead_async(key, loader, recheck)
+            except BaseException as exc:
+                self.finish(key, future, error=exc)
+                raise
+            self.finish(key, future, result)
+            return result
+
+    async def _lead_async(
+        self, key: str, loader: Callable[[], Awaitable[T]], recheck: Optional[Callable[[], Optional[T]]]
+    ) -> T:
+        if self.lease is None or recheck is None:
+            return await loader()
+        lease_key = f"{self.name}:{key}"
+        while True:
+            owner = await asyncio.to_thread(self.lease.acquire, lease_key)
+            if owner is not None:
+                try:
+                    return await loader()
+                finally:
+                    await asyncio.to_thread(self.lease.release, lease_key, owner)
+            self._count("leaseWaits")
+            while await asyncio.to_thread(self.lease.held, lease_key):
+                await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
+            result = await asyncio.to_thread(recheck)
+            if result is not None:
+                coalesced_requests_total.inc(self.name, "lease")
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "inFlight": len(self._flights), "acrossWorkers": self.lease is not None}
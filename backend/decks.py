@@ -0,0 +1,265 @@
+"""Deck files: compiled in memory for whole-deck responses and indexed in SQLite for listings and pages."""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dedup import flashcard_text
+from storage import get_sqlite_connection, load_json, utc_timestamp
+
+DECK_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+DECK_GZIP_MIN_BYTES = 1024
+DECK_MAX_TAGS = 50
+
+
+def flashcard_id(card: Dict[str, Any]) -> str:
+    """Stable identifier for a card: its own ``id`` if it has one, otherwise a hash of its text."""
+
+    if card.get("id"):
+        return str(card["id"])
+    return hashlib.sha1(flashcard_text(card).encode("utf-8")).hexdigest()[:16]
+
+
+class CompiledDeck:
+    """A parsed deck together with its ready-to-send JSON body, gzip body and validators."""
+
+    def __init__(self, deck: Any, body: bytes, mtime_ns: int, size: int) -> None:
+        self.deck = deck
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= DECK_GZIP_MIN_BYTES else None
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.last_modified = datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc)
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + len(self.gzip_body or b"")
+
+
+class DeckFileCache:
+    """Keeps compiled deck files in memory, reloading one only when its mtime or size changes.
+
+    Each lookup costs a ``stat``. Entries are evicted least-recently-used once their serialized
+    bodies exceed ``max_bytes``. Returned decks are shared and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int, dumps: Callable[[Any], str]) -> None:
+        self.max_bytes = max_bytes
+        self.dumps = dumps
+        self.counters = {"hits": 0, "loads": 0, "evictions": 0}
+        self._entries: "OrderedDict[Path, CompiledDeck]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> Optional[CompiledDeck]:
+        """Return the compiled deck at ``path``, or ``None`` if the file does not exist."""
+
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.discard(path)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(path)
+                self.counters["hits"] += 1
+                return entry
+
+        deck = load_json(path, default={})
+        entry = CompiledDeck(deck, self.dumps(deck).encode("utf-8"), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[path] = entry
+            self._bytes += entry.nbytes
+            self.counters["loads"] += 1
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.counters["evictions"] += 1
+        return entry
+
+    def discard(self, path: Path) -> None:
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "bytes": self._bytes}
+
+
+class DeckStore:
+    """SQLite index of the ``*_deck.json`` files in a directory, re-imported when a file changes.
+
+    Listings read only deck metadata and card pages are index range scans, so no deck is parsed to serve one.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS decks (
+        name TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL,
+        card_count INTEGER NOT NULL,
+        tags TEXT NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        indexed_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS deck_tags (
+        tag TEXT NOT NULL,
+        deck TEXT NOT NULL,
+        PRIMARY KEY (tag, deck)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS deck_cards (
+        deck TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        card_id TEXT NOT NULL,
+        card TEXT NOT NULL,
+        PRIMARY KEY (deck, position)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: Path, directory: Path) -> None:
+        self.path = path
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        return get_sqlite_connection(self.path, self.SCHEMA)
+
+    def _deck_path(self, name: str) -> Optional[Path]:
+        if not DECK_NAME_PATTERN.match(name or ""):
+            return None
+        return self.directory / f"{name}_deck.json"
+
+    @staticmethod
+    def _metadata(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "name": row["name"],
+            "title": row["title"],
+            "description": row["description"],
+            "cardCount": row["card_count"],
+            "tags": json.loads(row["tags"]),
+            "indexedAt": row["indexed_at"],
+        }
+
+    def _import(self, name: str, path: Path, stat: os.stat_result) -> None:
+        deck = load_json(path, default={})
+        deck = deck if isinstance(deck, dict) else {}
+        cards = [card for card in deck.get("flashcards", []) if isinstance(card, dict)]
+
+        tags: Dict[str, None] = dict.fromkeys(str(tag) for tag in deck.get("tags", []) if tag)
+        for card in cards:
+            card_tags = card.get("tags")
+            if isinstance(card_tags, list):
+                tags.update(dict.fromkeys(str(tag) for tag in card_tags if tag))
+        tag_list = list(tags)[:DECK_MAX_TAGS]
+
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM deck_cards WHERE deck = ?", (name,))
+            connection.execute("DELETE FROM deck_tags WHERE deck = ?", (name,))
+            connection.executemany(
+                "INSERT INTO deck_cards (deck, position, card_id, card) VALUES (?, ?, ?, ?)",
+                ((name, position, flashcard_id(card), json.dumps(card)) for position, card in enumerate(cards)),
+            )
+            connection.executemany("INSERT INTO deck_tags (tag, deck) VALUES (?, ?)", ((tag, name) for tag in tag_list))
+            connection.execute(
+                "INSERT OR REPLACE INTO decks "
+                "(name, title, description, card_count, tags, mtime_ns, size, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    str(deck.get("name") or name),
+                    str(deck.get("description") or ""),
+                    len(cards),
+                    json.dumps(tag_list),
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                    utc_timestamp(),
+                ),
+            )
+
+    def _forget(self, name: str) -> None:
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM deck_cards WHERE deck = ?", (name,))
+            connection.execute("DELETE FROM deck_tags WHERE deck = ?", (name,))
+            connection.execute("DELETE FROM decks WHERE name = ?", (name,))
+
+    def sync(self, name: str) -> Optional[Dict[str, Any]]:
+        """Bring one deck's index up to date with its file and return its metadata (None if missing)."""
+
+        path = self._deck_path(name)
+        if path is None:
+            return None
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._forget(name)
+            return None
+
+        connection = self._connection()
+        row = connection.execute("SELECT * FROM decks WHERE name = ?", (name,)).fetchone()
+        if row is None or (row["mtime_ns"], row["size"]) != (stat.st_mtime_ns, stat.st_size):
+            with self._lock:
+                row = connection.execute("SELECT * FROM decks WHERE name = ?", (name,)).fetchone()
+                if row is None or (row["mtime_ns"], row["size"]) != (stat.st_mtime_ns, stat.st_size):
+                    self._import(name, path, stat)
+                    row = connection.execute("SELECT * FROM decks WHERE name = ?", (name,)).fetchone()
+        return self._metadata(row)
+
+    def list_metadata(self, tag: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Metadata for every deck on disk, optionally only those carrying ``tag``.
+
+        Only files that are new or changed since the last call are read; the rest cost a ``stat``.
+        """
+
+        on_disk = {path.name[: -len("_deck.json")] for path in self.directory.glob("*_deck.json")}
+        connection = self._connection()
+        for name in {row["name"] for row in connection.execute("SELECT name FROM decks")} - on_disk:
+            self._forget(name)
+        for name in sorted(on_disk):
+            self.sync(name)
+
+        if tag is None:
+            rows = connection.execute("SELECT * FROM decks ORDER BY name").fetchall()
+        else:
+            rows = connection.execute(
+                "SELECT decks.* FROM deck_tags JOIN decks ON decks.name = deck_tags.deck "
+                "WHERE deck_tags.tag = ? ORDER BY decks.name",
+                (tag,),
+            ).fetchall()
+        return [self._metadata(row) for row in rows]
+
+    def cards(self, name: str, offset: int, limit: int) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Return ``(metadata, cards)`` for positions ``[offset, offset + limit)``, or None if unknown.
+
+        Both bounds are clamped to the deck size, so any Python int is a safe SQLite parameter.
+        """
+
+        metadata = self.sync(name)
+        if metadata is None:
+            return None
+        offset = max(0, min(offset, metadata["cardCount"]))
+        limit = max(0, min(limit, metadata["cardCount"] - offset))
+        rows = self._connection().execute(
+            "SELECT position, card_id, card FROM deck_cards WHERE deck = ? AND position >= ? "
+            "ORDER BY position LIMIT ?",
+            (name, offset, limit),
+        ).fetchall()
+        return metadata, [{**json.loads(row["card"]), "cardId": row["card_id"]} for row in rows]
@@ -0,0 +1,106 @@
+"""Near-duplicate detection for flashcards with MinHash and locality-sensitive hashing."""
+
+import os
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Tuple
+
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+MINHASH_BANDS = 8
+MINHASH_ROWS_PER_BAND = 2
+SHINGLE_STOPWORDS = {"and", "are", "does", "for", "how", "the", "what", "when", "which", "who", "why", "with"}
+MINHASH_BINS = MINHASH_BANDS * MINHASH_ROWS_PER_BAND
+SHINGLE_WORD_PATTERN = re.compile(r"[a-z0-9]{3,}")
+_BAND_BINS = [
+    tuple(range(band * MINHASH_ROWS_PER_BAND, (band + 1) * MINHASH_ROWS_PER_BAND)) for band in range(MINHASH_BANDS)
+]
+
+
+def flashcard_text(card: Dict[str, Any]) -> str:
+    question = card.get("question") or card.get("front") or ""
+    answer = card.get("answer") or card.get("back") or ""
+    return f"{question} {answer}"
+
+
+def shingle_hash(shingle: str) -> int:
+    # Unlike hash(), CRC-32 is the same in every process, so all workers bucket cards identically.
+    return zlib.crc32(shingle.encode("utf-8"))
+
+
+def text_shingles(text: str) -> frozenset:
+    """Distinct words of ``text``, ignoring case, punctuation and filler words."""
+
+    return frozenset(SHINGLE_WORD_PATTERN.findall(text.lower())).difference(SHINGLE_STOPWORDS)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index that recognises cards whose shingle sets are near-identical.
+
+    Each card gets a MinHash signature split into bands; only cards sharing a band bucket are
+    compared, using the exact Jaccard similarity of their shingles against ``threshold``.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.duplicates = 0
+        self._shingles: List[frozenset] = []
+        self._buckets: Dict[Tuple[Any, ...], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def _band_keys(self, shingles: frozenset) -> List[Tuple[Any, ...]]:
+        # One-permutation MinHash: each shingle hash lands in one bin and each bin keeps its
+        # minimum (walking hashes from largest to smallest leaves the minimum in place), which
+        # costs one pass over the shingles instead of one pass per hash function.
+        bins = {value % MINHASH_BINS: value for value in sorted(map(shingle_hash, shingles), reverse=True)}
+        keys: List[Tuple[Any, ...]] = []
+        for band, positions in enumerate(_BAND_BINS):
+            key = (band, *map(bins.get, positions))
+            # Bands with an empty bin would lump unrelated short cards into one bucket.
+            if None not in key:
+                keys.append(key)
+
+        if not keys:
+            # Cards too short to fill a band fall back to one-row bands over their occupied bins.
+            keys.extend(("bin", position, value) for position, value in bins.items())
+        return keys
+
+    def add(self, text: str, count: bool = True) -> bool:
+        """Index ``text`` and return True, or return False if it near-duplicates an indexed entry.
+
+        Rejections are tallied in ``duplicates`` unless ``count`` is False.
+        """
+
+        shingles = text_shingles(text)
+        if not shingles:
+            return True
+
+        band_keys = self._band_keys(shingles)
+        candidates = set()
+        for key in band_keys:
+            candidates.update(self._buckets.get(key, ()))
+
+        size = len(shingles)
+        for candidate in candidates:
+            other = self._shingles[candidate]
+            shared = len(shingles & other)
+            if shared >= self.threshold * (size + len(other) - shared):
+                if count:
+                    self.duplicates += 1
+                return False
+
+        position = len(self._shingles)
+        self._shingles.append(shingles)
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(position)
+        return True
+
+    def add_cards(self, cards: Iterable[Dict[str, Any]]) -> None:
+        """Seed the index with existing cards; duplicates among them are not counted as dropped."""
+
+        for card in cards:
+            self.add(flashcard_text(card), count=False)
+
+    def filter_cards(self, cards: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [card for card in cards if self.add(flashcard_text(card))]
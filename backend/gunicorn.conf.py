@@ -0,0 +1,49 @@
+"""Gunicorn settings for running the backend in production.
+
+Usage (from ``backend/``)::
+
+    gunicorn -c gunicorn.conf.py
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py "asgi:create_asgi_app()"
+
+The app is imported once in the master (``preload_app``) and forked into each worker, so the
+modules and data are loaded a single time. Connections and background threads are per worker:
+``app`` drops inherited clients after a fork, and ``post_worker_init`` starts the job workers,
+progress compactor and metrics writer. Workers share their metrics through a directory owned by
+this master, so ``/metrics`` reports the whole server whichever worker answers.
+
+The master also imports the API clients and document parsers that ``app`` otherwise loads on
+first use (``WARM_UP_ON_START``), so no worker pays for them on its first request.
+"""
+
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("WARM_UP_ON_START", "1")
+os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"memorypro-metrics-{os.getpid()}"))
+
+wsgi_app = "app:create_app()"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(8, 2 * (os.cpu_count() or 1) + 1))))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+# Document uploads can wait on many sequential model calls.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+
+
+def post_worker_init(worker):
+    import app
+
+    app.start_background_services()
+
+
+def on_starting(server):
+    # Start from zero rather than from a previous server's totals.
+    shutil.rmtree(os.environ["METRICS_MULTIPROC_DIR"], ignore_errors=True)
+
+
+def on_exit(server):
+    shutil.rmtree(os.environ["METRICS_MULTIPROC_DIR"], ignore_errors=True)
@@ -0,0 +1,49 @@
+"""Modules that ``app`` and its stores import on first use rather than at startup."""
+
+import importlib
+import types
+from typing import Any, Optional, Tuple
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    The API clients, document parsers and asyncio take most of the startup time, yet deck and
+    progress requests never touch them. ``app.warm_up`` imports them all up front instead.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: Optional[types.ModuleType] = None
+
+    def load(self) -> types.ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str) -> Any:
+        value = getattr(self.load(), attribute)
+        # Later lookups hit the instance dict and skip this method.
+        self.__dict__[attribute] = value
+        return value
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}{' (loaded)' if self._module is not None else ''}>"
+
+
+asyncio = LazyModule("asyncio")
+docx = LazyModule("docx")
+httpx = LazyModule("httpx")
+openai = LazyModule("openai")
+pypdf = LazyModule("pypdf")
+requests = LazyModule("requests")
+LAZY_MODULES = (asyncio, docx, httpx, openai, pypdf, requests)
+
+
+def upstream_errors() -> Tuple[type, ...]:
+    """Exception types meaning an upstream HTTP call failed, for use in ``except`` clauses.
+
+    ``except`` only evaluates this once something is raised, so it never imports the clients early.
+    """
+
+    return (requests.RequestException, httpx.HTTPError)
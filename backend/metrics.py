@@ -0,0 +1,326 @@
+"""Prometheus metrics kept in process and merged across worker processes for ``/metrics``."""
+
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("app")
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 90.0)
+# Worker processes share their metrics through files here; gunicorn.conf.py sets it for each server.
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+metrics_registry: List["Metric"] = []
+
+
+def _format_metric_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """A Prometheus metric family holding one series per combination of label values.
+
+    Updates take a per-metric lock for a dict lookup and an addition, so instrumenting a hot path
+    costs about a microsecond. Each process keeps its own values; :func:`render_metrics` adds up
+    the other workers' from ``METRICS_MULTIPROC_DIR``.
+    """
+
+    kind = "untyped"
+    # Whether a series outlives its process: totals do, a gauge's last reading does not.
+    cumulative = True
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        metrics_registry.append(self)
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{label}="{_escape_label_value(value)}"' for label, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self, values: Tuple[str, ...], state: Any) -> Iterator[str]:
+        raise NotImplementedError
+
+    def collect(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return {values: self._snapshot(state) for values, state in self._series.items()}
+
+    def render(self, series: Optional[Dict[Tuple[str, ...], Any]] = None) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, state in sorted((self.collect() if series is None else series).items()):
+            yield from self._samples(values, state)
+
+    def _snapshot(self, state: Any) -> Any:
+        return state
+
+    def merge(self, state: Any, other: Any) -> Any:
+        """Combine two processes' values for one series."""
+
+        return state + other
+
+
+class CounterMetric(Metric):
+    kind = "counter"
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._series[values] = self._series.get(values, 0) + amount
+
+    def _samples(self, values: Tuple[str, ...], state: float) -> Iterator[str]:
+        yield f"{self.name}{self._label_text(values)} {_format_metric_value(state)}"
+
+
+class GaugeMetric(Metric):
+    """A per-process reading, labelled with the ``pid`` it came from rather than summed across workers."""
+
+    kind = "gauge"
+    cumulative = False
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, (*labels, "pid"))
+
+    def set(self, value: float, *values: str) -> None:
+        with self._lock:
+            self._series[values] = value
+
+    def collect(self) -> Dict[Tuple[str, ...], Any]:
+        pid = str(os.getpid())
+        return {(*values, pid): state for values, state in super().collect().items()}
+
+    def _samples(self, values: Tuple[str, ...], state: float) -> Iterator[str]:
+        yield f"{self.name}{self._label_text(values)} {_format_metric_value(state)}"
+
+
+class HistogramMetric(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = REQUEST_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._series.get(values)
+            if state is None:
+                state = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def timer(self, *values: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *values)
+
+    def _snapshot(self, state: List[Any]) -> Any:
+        return list(state[0]), state[1]
+
+    def merge(self, state: Any, other: Any) -> Any:
+        return [a + b for a, b in zip(state[0], other[0])], state[1] + other[1]
+
+    def _samples(self, values: Tuple[str, ...], state: Tuple[List[int], float]) -> Iterator[str]:
+        counts, total = state
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            bucket_labels = self._label_text(values, f'le="{_format_metric_value(bound)}"')
+            yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+        yield f"{self.name}_sum{self._label_text(values)} {_format_metric_value(total)}"
+        yield f"{self.name}_count{self._label_text(values)} {cumulative}"
+
+
+def _metrics_file(pid: int) -> Path:
+    return Path(METRICS_MULTIPROC_DIR) / f"metrics-{pid}.json"
+
+
+def write_metrics_snapshot() -> None:
+    """Save this process's metric values to ``METRICS_MULTIPROC_DIR`` for the other workers to read."""
+
+    if not METRICS_MULTIPROC_DIR:
+        return
+    snapshot = {
+        metric.name: [[values, state] for values, state in metric.collect().items()] for metric in metrics_registry
+    }
+    path = _metrics_file(os.getpid())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_suffix(".tmp")
+    staging.write_text(json.dumps(snapshot), encoding="utf-8")
+    os.replace(staging, path)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect_metrics() -> Dict[str, Dict[Tuple[str, ...], Any]]:
+    """Every metric's series, with the other workers' latest snapshots merged in.
+
+    Other workers' values are at most ``METRICS_FLUSH_SECONDS`` old. Totals from workers that have
+    exited are kept so counters never go backwards; their gauges are dropped.
+    """
+
+    merged = {metric.name: metric.collect() for metric in metrics_registry}
+    if not METRICS_MULTIPROC_DIR:
+        return merged
+
+    metrics = {metric.name: metric for metric in metrics_registry}
+    for path in Path(METRICS_MULTIPROC_DIR).glob("metrics-*.json"):
+        pid = int(path.stem.rpartition("-")[2])
+        if pid == os.getpid():
+            continue
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        alive = _process_alive(pid)
+        for name, series in snapshot.items():
+            metric = metrics.get(name)
+            if metric is None or not (alive or metric.cumulative):
+                continue
+            target = merged[name]
+            for values, state in series:
+                key = tuple(values)
+                target[key] = metric.merge(target[key], state) if key in target else state
+    return merged
+
+
+def render_metrics() -> str:
+    """Every registered metric, across all workers, in the Prometheus text exposition format."""
+
+    merged = collect_metrics()
+    return "\n".join(line for metric in metrics_registry for line in metric.render(merged[metric.name])) + "\n"
+
+
+_metrics_writer: Optional[threading.Thread] = None
+
+
+def start_metrics_writer() -> None:
+    """Snapshot this worker's metrics every ``METRICS_FLUSH_SECONDS`` when ``METRICS_MULTIPROC_DIR`` is set."""
+
+    global _metrics_writer
+
+    if not METRICS_MULTIPROC_DIR or (_metrics_writer is not None and _metrics_writer.is_alive()):
+        return
+
+    def run() -> None:
+        while True:
+            try:
+                write_metrics_snapshot()
+            except OSError:  # pragma: no cover - depends on the filesystem
+                logger.warning("Could not write the metrics snapshot", exc_info=True)
+            time.sleep(METRICS_FLUSH_SECONDS)
+
+    _metrics_writer = threading.Thread(target=run, name="metrics-writer", daemon=True)
+    _metrics_writer.start()
+    # Keep the final totals of a worker that exits between flushes.
+    atexit.register(write_metrics_snapshot)
+
+
+http_requests_total = CounterMetric(
+    "memorypro_http_requests_total", "HTTP requests by method, Flask endpoint and status.", ("method", "endpoint", "status")
+)
+http_request_seconds = HistogramMetric(
+    "memorypro_http_request_seconds",
+    "Time to build each response; streamed responses are timed until their first byte.",
+    ("method", "endpoint"),
+)
+phase_seconds = HistogramMetric(
+    "memorypro_phase_seconds",
+    "Time spent in one step of document processing: extracting a PDF page or DOCX file, "
+    "chunking one section, parsing one model response.",
+    ("phase",),
+    buckets=PHASE_BUCKETS,
+)
+upstream_request_seconds = HistogramMetric(
+    "memorypro_upstream_request_seconds",
+    "Google Books and OpenAI call latency, including retries; streamed completions until the stream opens.",
+    ("service", "operation"),
+    buckets=UPSTREAM_BUCKETS,
+)
+upstream_failures_total = CounterMetric(
+    "memorypro_upstream_failures_total", "Failed Google Books and OpenAI calls by exception type.", ("service", "error")
+)
+openai_tokens_total = CounterMetric(
+    "memorypro_openai_tokens_total", "Tokens billed by OpenAI, from each response's usage.", ("kind",)
+)
+openai_queue_seconds = HistogramMetric(
+    "memorypro_openai_queue_seconds",
+    "Time OpenAI calls waited before being sent, for the shared request and token budgets or for a slot "
+    "under the adaptive concurrency limit.",
+    ("limit",),
+    buckets=UPSTREAM_BUCKETS,
+)
+openai_concurrency_limit = GaugeMetric(
+    "memorypro_openai_concurrency_limit", "The adaptive limit on concurrent OpenAI calls in this process."
+)
+coalesced_requests_total = CounterMetric(
+    "memorypro_coalesced_requests_total",
+    "Calls answered by another caller's upstream request instead of their own, by flight and by whether "
+    "they waited in this process or on another worker's lease.",
+    ("flight", "scope"),
+)
+
+
+@contextmanager
+def track_upstream(service: str, operation: str) -> Iterator[None]:
+    """Time one upstream call and count it as failed if it raises."""
+
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        upstream_failures_total.inc(service, type(exc).__name__)
+        raise
+    finally:
+        upstream_request_seconds.observe(time.perf_counter() - started, service, operation)
+
+
+def record_openai_usage(usage: Any) -> None:
+    if usage is None:
+        return
+    openai_tokens_total.inc("prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    openai_tokens_total.inc("completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+def _reset_after_fork() -> None:
+    global _metrics_writer
+
+    _metrics_writer = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,478 @@
+"""The append-only progress log and the Leitner card schedule, stored together in one SQLite file."""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from storage import get_sqlite_connection, load_json, utc_timestamp
+
+PROGRESS_DEFAULT_USER = "anonymous"
+PROGRESS_DEFAULT_DECK = "default"
+PROGRESS_RECENT_LIMIT = 100
+MAX_TIMESTAMP_MS = 253402300799999  # 9999-12-31T23:59:59.999Z, the last instant datetime can format
+LEITNER_INTERVALS_SECONDS = tuple(
+    float(value) for value in os.getenv("LEITNER_INTERVALS_SECONDS", "600,86400,432000").split(",")
+)
+SCHEDULE_DUE_LIMIT = 20
+
+
+def format_timestamp_ms(ts_ms: int) -> str:
+    moment = datetime(1970, 1, 1) + timedelta(milliseconds=ts_ms)
+    return moment.isoformat(timespec="milliseconds") + "Z"
+
+
+def check_timestamp_ms(ts_ms: int) -> int:
+    """Return ``ts_ms`` if it falls between the epoch and the end of year 9999, else raise ``ValueError``."""
+
+    if not 0 <= ts_ms <= MAX_TIMESTAMP_MS:
+        raise ValueError("Timestamp must fall between 1970-01-01 and 9999-12-31.")
+    return ts_ms
+
+
+def parse_timestamp_ms(value: str) -> int:
+    """Convert an ISO-8601 timestamp or epoch milliseconds into epoch milliseconds (UTC).
+
+    Values outside :func:`check_timestamp_ms` raise ``ValueError`` like any other malformed input.
+    """
+
+    value = value.strip()
+    if value.lstrip("-").isdigit():
+        return check_timestamp_ms(int(value))
+    parsed = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    try:
+        return check_timestamp_ms(int(parsed.timestamp() * 1000))
+    except OverflowError as exc:
+        raise ValueError("Timestamp is out of range.") from exc
+
+
+def coerce_timestamp_ms(value: Any) -> int:
+    """Read a JSON timestamp field: epoch milliseconds or an ISO-8601 string, bounded like :func:`parse_timestamp_ms`."""
+
+    if isinstance(value, int) and not isinstance(value, bool):
+        return check_timestamp_ms(value)
+    if isinstance(value, str) and value:
+        return parse_timestamp_ms(value)
+    raise ValueError("Timestamp must be ISO-8601 or epoch milliseconds.")
+
+
+def encode_progress_cursor(ts_ms: int, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{ts_ms}:{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_progress_cursor(cursor: str) -> Tuple[int, int]:
+    """Reverse :func:`encode_progress_cursor`, raising ``ValueError`` for anything it did not produce."""
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts_ms, row_id = (int(part) for part in raw.split(":"))
+        if not 0 <= row_id < 2**63:
+            raise ValueError("Cursor row id is out of range.")
+        return check_timestamp_ms(ts_ms), row_id
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+
+
+def _progress_row_to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "timestamp": row["timestamp"],
+        "userId": row["user_id"],
+        "deckId": row["deck_id"],
+        "event": row["event"],
+        "totals": json.loads(row["totals"]),
+        "bucketSnapshot": json.loads(row["bucket_snapshot"]),
+    }
+
+
+def _schedule_row_to_card(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "cardId": row["card_id"],
+        "deckId": row["deck_id"],
+        "bucket": row["bucket"],
+        "dueAt": row["due_ms"],
+        "reviews": row["reviews"],
+        "lapses": row["lapses"],
+    }
+
+
+def _leitner_step(bucket: int, correct: bool) -> int:
+    return min(bucket + 1, len(LEITNER_INTERVALS_SECONDS) - 1) if correct else 0
+
+
+_EVENT_INSERT = (
+    "INSERT OR IGNORE INTO progress_events "
+    "(timestamp, ts_ms, user_id, deck_id, event, totals, bucket_snapshot, dedupe_key) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_SCHEDULE_UPSERT = (
+    "INSERT INTO card_schedule (user_id, deck_id, card_id, bucket, due_ms, last_review_ms, reviews, lapses) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (user_id, deck_id, card_id) DO UPDATE SET bucket = excluded.bucket, "
+    "due_ms = excluded.due_ms, last_review_ms = excluded.last_review_ms, "
+    "reviews = reviews + excluded.reviews, lapses = lapses + excluded.lapses"
+)
+
+
+def _apply_review(
+    connection: sqlite3.Connection, user_id: str, deck_id: str, card_id: str, correct: bool, reviewed_ms: int
+) -> Optional[Dict[str, Any]]:
+    """Move one card between Leitner buckets inside the caller's transaction.
+
+    Mirrors ``correct``/``wrong`` in ouicards.js: a correct answer promotes the card one bucket
+    (capped at the last), a wrong one sends it back to the first. Reviews no newer than the
+    card's latest applied review are ignored and return ``None``.
+    """
+
+    row = connection.execute(
+        "SELECT bucket, last_review_ms FROM card_schedule WHERE user_id = ? AND deck_id = ? AND card_id = ?",
+        (user_id, deck_id, card_id),
+    ).fetchone()
+    if row is not None and row["last_review_ms"] >= reviewed_ms:
+        return None
+
+    bucket = _leitner_step(row["bucket"] if row is not None else 0, correct)
+    due_ms = reviewed_ms + int(LEITNER_INTERVALS_SECONDS[bucket] * 1000)
+    return _schedule_row_to_card(
+        connection.execute(
+            _SCHEDULE_UPSERT + " RETURNING card_id, deck_id, bucket, due_ms, reviews, lapses",
+            (user_id, deck_id, card_id, bucket, due_ms, reviewed_ms, 1, 0 if correct else 1),
+        ).fetchone()
+    )
+
+
+def _apply_reviews(
+    connection: sqlite3.Connection, reviews: Iterable[Tuple[str, str, str, bool, int]]
+) -> Tuple[int, int]:
+    """Replay many reviews inside the caller's transaction, returning ``(applied, stale)``.
+
+    Reviews are grouped per card and folded in timestamp order in memory, so each card costs one
+    lookup and one write however many times it was reviewed. The rules match :func:`_apply_review`.
+    """
+
+    per_card: Dict[Tuple[str, str, str], List[Tuple[int, bool]]] = {}
+    for user_id, deck_id, card_id, correct, reviewed_ms in reviews:
+        per_card.setdefault((user_id, deck_id, card_id), []).append((reviewed_ms, correct))
+
+    applied = stale = 0
+    updates = []
+    for key, card_reviews in per_card.items():
+        row = connection.execute(
+            "SELECT bucket, last_review_ms FROM card_schedule WHERE user_id = ? AND deck_id = ? AND card_id = ?", key
+        ).fetchone()
+        bucket, last_ms = (row["bucket"], row["last_review_ms"]) if row is not None else (0, None)
+        count = lapses = 0
+        for reviewed_ms, correct in sorted(card_reviews, key=lambda review: review[0]):
+            if last_ms is not None and last_ms >= reviewed_ms:
+                stale += 1
+                continue
+            bucket, last_ms = _leitner_step(bucket, correct), reviewed_ms
+            count += 1
+            lapses += not correct
+        if count:
+            applied += count
+            due_ms = last_ms + int(LEITNER_INTERVALS_SECONDS[bucket] * 1000)
+            updates.append((*key, bucket, due_ms, last_ms, count, lapses))
+    connection.executemany(_SCHEDULE_UPSERT, updates)
+    return applied, stale
+
+
+class ProgressStore:
+    """Progress events partitioned by user and deck, plus each learner's Leitner schedule.
+
+    The first connection migrates older logs and imports the legacy ``progress.json`` once.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS progress_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        event TEXT NOT NULL,
+        totals TEXT NOT NULL,
+        bucket_snapshot TEXT NOT NULL,
+        user_id TEXT NOT NULL DEFAULT 'anonymous',
+        deck_id TEXT NOT NULL DEFAULT 'default',
+        ts_ms INTEGER NOT NULL DEFAULT 0,
+        dedupe_key TEXT
+    );
+    CREATE TABLE IF NOT EXISTS progress_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS card_schedule (
+        user_id TEXT NOT NULL,
+        deck_id TEXT NOT NULL,
+        card_id TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        due_ms INTEGER NOT NULL,
+        last_review_ms INTEGER NOT NULL DEFAULT 0,
+        reviews INTEGER NOT NULL DEFAULT 0,
+        lapses INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, deck_id, card_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS card_schedule_deck_due ON card_schedule (user_id, deck_id, due_ms);
+    CREATE INDEX IF NOT EXISTS card_schedule_user_due ON card_schedule (user_id, due_ms);
+    """
+
+    INDEXES = """
+    CREATE INDEX IF NOT EXISTS progress_events_partition ON progress_events (user_id, deck_id, ts_ms, id);
+    CREATE INDEX IF NOT EXISTS progress_events_user ON progress_events (user_id, ts_ms, id);
+    CREATE INDEX IF NOT EXISTS progress_events_time ON progress_events (ts_ms);
+    CREATE UNIQUE INDEX IF NOT EXISTS progress_events_dedupe
+        ON progress_events (user_id, deck_id, dedupe_key) WHERE dedupe_key IS NOT NULL;
+    """
+
+    def __init__(self, path: Path, legacy_file: Path) -> None:
+        self.path = path
+        self.legacy_file = legacy_file
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def _migrate(self, connection: sqlite3.Connection) -> None:
+        """Add the partition and batch de-duplication columns to logs created before them and index them."""
+
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(progress_events)")}
+        with connection:
+            for column, definition in (
+                ("user_id", f"TEXT NOT NULL DEFAULT '{PROGRESS_DEFAULT_USER}'"),
+                ("deck_id", f"TEXT NOT NULL DEFAULT '{PROGRESS_DEFAULT_DECK}'"),
+                ("ts_ms", "INTEGER NOT NULL DEFAULT 0"),
+                ("dedupe_key", "TEXT"),
+            ):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE progress_events ADD COLUMN {column} {definition}")
+
+            backfill = []
+            for row in connection.execute("SELECT id, timestamp FROM progress_events WHERE ts_ms = 0"):
+                try:
+                    backfill.append((parse_timestamp_ms(row["timestamp"]), row["id"]))
+                except ValueError:
+                    continue
+            connection.executemany("UPDATE progress_events SET ts_ms = ? WHERE id = ?", backfill)
+            connection.executescript(self.INDEXES)
+
+    def connection(self) -> sqlite3.Connection:
+        """Open the log, migrating it and importing the legacy progress file once."""
+
+        connection = get_sqlite_connection(self.path, self.SCHEMA)
+        if not self._migrated:
+            with self._lock:
+                if not self._migrated:
+                    self._migrate(connection)
+                    self._migrated = True
+
+        imported = connection.execute("SELECT 1 FROM progress_meta WHERE key = 'legacy_imported'").fetchone()
+        if imported is None:
+            with self._lock, connection:
+                legacy_entries = load_json(self.legacy_file, default=[])
+                if not connection.execute("SELECT 1 FROM progress_meta WHERE key = 'legacy_imported'").fetchone():
+                    rows = []
+                    for entry in legacy_entries:
+                        if not isinstance(entry, dict):
+                            continue
+                        timestamp = entry.get("timestamp") or utc_timestamp()
+                        try:
+                            ts_ms = parse_timestamp_ms(str(timestamp))
+                        except ValueError:
+                            ts_ms = 0
+                        rows.append(
+                            (
+                                timestamp,
+                                ts_ms,
+                                entry.get("event", "unknown"),
+                                json.dumps(entry.get("totals", {})),
+                                json.dumps(entry.get("bucketSnapshot", {})),
+                            )
+                        )
+                    connection.executemany(
+                        "INSERT INTO progress_events (timestamp, ts_ms, event, totals, bucket_snapshot) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    connection.execute(
+                        "INSERT INTO progress_meta (key, value) VALUES ('legacy_imported', ?)", (utc_timestamp(),)
+                    )
+        return connection
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Append one event in its own transaction.
+
+        The log runs in WAL mode with ``synchronous=NORMAL``, so commits are atomic but fsyncs are
+        batched into checkpoints instead of paid on every event.
+        """
+
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO progress_events (timestamp, ts_ms, user_id, deck_id, event, totals, bucket_snapshot) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry["timestamp"],
+                    parse_timestamp_ms(entry["timestamp"]),
+                    entry["userId"],
+                    entry["deckId"],
+                    entry["event"],
+                    json.dumps(entry["totals"]),
+                    json.dumps(entry["bucketSnapshot"]),
+                ),
+            )
+
+    def recent(self, limit: int = PROGRESS_RECENT_LIMIT) -> List[Dict[str, Any]]:
+        """Return the newest ``limit`` events, oldest first, reading only the tail of the log."""
+
+        rows = self.connection().execute(
+            "SELECT timestamp, user_id, deck_id, event, totals, bucket_snapshot FROM progress_events "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [_progress_row_to_entry(row) for row in reversed(rows)]
+
+    def query(
+        self,
+        user_id: str,
+        deck_id: Optional[str] = None,
+        since_ms: Optional[int] = None,
+        until_ms: Optional[int] = None,
+        limit: int = PROGRESS_RECENT_LIMIT,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Page through one user's events, newest first, optionally narrowed to a deck and time range.
+
+        Pages are keyset-paginated on ``(ts_ms, id)`` so every page is a bounded range scan of the
+        partition index; the cost does not grow with the offset or with the size of other partitions.
+        Returns the page and the cursor for the next one (``None`` when the range is exhausted).
+        """
+
+        clauses = ["user_id = ?"]
+        params: List[Any] = [user_id]
+        if deck_id is not None:
+            clauses.append("deck_id = ?")
+            params.append(deck_id)
+        if since_ms is not None:
+            clauses.append("ts_ms >= ?")
+            params.append(since_ms)
+        if until_ms is not None:
+            clauses.append("ts_ms < ?")
+            params.append(until_ms)
+        if cursor:
+            clauses.append("(ts_ms, id) < (?, ?)")
+            params.extend(decode_progress_cursor(cursor))
+
+        rows = self.connection().execute(
+            "SELECT id, ts_ms, timestamp, user_id, deck_id, event, totals, bucket_snapshot FROM progress_events "
+            f"WHERE {' AND '.join(clauses)} ORDER BY ts_ms DESC, id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_progress_cursor(rows[-1]["ts_ms"], rows[-1]["id"])
+        return [_progress_row_to_entry(row) for row in rows], next_cursor
+
+    def compact(self, retention_days: float) -> int:
+        """Drop events older than the retention window and fold the WAL back into the database.
+
+        A non-positive ``retention_days`` keeps the full history; partitioned queries stay index-bound
+        however large the log grows, so only the checkpoint is needed.
+        """
+
+        connection = self.connection()
+        removed = 0
+        if retention_days > 0:
+            cutoff_ms = int((time.time() - retention_days * 86400) * 1000)
+            with connection:
+                removed = connection.execute("DELETE FROM progress_events WHERE ts_ms < ?", (cutoff_ms,)).rowcount
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def enroll(self, user_id: str, deck_id: str, card_ids: Iterable[str], now_ms: Optional[int] = None) -> int:
+        """Start tracking cards in the first bucket, due immediately. Already-tracked cards are untouched."""
+
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        connection = self.connection()
+        with connection:
+            return connection.executemany(
+                "INSERT OR IGNORE INTO card_schedule (user_id, deck_id, card_id, bucket, due_ms) "
+                "VALUES (?, ?, ?, 0, ?)",
+                ((user_id, deck_id, card_id, now_ms) for card_id in card_ids),
+            ).rowcount
+
+    def record_review(
+        self, user_id: str, deck_id: str, card_id: str, correct: bool, reviewed_ms: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Log and apply one review; return the card's new schedule, or ``None`` if a newer review already won.
+
+        The event row matches what :meth:`ingest` logs for a review without an ``eventId``, so the same
+        review arriving later in a batch is recognised as a duplicate.
+        """
+
+        reviewed_ms = int(time.time() * 1000) if reviewed_ms is None else reviewed_ms
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                _EVENT_INSERT,
+                (
+                    format_timestamp_ms(reviewed_ms),
+                    reviewed_ms,
+                    user_id,
+                    deck_id,
+                    "review",
+                    "{}",
+                    "{}",
+                    f"{reviewed_ms}:review:{card_id}",
+                ),
+            )
+            return _apply_review(connection, user_id, deck_id, card_id, correct, reviewed_ms)
+
+    def ingest(self, rows: List[Tuple[Any, ...]]) -> Dict[str, int]:
+        """Append validated rows to the log and replay their reviews, all in one transaction.
+
+        Rows whose de-duplication key is already logged for their partition are dropped, so a re-sent
+        batch does not duplicate history. Reviews are applied in timestamp order, so a card ends up where
+        its latest review puts it no matter how the client queued them; reviews no newer than one already
+        stored are skipped, which keeps re-sent reviews from moving the schedule.
+        """
+
+        connection = self.connection()
+        with connection:
+            changes = connection.total_changes
+            connection.executemany(_EVENT_INSERT, (row[:8] for row in rows))
+            accepted = connection.total_changes - changes
+            applied, stale = _apply_reviews(
+                connection, ((row[2], row[3], row[8], row[9], row[1]) for row in rows if row[8] is not None)
+            )
+        return {
+            "accepted": accepted,
+            "duplicates": len(rows) - accepted,
+            "reviewsApplied": applied,
+            "reviewsStale": stale,
+        }
+
+    def due(
+        self, user_id: str, deck_id: Optional[str] = None, limit: int = SCHEDULE_DUE_LIMIT, now_ms: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` cards due by ``now_ms``, most overdue first.
+
+        The ``(user_id, [deck_id,] due_ms)`` indexes keep this an O(log n) seek followed by reading
+        ``limit`` index entries, independent of how many cards other learners track.
+        """
+
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        if deck_id is None:
+            where, params = "user_id = ? AND due_ms <= ?", (user_id, now_ms)
+        else:
+            where, params = "user_id = ? AND deck_id = ? AND due_ms <= ?", (user_id, deck_id, now_ms)
+        rows = self.connection().execute(
+            "SELECT card_id, deck_id, bucket, due_ms, reviews, lapses FROM card_schedule "
+            f"WHERE {where} ORDER BY due_ms LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [_schedule_row_to_card(row) for row in rows]
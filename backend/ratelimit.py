@@ -0,0 +1,373 @@
+"""Rate limiting for OpenAI calls: budgets shared by every worker and an adaptive per-process cap."""
+
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional
+
+from lazy import asyncio, openai
+from metrics import openai_concurrency_limit, openai_queue_seconds, record_openai_usage
+from storage import get_sqlite_connection
+
+logger = logging.getLogger("app")
+
+OPENAI_RETRY_BASE_DELAY_SECONDS = 1.0
+OPENAI_RETRY_MAX_DELAY_SECONDS = 30.0
+OPENAI_RATE_LIMIT_HEADROOM = 0.05
+
+
+def retry_delay(attempt: int, exc: Exception) -> float:
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), OPENAI_RETRY_MAX_DELAY_SECONDS)
+        except ValueError:
+            pass
+
+    delay = OPENAI_RETRY_BASE_DELAY_SECONDS * (2 ** attempt)
+    return min(delay, OPENAI_RETRY_MAX_DELAY_SECONDS) * random.uniform(0.5, 1.0)
+
+
+class SharedRateBudget:
+    """Requests- and tokens-per-minute token buckets kept in SQLite and shared by every worker.
+
+    Callers take their cost up front, even into debt, and wait out the refill, so they queue in arrival order.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_buckets (
+        name TEXT PRIMARY KEY,
+        level REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path: Path, limits_per_minute: Dict[str, float], burst_seconds: float) -> None:
+        self.path = path
+        self.rates = {name: limit / 60 for name, limit in limits_per_minute.items() if limit > 0}
+        self.burst_seconds = burst_seconds
+
+    def _connection(self) -> sqlite3.Connection:
+        return get_sqlite_connection(self.path, self.SCHEMA)
+
+    def _update(self, connection: sqlite3.Connection, name: str, delta: float, ceiling: Optional[float] = None) -> float:
+        """Refill bucket ``name``, add ``delta`` and cap it at ``ceiling``; returns the new level."""
+
+        rate = self.rates[name]
+        capacity = rate * self.burst_seconds
+        now = time.time()
+        connection.execute(
+            "INSERT OR IGNORE INTO rate_buckets (name, level, updated_at) VALUES (?, ?, ?)", (name, capacity, now)
+        )
+        row = connection.execute(
+            "UPDATE rate_buckets SET level = MIN(?, MIN(?, level + ? * MAX(0, ? - updated_at)) + ?), updated_at = ? "
+            "WHERE name = ? RETURNING level",
+            (capacity if ceiling is None else ceiling, capacity, rate, now, delta, now, name),
+        ).fetchone()
+        return row["level"]
+
+    def reserve(self, costs: Dict[str, float]) -> float:
+        """Take ``costs`` out of the budgets and return how many seconds to wait until they are covered."""
+
+        wait = 0.0
+        connection = self._connection()
+        with connection:
+            for name, cost in costs.items():
+                if name in self.rates:
+                    wait = max(wait, -self._update(connection, name, -cost) / self.rates[name])
+        return wait
+
+    def refund(self, name: str, amount: float) -> None:
+        if name not in self.rates or amount <= 0:
+            return
+        connection = self._connection()
+        with connection:
+            self._update(connection, name, amount)
+
+    def pause(self, seconds: float) -> None:
+        """Empty every budget for ``seconds``, holding back all workers after a rate-limit response."""
+
+        connection = self._connection()
+        with connection:
+            for name, rate in self.rates.items():
+                self._update(connection, name, 0.0, ceiling=-rate * seconds)
+
+
+class AdaptiveConcurrencyLimit:
+    """A per-process cap on concurrent calls that grows by ``1 / limit`` per success and halves on overload.
+
+    Callers over the limit wait in arrival order, in threads or on an event loop.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, decrease_interval: float = 1.0) -> None:
+        self.maximum = maximum
+        self.minimum = minimum
+        self.decrease_interval = decrease_interval
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self._waiters: Deque[Callable[[], None]] = deque()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        openai_concurrency_limit.set(self.limit)
+
+    def _try_enter(self) -> bool:
+        if self._waiters or self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def _admit(self) -> None:
+        """Hand free slots to waiters in arrival order; called with the lock held."""
+
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.popleft()()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._try_enter():
+                return
+            admitted = threading.Event()
+            self._waiters.append(admitted.set)
+        admitted.wait()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+
+        with self._lock:
+            if self._try_enter():
+                return
+            self._waiters.append(wake)
+        try:
+            await admitted
+        except asyncio.CancelledError:
+            with self._lock:
+                handed_over = wake not in self._waiters
+                if not handed_over:
+                    self._waiters.remove(wake)
+            if handed_over:
+                self.release(success=False)
+            raise
+
+    def release(self, success: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if success:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._admit()
+            limit = self.limit
+        openai_concurrency_limit.set(limit)
+
+    def overload(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_interval:
+                return
+            self._last_decrease = now
+            self.limit = max(float(self.minimum), self.limit / 2)
+            limit = self.limit
+        logger.warning("OpenAI is rate limiting; lowering concurrency to %d", int(limit))
+        openai_concurrency_limit.set(limit)
+
+
+class OpenAIRateLimiter:
+    """Queues OpenAI calls behind the shared budgets and this process's adaptive concurrency limit.
+
+    Callers bracket each call with :meth:`acquire` and :meth:`release` (or their async twins), passing
+    any error to ``release``. A 429 pauses the budgets for its ``Retry-After``; a 429 or nearly spent
+    rate-limit headers halve concurrency.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[SharedRateBudget],
+        concurrency: AdaptiveConcurrencyLimit,
+        count_tokens: Callable[[str], int],
+    ) -> None:
+        self.budget = budget
+        self.concurrency = concurrency
+        self.count_tokens = count_tokens
+
+    def estimate_tokens(self, prompt: str, max_tokens: int) -> int:
+        """Tokens to reserve for a call: the prompt plus the longest completion it may return."""
+
+        if self.budget is None or "tokens" not in self.budget.rates:
+            return 0
+        return self.count_tokens(prompt) + max_tokens
+
+    def _reserve(self, tokens: int) -> float:
+        return self.budget.reserve({"requests": 1, "tokens": tokens}) if self.budget is not None else 0.0
+
+    def _refund(self, tokens: int) -> None:
+        if self.budget is not None:
+            self.budget.refund("requests", 1)
+            self.budget.refund("tokens", tokens)
+
+    def acquire(self, tokens: int) -> None:
+        """Wait for budget and a concurrency slot; every call must be paired with :meth:`release`."""
+
+        started = time.perf_counter()
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        openai_queue_seconds.observe(time.perf_counter() - started, "budget")
+
+        started = time.perf_counter()
+        self.concurrency.acquire()
+        openai_queue_seconds.observe(time.perf_counter() - started, "concurrency")
+
+    async def acquire_async(self, tokens: int) -> None:
+        """Like :meth:`acquire`; a caller cancelled while queued gets its reservation back."""
+
+        started = time.perf_counter()
+        wait = await asyncio.to_thread(self._reserve, tokens)
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            openai_queue_seconds.observe(time.perf_counter() - started, "budget")
+
+            started = time.perf_counter()
+            await self.concurrency.acquire_async()
+        except asyncio.CancelledError:
+            # Not awaited: a second cancellation must not lose the refund.
+            asyncio.get_running_loop().run_in_executor(None, self._refund, tokens)
+            raise
+        openai_queue_seconds.observe(time.perf_counter() - started, "concurrency")
+
+    def _rate_limited(self, error: Optional[BaseException]) -> Optional[float]:
+        """Lower concurrency after a 429 and return how long to pause the shared budgets, if at all."""
+
+        if error is None or not isinstance(error, openai.RateLimitError):
+            return None
+        self.concurrency.overload()
+        return retry_delay(0, error) if self.budget is not None else None
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        self.concurrency.release(success=error is None)
+        pause = self._rate_limited(error)
+        if pause is not None:
+            self.budget.pause(pause)
+
+    async def release_async(self, error: Optional[BaseException] = None) -> None:
+        self.concurrency.release(success=error is None)
+        pause = self._rate_limited(error)
+        if pause is not None:
+            await asyncio.to_thread(self.budget.pause, pause)
+
+    def observe(self, headers: Any) -> None:
+        """Lower concurrency when the rate-limit headers show a budget nearly used up."""
+
+        for kind in ("requests", "tokens"):
+            try:
+                limit = float(headers.get(f"x-ratelimit-limit-{kind}") or 0)
+                remaining = float(headers.get(f"x-ratelimit-remaining-{kind}") or 0)
+            except ValueError:
+                continue
+            if limit and remaining < limit * OPENAI_RATE_LIMIT_HEADROOM:
+                self.concurrency.overload()
+                return
+
+    def settle(self, reserved_tokens: int, usage: Any) -> None:
+        """Give back the part of a call's token reservation that its ``usage`` shows went unused."""
+
+        if self.budget is None or not reserved_tokens or usage is None:
+            return
+        used = getattr(usage, "total_tokens", 0) or (
+            (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+        )
+        self.budget.refund("tokens", reserved_tokens - used)
+
+
+class MeteredStream:
+    """A streamed completion that keeps its ``limiter`` slot until it is exhausted or closed.
+
+    The final chunk's ``usage`` is recorded and settles the token reservation.
+    """
+
+    def __init__(self, stream: Any, limiter: OpenAIRateLimiter, reserved_tokens: int) -> None:
+        self._stream = stream
+        self._limiter = limiter
+        self._reserved_tokens = reserved_tokens
+        self._events: Any = None
+        self._open = True
+
+    def _usage(self, event: Any) -> Any:
+        usage = getattr(event, "usage", None)
+        record_openai_usage(usage)
+        return usage
+
+    def _close(self) -> bool:
+        """Mark the stream closed; True for the one caller that must release the slot."""
+
+        was_open, self._open = self._open, False
+        return was_open
+
+    def __iter__(self) -> "MeteredStream":
+        return self
+
+    def __next__(self) -> Any:
+        if not self._open:
+            raise StopIteration
+        try:
+            if self._events is None:
+                self._events = iter(self._stream)
+            event = next(self._events)
+            usage = self._usage(event)
+            if usage is not None:
+                self._limiter.settle(self._reserved_tokens, usage)
+            return event
+        except StopIteration:
+            self.close()
+            raise
+        except BaseException as exc:
+            self.close(exc)
+            raise
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        if self._close():
+            self._limiter.release(error)
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+
+    def __aiter__(self) -> "MeteredStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if not self._open:
+            raise StopAsyncIteration
+        try:
+            if self._events is None:
+                self._events = self._stream.__aiter__()
+            event = await self._events.__anext__()
+            usage = self._usage(event)
+            if usage is not None:
+                await asyncio.to_thread(self._limiter.settle, self._reserved_tokens, usage)
+            return event
+        except StopAsyncIteration:
+            await self.aclose()
+            raise
+        except BaseException as exc:
+            await self.aclose(exc)
+            raise
+
+    async def aclose(self, error: Optional[BaseException] = None) -> None:
+        if self._close():
+            await self._limiter.release_async(error)
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                await close()
+
+    def __del__(self) -> None:
+        # An abandoned stream must not keep its slot; the HTTP response is left to the garbage collector.
+        if self._close():
+            self._limiter.concurrency.release(success=False)
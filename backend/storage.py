@@ -0,0 +1,63 @@
+"""Helpers shared by the stores: reading legacy and deck JSON, per-thread SQLite connections, timestamps."""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+
+def load_json(path: Path, default: Any) -> Any:
+    if path.exists():
+        with path.open("r", encoding="utf-8") as handle:
+            return json.load(handle)
+    return default
+
+
+_sqlite_local = threading.local()
+
+
+def get_sqlite_connection(path: Path, schema: str = "") -> sqlite3.Connection:
+    """Return this thread's connection to ``path``, opening it in WAL mode on first use."""
+
+    connections: Dict[str, sqlite3.Connection] = getattr(_sqlite_local, "connections", None) or {}
+    _sqlite_local.connections = connections
+
+    key = str(path)
+    connection = connections.get(key)
+    if connection is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(key, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if schema:
+            connection.executescript(schema)
+        connections[key] = connection
+    return connection
+
+
+def close_sqlite_connections() -> None:
+    """Close this thread's SQLite connections; the next :func:`get_sqlite_connection` reopens them."""
+
+    connections: Dict[str, sqlite3.Connection] = getattr(_sqlite_local, "connections", None) or {}
+    for connection in connections.values():
+        connection.close()
+    connections.clear()
+
+
+def utc_timestamp() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _reset_after_fork() -> None:
+    """Drop connections inherited from a parent that preloaded the app; SQLite handles must not cross a fork."""
+
+    global _sqlite_local
+
+    _sqlite_local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,22 @@
+from dedup import NearDuplicateIndex
+
+SEED_CARD = {"question": "What is the powerhouse of the cell?", "answer": "The mitochondria produces energy"}
+
+
+def test_seeding_does_not_count_duplicates_within_the_seed_deck():
+    index = NearDuplicateIndex()
+    index.add_cards([dict(SEED_CARD), dict(SEED_CARD), dict(SEED_CARD)])
+
+    assert len(index) == 1
+    assert index.duplicates == 0
+
+
+def test_duplicates_dropped_counts_only_filtered_upload_cards():
+    index = NearDuplicateIndex()
+    index.add_cards([dict(SEED_CARD), dict(SEED_CARD), dict(SEED_CARD)])
+
+    fresh = {"question": "Which organelle performs photosynthesis?", "answer": "Chloroplasts capture sunlight"}
+    kept = index.filter_cards([dict(SEED_CARD), fresh])
+
+    assert kept == [fresh]
+    assert index.duplicates == 1